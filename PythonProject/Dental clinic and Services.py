@@ -1,134 +1,216 @@
 import sys
 import os
 import datetime
-import pandas as pd
-import numpy as np
-import mysql.connector
+import time
+
+STARTUP_STARTED = time.perf_counter()
+
+import json
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QLabel, QPushButton, QLineEdit, QComboBox, QTextEdit, QFrame,
                              QCheckBox, QTableWidget, QTableWidgetItem, QMessageBox,
                              QFileDialog, QDateEdit, QHeaderView, QScrollArea, QDialog,
-                             QTabWidget, QGridLayout, QGroupBox, QInputDialog)
-from PyQt6.QtCore import Qt, QDate, pyqtSignal
+                             QTabWidget, QGridLayout, QGroupBox, QInputDialog, QTableView)
+from PyQt6.QtCore import (Qt, QDate, pyqtSignal, QAbstractTableModel, QModelIndex, QObject,
+                          QRunnable, QThreadPool, QTimer)
 from PyQt6.QtGui import QPixmap, QIcon, QKeySequence, QShortcut, QFont, QColor
-import matplotlib
 
-matplotlib.use("Qt5Agg")
-import matplotlib.pyplot as plt
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from clinic import (DB_POOL_SIZE, close_db_pool, setup_database, get_dashboard_stats,
+                    dashboard_charts, service_catalog, get_service_catalog, DEMOGRAPHIC_TYPES,
+                    PATIENT_STATUSES, save_patient, update_patient_status, SlotUnavailableError,
+                    schedule_index, slot_availability, find_free_slots, APPOINTMENT_STATUSES,
+                    TIME_SLOTS, PAYMENT_METHODS, book_appointment, patient_appointments,
+                    update_appointment_status, latest_bill, new_payment_key, record_payment,
+                    export_table, ANALYTICS_TTL, get_analytics, GRID_SEARCH_DELAY_MS,
+                    grid_filter_conditions, grid_query_cache, fetch_grid_page,
+                    CHANGE_POLL_INTERVAL, poll_changes, authenticate_patient,
+                    register_patient_account, authenticate_admin, query_action, query_stats,
+                    SLOW_QUERY_LOG, SLOW_QUERY_MS, get_db_pool, JOURNAL_REPLAY_INTERVAL,
+                    write_journal, replay_journal, entity_cache)
+from clinic.cli import is_command, run_command
+
+
+# ----------------------- STARTUP -----------------------
+# Fast start: admin tabs are built (and queried) the first time they are selected,
+# and pandas/matplotlib are imported only by the code paths that use them.
+FAST_START = os.environ.get("DENTAL_FAST_START", "1") != "0"
+STARTUP_LOG = os.environ.get("DENTAL_STARTUP_LOG",
+                             os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_timing.jsonl"))
+
+_startup_phases = []
+_startup_lap = [STARTUP_STARTED]
+
+
+def mark_startup(phase):
+    """Record how long the phase since the previous mark took"""
+    now = time.perf_counter()
+    _startup_phases.append((phase, (now - _startup_lap[0]) * 1000))
+    _startup_lap[0] = now
+
+
+def skip_startup_lap():
+    """Exclude the time since the last mark (e.g. the user typing a password)"""
+    _startup_lap[0] = time.perf_counter()
+
+
+def write_startup_report():
+    total = sum(ms for _, ms in _startup_phases)
+    print("Startup timing (" + ("fast start" if FAST_START else "eager") + "):")
+    for phase, ms in _startup_phases:
+        print(f"  {phase:<28} {ms:8.1f} ms")
+    print(f"  {'total':<28} {total:8.1f} ms")
+
+    if not STARTUP_LOG:
+        return
+    entry = {
+        "recorded_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "fast_start": FAST_START,
+        "phases_ms": {phase: round(ms, 1) for phase, ms in _startup_phases},
+        "total_ms": round(total, 1)
+    }
+    try:
+        with open(STARTUP_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+    except OSError as e:
+        print(f"Could not write startup timing log: {e}")
 
 
-# ----------------------- DATABASE CONNECTION -----------------------
-def get_db_connection():
-    try:
-        return mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="",
-            database="dental_clinic",
-            charset="utf8mb4"
-        )
-    except mysql.connector.Error as err:
-        print(f"Database Connection Error: {err}")
-        return None
+_chart_backend = None
 
 
-def fetch_data(query, conn, params=None):
-    if conn is None:
-        return pd.DataFrame()
-    try:
-        df = pd.read_sql(query, conn, params=params)
-        return df
-    except Exception as exc:
-        print(f"[fetch_data] SQL Error: {exc}")
-        return pd.DataFrame()
+def chart_backend():
+    """Import matplotlib and its Qt canvas on first use; returns the FigureCanvas class"""
+    global _chart_backend
+    if _chart_backend is None:
+        import matplotlib
+        matplotlib.use("Qt5Agg")
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        _chart_backend = FigureCanvas
+    return _chart_backend
 
 
-# ----------------------- DATABASE SETUP -----------------------
-def setup_database():
-    """Initialize database tables"""
-    try:
-        db = get_db_connection()
-        if db is not None:
-            cursor = db.cursor()
-
-            # Drop old patient_accounts table to ensure clean schema
-            try:
-                cursor.execute("DROP TABLE IF EXISTS patient_accounts")
-                db.commit()
-            except:
-                pass
-
-            # Create admin accounts table first
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS admin_accounts (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    username VARCHAR(255) UNIQUE NOT NULL,
-                    password VARCHAR(255) NOT NULL
-                )
-            """)
+# ----------------------- BACKGROUND QUERIES -----------------------
+_query_thread_pool = None
 
-            # Create patient accounts table with correct schema
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS patient_accounts (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    email VARCHAR(255) UNIQUE NOT NULL,
-                    password VARCHAR(255) NOT NULL
-                )
-            """)
 
-            # Create patients table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS patients (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    name VARCHAR(255) NOT NULL,
-                    birth_date DATE,
-                    demographic_type VARCHAR(50),
-                    contact VARCHAR(100),
-                    type VARCHAR(50) DEFAULT 'Pending'
-                )
-            """)
+def query_thread_pool():
+    global _query_thread_pool
+    if _query_thread_pool is None:
+        _query_thread_pool = QThreadPool()
+        # More workers than pooled connections would only queue inside the pool
+        _query_thread_pool.setMaxThreadCount(DB_POOL_SIZE)
+    return _query_thread_pool
 
-            # Create appointments table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS appointments (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    patient_name VARCHAR(255) NOT NULL,
-                    date DATE NOT NULL,
-                    time_slot VARCHAR(50) NOT NULL,
-                    services TEXT,
-                    status VARCHAR(50) DEFAULT 'Booked'
-                )
-            """)
 
-            # Create payments table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS payments (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    appointment_id INT,
-                    amount DECIMAL(10,2),
-                    method VARCHAR(50),
-                    date_paid DATETIME
-                )
-            """)
+class QueryJob(QObject):
+    completed = pyqtSignal(object, object, object)  # job, result, error
 
-            # Insert default admin if not exists
-            try:
-                cursor.execute("""
-                    INSERT INTO admin_accounts (username, password) 
-                    VALUES ('admin', 'admin123')
-                """)
-                db.commit()
-            except:
-                pass
+    def __init__(self, key, fn, args, kwargs, on_result, on_error):
+        super().__init__()
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.on_result = on_result
+        self.on_error = on_error
+        self.cancelled = False
+        self.runnable = None
 
-            db.close()
-            print("Database initialized successfully")
-            return True
-    except Exception as e:
-        print(f"Database setup error: {e}")
-        return False
+    def same_request(self, fn, args, kwargs):
+        return self.fn == fn and self.args == args and self.kwargs == kwargs
+
+
+class QueryRunnable(QRunnable):
+    def __init__(self, job):
+        super().__init__()
+        self.job = job
+
+    def run(self):
+        job = self.job
+        if job.cancelled:
+            return
+        try:
+            # The job key names the UI action in query stats and the slow query log
+            with query_action(job.key):
+                result = job.fn(*job.args, **job.kwargs)
+        except Exception as e:
+            job.completed.emit(job, None, e)
+        else:
+            job.completed.emit(job, result, None)
+
+
+class QueryExecutor(QObject):
+    """Runs database work off the GUI thread and delivers results back on it.
+
+    Jobs are keyed: submitting an identical request while one with the same key
+    is still running is coalesced into it (repeated Refresh clicks cost one
+    query); a different request under the same key cancels the older one.
+    Cancelled jobs never call back. busy_changed drives loading indicators.
+    """
+
+    busy_changed = pyqtSignal(bool)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._jobs = {}
+
+    def submit(self, key, fn, *args, on_result=None, on_error=None, **kwargs):
+        running = self._jobs.get(key)
+        if running is not None:
+            if running.same_request(fn, args, kwargs):
+                return running
+            self.cancel(key)
+
+        job = QueryJob(key, fn, args, kwargs, on_result, on_error)
+        job.completed.connect(self._finish)
+        job.runnable = QueryRunnable(job)
+        self._jobs[key] = job
+        if len(self._jobs) == 1:
+            self.busy_changed.emit(True)
+        query_thread_pool().start(job.runnable)
+        return job
+
+    def is_running(self, key):
+        return key in self._jobs
+
+    def cancel(self, key):
+        job = self._jobs.pop(key, None)
+        if job is None:
+            return
+        job.cancelled = True
+        try:
+            # Still queued: make sure it never reaches the database
+            query_thread_pool().tryTake(job.runnable)
+        except RuntimeError:
+            pass  # already ran and was deleted by the pool
+        if not self._jobs:
+            self.busy_changed.emit(False)
+
+    def cancel_all(self):
+        for key in list(self._jobs):
+            self.cancel(key)
+
+    def _finish(self, job, result, error):
+        if self._jobs.get(job.key) is job:
+            del self._jobs[job.key]
+            if not self._jobs:
+                self.busy_changed.emit(False)
+        if job.cancelled:
+            return
+        if error is not None:
+            if job.on_error is not None:
+                job.on_error(error)
+            else:
+                print(f"[{job.key}] Query error: {error}")
+        elif job.on_result is not None:
+            job.on_result(result)
+
+
+def show_database_error(parent, context, error):
+    if isinstance(error, ConnectionError):
+        QMessageBox.critical(parent, "Database Error", "Cannot connect to database.")
+    else:
+        QMessageBox.critical(parent, "Database Error", f"{context}: {str(error)}")
 
 
 # ----------------------- LOGIN WINDOW -----------------------
@@ -308,6 +390,7 @@ class PatientLogin(QDialog):
         login_btn.setMinimumHeight(45)
         login_btn.clicked.connect(self.login_patient)
         layout.addWidget(login_btn)
+        self.login_btn = login_btn
 
         # Register button
         register_btn = QPushButton("Create New Account")
@@ -327,6 +410,7 @@ class PatientLogin(QDialog):
         register_btn.setMinimumHeight(45)
         register_btn.clicked.connect(self.register_patient)
         layout.addWidget(register_btn)
+        self.register_btn = register_btn
 
         # Info label
         info_label = QLabel("Default password for new accounts: 123")
@@ -338,6 +422,14 @@ class PatientLogin(QDialog):
         self.password_entry.returnPressed.connect(self.login_patient)
         self.email_entry.setFocus()
 
+        self.executor = QueryExecutor(self)
+        self.executor.busy_changed.connect(self.set_busy)
+
+    def set_busy(self, busy):
+        self.login_btn.setEnabled(not busy)
+        self.register_btn.setEnabled(not busy)
+        self.login_btn.setText("Please wait..." if busy else "Login")
+
     def login_patient(self):
         email = self.email_entry.text().strip()
         password = self.password_entry.text().strip()
@@ -350,24 +442,17 @@ class PatientLogin(QDialog):
             QMessageBox.warning(self, "Invalid Email", "Email must contain '@' symbol.")
             return
 
-        try:
-            db = get_db_connection()
-            if db is None:
-                QMessageBox.critical(self, "Database Error", "Cannot connect to database.")
-                return
-            cursor = db.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM patient_accounts WHERE email=%s AND password=%s", (email, password))
-            patient = cursor.fetchone()
-            db.close()
-
-            if patient:
-                self.logged_in_email = email
-                QMessageBox.information(self, "Login Successful", f"Welcome back, {email}!")
-                self.accept()
-            else:
-                QMessageBox.critical(self, "Login Failed", "Invalid email or password.")
-        except Exception as e:
-            QMessageBox.critical(self, "Database Error", f"Login error: {str(e)}")
+        self.executor.submit("login", authenticate_patient, email, password,
+                             on_result=lambda ok: self.login_finished(email, ok),
+                             on_error=lambda error: show_database_error(self, "Login error", error))
+
+    def login_finished(self, email, ok):
+        if ok:
+            self.logged_in_email = email
+            QMessageBox.information(self, "Login Successful", f"Welcome back, {email}!")
+            self.accept()
+        else:
+            QMessageBox.critical(self, "Login Failed", "Invalid email or password.")
 
     def register_patient(self):
         email = self.email_entry.text().strip()
@@ -380,30 +465,17 @@ class PatientLogin(QDialog):
             QMessageBox.warning(self, "Invalid Email", "Email must contain '@' symbol.")
             return
 
-        try:
-            db = get_db_connection()
-            if db is None:
-                QMessageBox.critical(self, "Database Error", "Cannot connect to database.")
-                return
-            cursor = db.cursor()
-
-            # Check if email already exists
-            cursor.execute("SELECT * FROM patient_accounts WHERE email=%s", (email,))
-            if cursor.fetchone():
-                QMessageBox.warning(self, "Email Exists", "This email is already registered. Please login instead.")
-                db.close()
-                return
-
-            # Create account with default password
-            cursor.execute("INSERT INTO patient_accounts (email, password) VALUES (%s, %s)", (email, "123"))
-            db.commit()
-            db.close()
+        self.executor.submit("register", register_patient_account, email,
+                             on_result=lambda created: self.register_finished(email, created),
+                             on_error=lambda error: show_database_error(self, "Registration error", error))
 
-            QMessageBox.information(self, "Success",
-                                    f"Account created successfully!\n\nEmail: {email}\nPassword: 123\n\nYou can now login.")
-            self.password_entry.setText("123")
-        except Exception as e:
-            QMessageBox.critical(self, "Database Error", f"Registration error: {str(e)}")
+    def register_finished(self, email, created):
+        if not created:
+            QMessageBox.warning(self, "Email Exists", "This email is already registered. Please login instead.")
+            return
+        QMessageBox.information(self, "Success",
+                                f"Account created successfully!\n\nEmail: {email}\nPassword: 123\n\nYou can now login.")
+        self.password_entry.setText("123")
 
 
 # ----------------------- ADMIN LOGIN -----------------------
@@ -484,6 +556,7 @@ class AdminLogin(QDialog):
         login_btn.setMinimumHeight(45)
         login_btn.clicked.connect(self.login_admin)
         layout.addWidget(login_btn)
+        self.login_btn = login_btn
 
         # Info label
         info_label = QLabel("Default credentials: admin / admin123")
@@ -495,6 +568,13 @@ class AdminLogin(QDialog):
         self.password_entry.returnPressed.connect(self.login_admin)
         self.username_entry.setFocus()
 
+        self.executor = QueryExecutor(self)
+        self.executor.busy_changed.connect(self.set_busy)
+
+    def set_busy(self, busy):
+        self.login_btn.setEnabled(not busy)
+        self.login_btn.setText("Please wait..." if busy else "Login to Admin Dashboard")
+
     def login_admin(self):
         username = self.username_entry.text().strip()
         password = self.password_entry.text().strip()
@@ -503,24 +583,214 @@ class AdminLogin(QDialog):
             QMessageBox.warning(self, "Missing Information", "Please enter both username and password.")
             return
 
-        try:
-            db = get_db_connection()
-            if db is None:
-                QMessageBox.critical(self, "Database Error", "Cannot connect to database.")
-                return
-            cursor = db.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM admin_accounts WHERE username=%s AND password=%s", (username, password))
-            admin = cursor.fetchone()
-            db.close()
-
-            if admin:
-                QMessageBox.information(self, "Login Successful", f"Welcome back, {username}!")
-                self.accept()
-            else:
-                QMessageBox.critical(self, "Login Failed",
-                                     "Invalid username or password.\n\nDefault credentials:\nUsername: admin\nPassword: admin123")
-        except Exception as e:
-            QMessageBox.critical(self, "Database Error", f"Login error: {str(e)}")
+        self.executor.submit("login", authenticate_admin, username, password,
+                             on_result=lambda ok: self.login_finished(username, ok),
+                             on_error=lambda error: show_database_error(self, "Login error", error))
+
+    def login_finished(self, username, ok):
+        if ok:
+            QMessageBox.information(self, "Login Successful", f"Welcome back, {username}!")
+            self.accept()
+        else:
+            QMessageBox.critical(self, "Login Failed",
+                                 "Invalid username or password.\n\nDefault credentials:\nUsername: admin\nPassword: admin123")
+
+
+# ----------------------- TABLE MODELS -----------------------
+STATUS_COLORS = {
+    "Complete": QColor("#d4edda"),
+    "Booked": QColor("#d1ecf1"),
+    "Pending": QColor("#fff3cd"),
+    "Cancelled": QColor("#f8d7da")
+}
+
+TABLE_PAGE_SIZE = 200
+
+
+class LazySqlTableModel(QAbstractTableModel):
+    """Read-only view of one table, fetched page by page with keyset pagination as the view scrolls.
+
+    Rows are kept as plain tuples with the primary key first; nothing is
+    materialized per cell, and status colours come from the shared STATUS_COLORS.
+    """
+
+    def __init__(self, executor, table, columns, headers, sort_column, descending=False,
+                 status_column=None, formatters=None, page_size=TABLE_PAGE_SIZE, parent=None):
+        super().__init__(parent)
+        self.executor = executor
+        self.table = table
+        self.columns = columns
+        self.headers = headers
+        self.sort_column = sort_column
+        self.descending = descending
+        self.status_column = status_column
+        self.formatters = formatters or {}
+        self.page_size = page_size
+        self._sort_index = columns.index(sort_column) + 1
+        self._rows = []
+        self._row_by_id = {}
+        self._exhausted = True  # nothing to fetch until the first reload()
+        self._fetching = False
+        self._generation = 0  # bumped by reload() so late pages from an older load are dropped
+        self.conditions = []  # [(sql, params)] from grid_filter_conditions()
+
+    # -- Qt model interface --
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        value = self._rows[index.row()][index.column() + 1]
+        if role == Qt.ItemDataRole.DisplayRole:
+            formatter = self.formatters.get(index.column())
+            return formatter(value) if formatter else str(value)
+        if role == Qt.ItemDataRole.BackgroundRole and index.column() == self.status_column:
+            return STATUS_COLORS.get(value)
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted and not self._fetching
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self._fetching = True
+        generation = self._generation
+        self.executor.submit(f"{self.table}:more", self.fetch_page, self._rows[-1] if self._rows else None,
+                             self.conditions,
+                             on_result=lambda rows: self._page_loaded(generation, rows, False),
+                             on_error=lambda error: self._page_failed(generation, error, None))
+
+    # -- Loading --
+    def reload(self, on_error=None, use_cache=False):
+        """Drop loaded rows and fetch the first page in the background"""
+        key = f"{self.table}:reload"
+        if self.executor.is_running(key) and not use_cache:
+            return
+        self.executor.cancel(f"{self.table}:more")
+        self._generation += 1
+        self._fetching = True
+        generation = self._generation
+        self.executor.submit(key, self.fetch_page, None, self.conditions, use_cache,
+                             on_result=lambda rows: self._page_loaded(generation, rows, True),
+                             on_error=lambda error: self._page_failed(generation, error, on_error))
+
+    def _page_loaded(self, generation, rows, reset):
+        if generation != self._generation:
+            return
+        self._fetching = False
+        if reset:
+            self.beginResetModel()
+            self._rows = []
+            self._row_by_id = {}
+            self._exhausted = False
+            self.endResetModel()
+        if len(rows) < self.page_size:
+            self._exhausted = True
+        if rows:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            self._rows.extend(rows)
+            for offset, row in enumerate(rows):
+                self._row_by_id[row[0]] = first + offset
+            self.endInsertRows()
+
+    def _page_failed(self, generation, error, on_error):
+        if generation != self._generation:
+            return
+        self._fetching = False
+        if on_error is not None:
+            on_error(error)
+        else:
+            # Stop asking for more until the next reload instead of retrying on every scroll
+            print(f"[{self.table}] Error fetching rows: {error}")
+            self._exhausted = True
+
+    def set_conditions(self, conditions):
+        """Apply search/filter conditions and reload, serving repeated searches from grid_query_cache"""
+        self.conditions = conditions
+        self.reload(use_cache=True)
+
+    def fetch_page(self, after, conditions=(), use_cache=False):
+        """Runs on a worker thread: only reads the query definition, never the loaded rows"""
+        if after is not None:
+            after = (after[self._sort_index], after[0])
+        return fetch_grid_page(self.table, self.columns, self.sort_column, self.descending,
+                               after, conditions, self.page_size, use_cache=use_cache)
+
+    # -- Live updates --
+    def _sorts_before(self, row, other):
+        # Same order as the ORDER BY in grid_page_query: NULL keys first ascending, last descending
+        key = (row[self._sort_index] is not None, row[self._sort_index], row[0])
+        other_key = (other[self._sort_index] is not None, other[self._sort_index], other[0])
+        return key > other_key if self.descending else key < other_key
+
+    def apply_changes(self, rows):
+        """Merge rows from the change feed: loaded rows are replaced, new rows inserted in sort order"""
+        last_column = len(self.columns) - 1
+        for row in rows:
+            position = self._row_by_id.get(row[0])
+            if position is not None:
+                self._rows[position] = row
+                self.dataChanged.emit(self.index(position, 0), self.index(position, last_column))
+                continue
+            position = next((i for i, loaded in enumerate(self._rows) if self._sorts_before(row, loaded)),
+                            len(self._rows))
+            if position == len(self._rows) and not self._exhausted:
+                continue  # sorts past the loaded pages; keyset paging will reach it
+            self.beginInsertRows(QModelIndex(), position, position)
+            self._rows.insert(position, row)
+            self.endInsertRows()
+            # Rows below moved down one; later rows in this batch look their position up here
+            self._row_by_id = {row[0]: position for position, row in enumerate(self._rows)}
+
+    # -- Row access for the admin actions --
+    def row_id(self, row):
+        return self._rows[row][0]
+
+    def value(self, row, column):
+        return self._rows[row][column + 1]
+
+    def patch_value(self, row_id, column, value):
+        """Update one cell of an already-loaded row in place and repaint just that cell"""
+        row = self._row_by_id.get(row_id)
+        if row is None:
+            return False
+        values = list(self._rows[row])
+        values[column + 1] = value
+        self._rows[row] = tuple(values)
+        index = self.index(row, column)
+        self.dataChanged.emit(index, index)
+        return True
+
+
+def create_table_view():
+    table = QTableView()
+    table.setStyleSheet("""
+        QTableView {
+            background-color: white;
+            color: #333333;
+            gridline-color: #d0d0d0;
+            font-size: 13px;
+        }
+        QHeaderView::section {
+            background-color: #007acc;
+            color: white;
+            padding: 8px;
+            font-weight: bold;
+        }
+    """)
+    table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+    return table
 
 
 # ----------------------- ADMIN DASHBOARD -----------------------
@@ -542,6 +812,20 @@ class AdminDashboard(QMainWindow):
         layout = QVBoxLayout(central_widget)
         layout.setContentsMargins(20, 20, 20, 20)
 
+        # Database work runs on worker threads; the status bar shows when it is busy
+        self.executor = QueryExecutor(self)
+        self.executor.busy_changed.connect(self.show_busy)
+
+        # Change polling has its own executor so it never flashes the busy indicator
+        self.change_poller = QueryExecutor(self)
+        self.change_marks = {}
+        self.live_models = {}
+        self.change_timer = QTimer(self)
+        self.change_timer.timeout.connect(self.poll_changes)
+        if CHANGE_POLL_INTERVAL > 0:
+            self.poll_changes()
+            self.change_timer.start(int(CHANGE_POLL_INTERVAL * 1000))
+
         # Header
         header = QLabel("Admin Dashboard")
         header.setStyleSheet("""
@@ -577,21 +861,29 @@ class AdminDashboard(QMainWindow):
             }
         """)
 
-        # Dashboard Overview tab
-        overview_tab = self.create_overview_tab()
-        tabs.addTab(overview_tab, "Dashboard")
-
-        # Patients tab
-        patients_tab = self.create_patients_tab()
-        tabs.addTab(patients_tab, "Patients")
-
-        # Appointments tab
-        appointments_tab = self.create_appointments_tab()
-        tabs.addTab(appointments_tab, "Appointments")
-
-        # Payments tab
-        payments_tab = self.create_payments_tab()
-        tabs.addTab(payments_tab, "Payments")
+        # Each tab starts as an empty page and is built on first selection
+        self.tabs = tabs
+        self.tab_builders = [
+            ("Dashboard", self.create_overview_tab),
+            ("Patients", self.create_patients_tab),
+            ("Appointments", self.create_appointments_tab),
+            ("Payments", self.create_payments_tab),
+            ("Analytics", self.create_analytics_tab),
+            ("Diagnostics", self.create_diagnostics_tab)
+        ]
+        self.built_tabs = set()
+        for title, _ in self.tab_builders:
+            page = QWidget()
+            page_layout = QVBoxLayout(page)
+            page_layout.setContentsMargins(0, 0, 0, 0)
+            tabs.addTab(page, title)
+
+        if FAST_START:
+            tabs.currentChanged.connect(self.ensure_tab_built)
+            self.ensure_tab_built(tabs.currentIndex())
+        else:
+            for index in range(len(self.tab_builders)):
+                self.ensure_tab_built(index)
 
         layout.addWidget(tabs)
 
@@ -614,6 +906,15 @@ class AdminDashboard(QMainWindow):
         logout_btn.clicked.connect(self.logout)
         layout.addWidget(logout_btn)
 
+    def ensure_tab_built(self, index):
+        if index < 0 or index in self.built_tabs:
+            return
+        self.built_tabs.add(index)
+        title, builder = self.tab_builders[index]
+        started = time.perf_counter()
+        self.tabs.widget(index).layout().addWidget(builder())
+        print(f"Built '{title}' tab in {(time.perf_counter() - started) * 1000:.1f} ms")
+
     def create_overview_tab(self):
         widget = QWidget()
         layout = QVBoxLayout()
@@ -621,39 +922,16 @@ class AdminDashboard(QMainWindow):
         # Statistics cards
         stats_layout = QHBoxLayout()
 
-        try:
-            db = get_db_connection()
-            cursor = db.cursor()
-
-            # Get statistics
-            cursor.execute("SELECT COUNT(*) FROM patients")
-            total_patients = cursor.fetchone()[0]
-
-            cursor.execute("SELECT COUNT(*) FROM appointments")
-            total_appointments = cursor.fetchone()[0]
-
-            cursor.execute("SELECT SUM(amount) FROM payments")
-            total_revenue = cursor.fetchone()[0] or 0
-
-            cursor.execute("SELECT COUNT(*) FROM appointments WHERE status = 'Booked'")
-            pending_appointments = cursor.fetchone()[0]
-
-            db.close()
-        except:
-            total_patients = 0
-            total_appointments = 0
-            total_revenue = 0
-            pending_appointments = 0
-
-        # Create stat cards
+        # Create stat cards; values are filled in when the stats query returns
         cards = [
-            ("Total Patients", str(total_patients), "#007acc"),
-            ("Total Appointments", str(total_appointments), "#28a745"),
-            ("Total Revenue", f"PHP {total_revenue:,.2f}", "#ffc107"),
-            ("Pending", str(pending_appointments), "#dc3545")
+            ("total_patients", "Total Patients", "#007acc"),
+            ("total_appointments", "Total Appointments", "#28a745"),
+            ("total_revenue", "Total Revenue", "#ffc107"),
+            ("pending_appointments", "Pending", "#dc3545")
         ]
 
-        for title, value, color in cards:
+        self.stat_labels = {}
+        for key, title, color in cards:
             card = QFrame()
             card.setStyleSheet(f"""
                 QFrame {{
@@ -668,9 +946,10 @@ class AdminDashboard(QMainWindow):
             title_label.setStyleSheet("color: white; font-size: 14px; font-weight: bold;")
             title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
-            value_label = QLabel(value)
+            value_label = QLabel("...")
             value_label.setStyleSheet("color: white; font-size: 24px; font-weight: bold;")
             value_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            self.stat_labels[key] = value_label
 
             card_layout.addWidget(title_label)
             card_layout.addWidget(value_label)
@@ -678,69 +957,39 @@ class AdminDashboard(QMainWindow):
 
         layout.addLayout(stats_layout)
 
-        # Charts
+        # Charts: appointment status pie and monthly revenue bars (figures are shared across windows)
         charts_layout = QHBoxLayout()
-
-        # Appointment Status Chart
-        fig1 = Figure(figsize=(6, 4))
-        canvas1 = FigureCanvas(fig1)
-        ax1 = fig1.add_subplot(111)
-
-        try:
-            db = get_db_connection()
-            cursor = db.cursor()
-            cursor.execute("SELECT status, COUNT(*) FROM appointments GROUP BY status")
-            status_data = cursor.fetchall()
-            db.close()
-
-            if status_data:
-                statuses = [row[0] for row in status_data]
-                counts = [row[1] for row in status_data]
-                colors_chart = ['#007acc', '#28a745', '#ffc107', '#dc3545']
-                ax1.pie(counts, labels=statuses, autopct='%1.1f%%', colors=colors_chart[:len(statuses)])
-                ax1.set_title('Appointment Status Distribution')
-        except:
-            ax1.text(0.5, 0.5, 'No data available', ha='center', va='center')
-
-        charts_layout.addWidget(canvas1)
-
-        # Revenue Chart
-        fig2 = Figure(figsize=(6, 4))
-        canvas2 = FigureCanvas(fig2)
-        ax2 = fig2.add_subplot(111)
-
-        try:
-            db = get_db_connection()
-            cursor = db.cursor()
-            cursor.execute("""
-                SELECT DATE_FORMAT(date_paid, '%Y-%m') as month, SUM(amount) 
-                FROM payments 
-                GROUP BY month 
-                ORDER BY month DESC 
-                LIMIT 6
-            """)
-            revenue_data = cursor.fetchall()
-            db.close()
-
-            if revenue_data:
-                months = [row[0] for row in reversed(revenue_data)]
-                amounts = [float(row[1]) for row in reversed(revenue_data)]
-                ax2.bar(months, amounts, color='#007acc')
-                ax2.set_title('Monthly Revenue')
-                ax2.set_xlabel('Month')
-                ax2.set_ylabel('Revenue (PHP)')
-                ax2.tick_params(axis='x', rotation=45)
-        except:
-            ax2.text(0.5, 0.5, 'No data available', ha='center', va='center')
-
-        fig2.tight_layout()
-        charts_layout.addWidget(canvas2)
+        for chart in dashboard_charts.values():
+            charts_layout.addWidget(chart.attach(chart_backend()))
 
         layout.addLayout(charts_layout)
 
         widget.setLayout(layout)
+
+        self.executor.submit("overview", get_dashboard_stats,
+                             on_result=self.show_overview_stats,
+                             on_error=lambda error: self.show_overview_stats(None))
         return widget
 
+    def show_overview_stats(self, stats):
+        if stats is None:
+            stats = {
+                "total_patients": 0,
+                "total_appointments": 0,
+                "total_revenue": 0,
+                "pending_appointments": 0,
+                "status_counts": [],
+                "monthly_revenue": []
+            }
+
+        self.stat_labels["total_patients"].setText(str(stats["total_patients"]))
+        self.stat_labels["total_appointments"].setText(str(stats["total_appointments"]))
+        self.stat_labels["total_revenue"].setText(f"PHP {stats['total_revenue']:,.2f}")
+        self.stat_labels["pending_appointments"].setText(str(stats["pending_appointments"]))
+
+        for name, chart in dashboard_charts.items():
+            chart.show(stats[name])
+
     def create_patients_tab(self):
         widget = QWidget()
         layout = QVBoxLayout()
@@ -764,6 +1013,7 @@ class AdminDashboard(QMainWindow):
         """)
         refresh_btn.clicked.connect(lambda: self.load_patients_table(table))
         btn_layout.addWidget(refresh_btn)
+        btn_layout.addWidget(self.create_export_button("patients"))
 
         btn_layout.addStretch()
 
@@ -787,21 +1037,15 @@ class AdminDashboard(QMainWindow):
         layout.addLayout(btn_layout)
 
         # Table
-        table = QTableWidget()
-        table.setStyleSheet("""
-            QTableWidget {
-                background-color: white;
-                color: #333333;
-                gridline-color: #d0d0d0;
-                font-size: 13px;
-            }
-            QHeaderView::section {
-                background-color: #007acc;
-                color: white;
-                padding: 8px;
-                font-weight: bold;
-            }
-        """)
+        table = create_table_view()
+        table.setModel(LazySqlTableModel(
+            self.executor, "patients", ["name", "birth_date", "demographic_type", "contact", "type"],
+            ["Name", "Birth Date", "Type", "Contact", "Status"],
+            sort_column="name", status_column=4, parent=table))
+        self.live_models["patients"] = table.model()
+        layout.addLayout(self.create_filter_bar(
+            table.model(), "Search by name or contact number...",
+            [("type", "Statuses", PATIENT_STATUSES)]))
         layout.addWidget(table)
 
         self.load_patients_table(table)
@@ -810,47 +1054,21 @@ class AdminDashboard(QMainWindow):
         return widget
 
     def load_patients_table(self, table):
-        try:
-            db = get_db_connection()
-            if db is None:
-                QMessageBox.critical(self, "Database Error", "Cannot connect to database.")
-                return
-            cursor = db.cursor()
-            cursor.execute(
-                "SELECT name, birth_date, demographic_type, contact, type FROM patients ORDER BY name")
-            patients = cursor.fetchall()
-            db.close()
-
-            table.setRowCount(len(patients))
-            table.setColumnCount(5)
-            table.setHorizontalHeaderLabels(["Name", "Birth Date", "Type", "Contact", "Status"])
-
-            for row_idx, row_data in enumerate(patients):
-                for col_idx, value in enumerate(row_data):
-                    item = QTableWidgetItem(str(value))
-                    if col_idx == 4:
-                        if value == "Complete":
-                            item.setBackground(QColor("#d4edda"))
-                        elif value == "Pending":
-                            item.setBackground(QColor("#fff3cd"))
-                        elif value == "Cancelled":
-                            item.setBackground(QColor("#f8d7da"))
-                    table.setItem(row_idx, col_idx, item)
-
-            table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        except Exception as e:
-            QMessageBox.critical(self, "Database Error", f"Error loading patients: {str(e)}")
+        table.model().reload(
+            on_error=lambda error: show_database_error(self, "Error loading patients", error))
 
     def edit_patient_status(self, table):
-        current_row = table.currentRow()
+        current_row = table.currentIndex().row()
         if current_row < 0:
             QMessageBox.warning(self, "No Selection", "Please select a patient to edit.")
             return
 
-        patient_name = table.item(current_row, 0).text()
-        current_status = table.item(current_row, 4).text()
+        model = table.model()
+        patient_id = model.row_id(current_row)
+        patient_name = model.value(current_row, 0)
+        current_status = model.value(current_row, 4)
 
-        statuses = ["Pending", "Complete", "Cancelled"]
+        statuses = PATIENT_STATUSES
         new_status, ok = QInputDialog.getItem(
             self, "Edit Patient Status",
             f"Change status for {patient_name}:",
@@ -858,16 +1076,22 @@ class AdminDashboard(QMainWindow):
         )
 
         if ok and new_status:
-            try:
-                db = get_db_connection()
-                cursor = db.cursor()
-                cursor.execute("UPDATE patients SET type = %s WHERE name = %s", (new_status, patient_name))
-                db.commit()
-                db.close()
-                QMessageBox.information(self, "Success", f"Patient status updated to: {new_status}")
-                self.load_patients_table(table)
-            except Exception as e:
-                QMessageBox.critical(self, "Database Error", f"Error updating status: {str(e)}")
+            self.executor.submit(f"patient_status:{patient_id}", update_patient_status, patient_id, new_status,
+                                 on_result=lambda status: self.status_updated(model, patient_id, status,
+                                                                              "Patient status updated to"),
+                                 on_error=lambda error: self.status_update_failed(error))
+
+    def status_updated(self, model, row_id, new_status, message):
+        # One indexed write, one repainted cell: no table reload
+        grid_query_cache.invalidate(model.table)
+        model.patch_value(row_id, 4, new_status)
+        QMessageBox.information(self, "Success", f"{message}: {new_status}")
+
+    def status_update_failed(self, error):
+        if isinstance(error, LookupError):
+            QMessageBox.warning(self, "Not Found", str(error))
+        else:
+            show_database_error(self, "Error updating status", error)
 
     def create_appointments_tab(self):
         widget = QWidget()
@@ -892,6 +1116,7 @@ class AdminDashboard(QMainWindow):
         """)
         refresh_btn.clicked.connect(lambda: self.load_appointments_table(table))
         btn_layout.addWidget(refresh_btn)
+        btn_layout.addWidget(self.create_export_button("appointments"))
 
         btn_layout.addStretch()
 
@@ -915,21 +1140,15 @@ class AdminDashboard(QMainWindow):
         layout.addLayout(btn_layout)
 
         # Table
-        table = QTableWidget()
-        table.setStyleSheet("""
-            QTableWidget {
-                background-color: white;
-                color: #333333;
-                gridline-color: #d0d0d0;
-                font-size: 13px;
-            }
-            QHeaderView::section {
-                background-color: #007acc;
-                color: white;
-                padding: 8px;
-                font-weight: bold;
-            }
-        """)
+        table = create_table_view()
+        table.setModel(LazySqlTableModel(
+            self.executor, "appointments", ["patient_name", "date", "time_slot", "services", "status"],
+            ["Patient", "Date", "Time", "Services", "Status"],
+            sort_column="date", descending=True, status_column=4, parent=table))
+        self.live_models["appointments"] = table.model()
+        layout.addLayout(self.create_filter_bar(
+            table.model(), "Search by patient name...",
+            [("status", "Statuses", APPOINTMENT_STATUSES), ("time_slot", "Times", TIME_SLOTS)], "Date range"))
         layout.addWidget(table)
 
         self.load_appointments_table(table)
@@ -938,50 +1157,22 @@ class AdminDashboard(QMainWindow):
         return widget
 
     def load_appointments_table(self, table):
-        try:
-            db = get_db_connection()
-            if db is None:
-                QMessageBox.critical(self, "Database Error", "Cannot connect to database.")
-                return
-            cursor = db.cursor()
-            cursor.execute(
-                "SELECT patient_name, date, time_slot, services, status FROM appointments ORDER BY date DESC")
-            appointments = cursor.fetchall()
-            db.close()
-
-            table.setRowCount(len(appointments))
-            table.setColumnCount(5)
-            table.setHorizontalHeaderLabels(["Patient", "Date", "Time", "Services", "Status"])
-
-            for row_idx, row_data in enumerate(appointments):
-                for col_idx, value in enumerate(row_data):
-                    item = QTableWidgetItem(str(value))
-                    if col_idx == 4:
-                        if value == "Complete":
-                            item.setBackground(QColor("#d4edda"))
-                        elif value == "Booked":
-                            item.setBackground(QColor("#d1ecf1"))
-                        elif value == "Pending":
-                            item.setBackground(QColor("#fff3cd"))
-                        elif value == "Cancelled":
-                            item.setBackground(QColor("#f8d7da"))
-                    table.setItem(row_idx, col_idx, item)
-
-            table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        except Exception as e:
-            QMessageBox.critical(self, "Database Error", f"Error loading appointments: {str(e)}")
+        table.model().reload(
+            on_error=lambda error: show_database_error(self, "Error loading appointments", error))
 
     def edit_appointment_status(self, table):
-        current_row = table.currentRow()
+        current_row = table.currentIndex().row()
         if current_row < 0:
             QMessageBox.warning(self, "No Selection", "Please select an appointment to edit.")
             return
 
-        patient_name = table.item(current_row, 0).text()
-        appt_date = table.item(current_row, 1).text()
-        current_status = table.item(current_row, 4).text()
+        model = table.model()
+        appointment_id = model.row_id(current_row)
+        patient_name = model.value(current_row, 0)
+        appt_date = model.value(current_row, 1)
+        current_status = model.value(current_row, 4)
 
-        statuses = ["Booked", "Pending", "Complete", "Cancelled"]
+        statuses = APPOINTMENT_STATUSES
         new_status, ok = QInputDialog.getItem(
             self, "Edit Appointment Status",
             f"Change status for {patient_name} ({appt_date}):",
@@ -989,17 +1180,11 @@ class AdminDashboard(QMainWindow):
         )
 
         if ok and new_status:
-            try:
-                db = get_db_connection()
-                cursor = db.cursor()
-                cursor.execute("UPDATE appointments SET status = %s WHERE patient_name = %s AND date = %s",
-                               (new_status, patient_name, appt_date))
-                db.commit()
-                db.close()
-                QMessageBox.information(self, "Success", f"Appointment status updated to: {new_status}")
-                self.load_appointments_table(table)
-            except Exception as e:
-                QMessageBox.critical(self, "Database Error", f"Error updating status: {str(e)}")
+            self.executor.submit(f"appointment_status:{appointment_id}", update_appointment_status,
+                                 appointment_id, new_status,
+                                 on_result=lambda status: self.status_updated(model, appointment_id, status,
+                                                                              "Appointment status updated to"),
+                                 on_error=lambda error: self.status_update_failed(error))
 
     def create_payments_tab(self):
         widget = QWidget()
@@ -1022,61 +1207,324 @@ class AdminDashboard(QMainWindow):
         """)
         refresh_btn.clicked.connect(lambda: self.load_payments_table(table))
         layout.addWidget(refresh_btn)
+        layout.addWidget(self.create_export_button("payments"))
 
         # Table
-        table = QTableWidget()
-        table.setStyleSheet("""
-            QTableWidget {
-                background-color: white;
-                color: #333333;
-                gridline-color: #d0d0d0;
-                font-size: 13px;
+        table = create_table_view()
+        table.setModel(LazySqlTableModel(
+            self.executor, "payments", ["appointment_id", "amount", "method", "date_paid"],
+            ["Appointment ID", "Amount", "Method", "Date Paid"],
+            sort_column="date_paid", descending=True,
+            formatters={1: lambda value: f"PHP {float(value or 0):,.2f}"}, parent=table))
+        self.live_models["payments"] = table.model()
+        layout.addLayout(self.create_filter_bar(
+            table.model(), "Search by appointment ID or method...",
+            [("method", "Methods", PAYMENT_METHODS)], "Paid between"))
+        layout.addWidget(table)
+
+        self.load_payments_table(table)
+
+        widget.setLayout(layout)
+        return widget
+
+    def load_payments_table(self, table):
+        table.model().reload(
+            on_error=lambda error: show_database_error(self, "Error loading payments", error))
+
+    def create_analytics_tab(self):
+        widget = QWidget()
+        layout = QVBoxLayout()
+
+        btn_layout = QHBoxLayout()
+        refresh_btn = QPushButton("Refresh Analytics")
+        refresh_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #007acc;
+                color: white;
+                font-size: 14px;
+                font-weight: bold;
+                padding: 10px;
+                border-radius: 5px;
             }
-            QHeaderView::section {
+            QPushButton:hover {
+                background-color: #005fa3;
+            }
+        """)
+        refresh_btn.clicked.connect(lambda: self.load_analytics(0))
+        btn_layout.addWidget(refresh_btn)
+        btn_layout.addStretch()
+        self.analytics_rates = QLabel("Loading analytics...")
+        self.analytics_rates.setStyleSheet("font-size: 14px; font-weight: bold; color: #333333;")
+        btn_layout.addWidget(self.analytics_rates)
+        layout.addLayout(btn_layout)
+
+        grid = QGridLayout()
+        self.analytics_tables = {}
+        panels = [
+            ("revenue_by_service", "Revenue by Service", 0, 0),
+            ("revenue_by_discount_class", "Revenue by Discount Class", 0, 1),
+            ("revenue_by_time_slot", "Revenue by Time Slot", 1, 0),
+            ("cohort_retention", "Cohort Retention (months after first visit)", 1, 1)
+        ]
+        for key, title, row, column in panels:
+            group = QGroupBox(title)
+            group.setStyleSheet("QGroupBox { font-weight: bold; color: #007acc; }")
+            group_layout = QVBoxLayout(group)
+            table = QTableWidget()
+            table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+            table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+            table.verticalHeader().setVisible(False)
+            group_layout.addWidget(table)
+            self.analytics_tables[key] = table
+            grid.addWidget(group, row, column)
+        layout.addLayout(grid)
+
+        widget.setLayout(layout)
+        self.load_analytics()
+        return widget
+
+    def load_analytics(self, max_age=ANALYTICS_TTL):
+        self.executor.submit("analytics", get_analytics, max_age,
+                             on_result=self.show_analytics,
+                             on_error=lambda error: self.analytics_rates.setText(
+                                 "Analytics are unavailable right now."))
+
+    def show_analytics(self, analytics):
+        rates = analytics["rates"]
+        self.analytics_rates.setText(
+            f"Past appointments: {rates['past_appointments']}   "
+            f"Completed: {rates['completion_rate']:.1%}   "
+            f"Cancelled: {rates['cancellation_rate']:.1%}   "
+            f"No-show: {rates['no_show_rate']:.1%}")
+        for key, table in self.analytics_tables.items():
+            self.fill_frame_table(table, analytics[key])
+
+    def fill_frame_table(self, table, frame):
+        table.clear()
+        table.setRowCount(len(frame))
+        table.setColumnCount(len(frame.columns))
+        table.setHorizontalHeaderLabels([
+            f"+{column}m" if isinstance(column, int) else str(column).replace("_", " ").title()
+            for column in frame.columns])
+        for column_index, column in enumerate(frame.columns):
+            for row_index, value in enumerate(frame[column].tolist()):
+                if isinstance(column, int):
+                    text = f"{value:.0%}" if value == value else ""  # NaN: month not reached yet
+                elif column in ("revenue", "booked_value"):
+                    text = f"PHP {value:,.2f}"
+                else:
+                    text = str(value)
+                table.setItem(row_index, column_index, QTableWidgetItem(text))
+
+    def create_diagnostics_tab(self):
+        widget = QWidget()
+        layout = QVBoxLayout()
+
+        btn_layout = QHBoxLayout()
+        refresh_btn = QPushButton("Refresh")
+        refresh_btn.setStyleSheet("""
+            QPushButton {
                 background-color: #007acc;
                 color: white;
-                padding: 8px;
+                font-size: 14px;
                 font-weight: bold;
+                padding: 10px;
+                border-radius: 5px;
+            }
+            QPushButton:hover {
+                background-color: #005fa3;
             }
         """)
-        layout.addWidget(table)
+        refresh_btn.clicked.connect(self.show_diagnostics)
+        btn_layout.addWidget(refresh_btn)
+        reset_btn = QPushButton("Reset Counters")
+        reset_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #6c757d;
+                color: white;
+                font-size: 14px;
+                font-weight: bold;
+                padding: 10px;
+                border-radius: 5px;
+            }
+            QPushButton:hover {
+                background-color: #5a6268;
+            }
+        """)
+        reset_btn.clicked.connect(lambda: (query_stats.reset(), self.show_diagnostics()))
+        btn_layout.addWidget(reset_btn)
+        btn_layout.addStretch()
+        layout.addLayout(btn_layout)
 
-        self.load_payments_table(table)
+        self.diagnostics_summary = QLabel()
+        self.diagnostics_summary.setStyleSheet("font-size: 13px; color: #333333; padding: 5px;")
+        self.diagnostics_summary.setWordWrap(True)
+        layout.addWidget(self.diagnostics_summary)
+
+        self.diagnostics_table = QTableWidget()
+        self.diagnostics_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.diagnostics_table.verticalHeader().setVisible(False)
+        self.diagnostics_table.setColumnCount(8)
+        self.diagnostics_table.setHorizontalHeaderLabels(
+            ["Statement", "Calls", "Errors", "Mean ms", "p95 ms", "Max ms", "Rows", "Actions"])
+        header = self.diagnostics_table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.diagnostics_table)
 
         widget.setLayout(layout)
+        self.show_diagnostics()
         return widget
 
-    def load_payments_table(self, table):
-        try:
-            db = get_db_connection()
-            if db is None:
-                QMessageBox.critical(self, "Database Error", "Cannot connect to database.")
-                return
-            cursor = db.cursor()
-            cursor.execute("SELECT appointment_id, amount, method, date_paid FROM payments ORDER BY date_paid DESC")
-            payments = cursor.fetchall()
-            db.close()
-
-            table.setRowCount(len(payments))
-            table.setColumnCount(4)
-            table.setHorizontalHeaderLabels(["Appointment ID", "Amount", "Method", "Date Paid"])
-
-            for row_idx, row_data in enumerate(payments):
-                for col_idx, value in enumerate(row_data):
-                    if col_idx == 1:
-                        item = QTableWidgetItem(f"PHP {float(value):,.2f}")
-                    else:
-                        item = QTableWidgetItem(str(value))
-                    table.setItem(row_idx, col_idx, item)
+    def show_diagnostics(self):
+        # In-process counters only: reading them never touches the database
+        snapshot = query_stats.snapshot()
+        pool = get_db_pool().stats()
+        acquire = snapshot["acquire"]
+        cache = entity_cache.stats()
+        self.diagnostics_summary.setText(
+            f"Connections: {pool['in_use']} in use, {pool['idle']} idle of {pool['size']}; "
+            f"{pool['checkouts']} checkouts, {pool['waits']} waits, {pool['timeouts']} timeouts.   "
+            f"Acquire: mean {acquire['mean_ms']:.1f} ms, p95 \u2264 {acquire['p95_ms']:.0f} ms.   "
+            f"{snapshot['slow']} statements slower than {SLOW_QUERY_MS:.0f} ms (logged to {SLOW_QUERY_LOG}).   "
+            f"Database {pool['breaker']} ({pool['breaker_trips']} outages), "
+            f"{write_journal.count()} writes queued offline.   "
+            f"Patient cache: {cache['hits']} hits, {cache['misses']} misses ({cache['hit_ratio']:.0%}), "
+            f"{cache['entries']} of {cache['size']} entries.")
+
+        statements = snapshot["statements"]
+        self.diagnostics_table.setRowCount(len(statements))
+        for row_index, row in enumerate(statements):
+            actions = ", ".join(f"{action} ({count})" for action, count in row["actions"].items())
+            values = [row["statement"], str(row["calls"]), str(row["errors"]), f"{row['mean_ms']:.1f}",
+                      f"\u2264 {row['p95_ms']:.0f}", f"{row['max_ms']:.1f}", str(row["rows"]), actions]
+            for column_index, text in enumerate(values):
+                item = QTableWidgetItem(text)
+                if column_index == 0:
+                    item.setToolTip(text)
+                if column_index == 5 and row["max_ms"] >= SLOW_QUERY_MS:
+                    item.setForeground(QColor("#dc3545"))
+                self.diagnostics_table.setItem(row_index, column_index, item)
+
+    def create_filter_bar(self, model, placeholder, filters, date_label=None):
+        """Search box, filter combos and an optional date range; changes re-query the grid after a short pause"""
+        bar = QHBoxLayout()
+        search = QLineEdit()
+        search.setPlaceholderText(placeholder)
+        search.setClearButtonEnabled(True)
+        search.setStyleSheet("padding: 8px; font-size: 14px; background-color: white; color: #333333;")
+        bar.addWidget(search, 2)
+
+        # Debounce: typing restarts the timer, the query runs once input pauses
+        timer = QTimer(self)
+        timer.setSingleShot(True)
+        timer.setInterval(GRID_SEARCH_DELAY_MS)
+        search.textChanged.connect(lambda _: timer.start())
+
+        combos = {}
+        for column, label, values in filters:
+            combo = QComboBox()
+            combo.addItem(f"All {label}")
+            combo.addItems(values)
+            combo.currentIndexChanged.connect(lambda _: timer.start())
+            bar.addWidget(combo)
+            combos[column] = combo
+
+        date_check = from_date = to_date = None
+        if date_label is not None:
+            date_check = QCheckBox(date_label)
+            from_date = QDateEdit(QDate.currentDate().addMonths(-1))
+            to_date = QDateEdit(QDate.currentDate())
+            for widget in (date_check, from_date, to_date):
+                bar.addWidget(widget)
+            for date_edit in (from_date, to_date):
+                date_edit.setCalendarPopup(True)
+                date_edit.dateChanged.connect(lambda _: date_check.isChecked() and timer.start())
+            date_check.toggled.connect(lambda _: timer.start())
+
+        def apply_filters():
+            equals = {column: combo.currentText() for column, combo in combos.items() if combo.currentIndex() > 0}
+            date_range = None
+            if date_check is not None and date_check.isChecked():
+                date_range = (from_date.date().toPyDate(), to_date.date().toPyDate())
+            model.set_conditions(grid_filter_conditions(model.table, search.text(), equals, date_range))
+
+        timer.timeout.connect(apply_filters)
+        return bar
+
+    def create_export_button(self, table_name):
+        export_btn = QPushButton("Export")
+        export_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #28a745;
+                color: white;
+                font-size: 14px;
+                font-weight: bold;
+                padding: 10px;
+                border-radius: 5px;
+            }
+            QPushButton:hover {
+                background-color: #218838;
+            }
+        """)
+        export_btn.clicked.connect(lambda: self.export_table_dialog(table_name))
+        return export_btn
 
-            table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        except Exception as e:
-            QMessageBox.critical(self, "Database Error", f"Error loading payments: {str(e)}")
+    def export_table_dialog(self, table_name):
+        path, _ = QFileDialog.getSaveFileName(
+            self, f"Export {table_name.title()}", f"{table_name}.csv", "CSV (*.csv);;Parquet (*.parquet)")
+        if not path:
+            return
+        incremental = QMessageBox.question(
+            self, "Export",
+            "Export only rows added or changed since the last export?\n\nChoose No to export the whole table."
+        ) == QMessageBox.StandardButton.Yes
+
+        self.executor.submit(f"export:{table_name}", export_table, table_name, path, incremental,
+                             on_result=lambda count: QMessageBox.information(
+                                 self, "Export Complete", f"Exported {count} rows to {path}"),
+                             on_error=lambda error: show_database_error(self, "Error exporting data", error))
+
+    def poll_changes(self):
+        if self.change_poller.is_running("changes"):
+            return
+        columns = {table: model.columns for table, model in self.live_models.items()}
+        # A failed poll is simply retried on the next tick
+        self.change_poller.submit("changes", poll_changes, self.change_marks, columns,
+                                  on_result=self.changes_polled, on_error=lambda error: None)
+
+    def changes_polled(self, result):
+        self.change_marks = result["marks"]
+        for table in result["changed"]:
+            grid_query_cache.invalidate(table)
+        for table, rows in result["rows"].items():
+            model = self.live_models.get(table)
+            if model is None:
+                continue
+            if rows is None or model.conditions:
+                # A filtered grid re-runs its query rather than merge rows that may not match it
+                model.reload()
+            else:
+                model.apply_changes(rows)
+        if result["stats"] is not None and 0 in self.built_tabs:
+            self.show_overview_stats(result["stats"])
+
+    def show_busy(self, busy):
+        if busy:
+            self.statusBar().showMessage("Loading...")
+        else:
+            self.statusBar().clearMessage()
+
+    def closeEvent(self, event):
+        self.change_timer.stop()
+        self.change_poller.cancel_all()
+        super().closeEvent(event)
 
     def logout(self):
         reply = QMessageBox.question(self, "Logout", "Are you sure you want to logout?",
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
+            self.executor.cancel_all()
             self.close()
             login_window = LoginWindow()
             if login_window.exec() == QDialog.DialogCode.Accepted:
@@ -1103,27 +1551,28 @@ class DentalBookingApp(QMainWindow):
         """)
 
         self.logged_in_email = logged_in_email
+        self.executor = QueryExecutor(self)
+        self.executor.busy_changed.connect(self.show_busy)
         self.current_selected_appt_id = None
+        self.payment_key = None  # idempotency key of the payment attempt for current_selected_appt_id
         self.service_vars = {}
         self.selected_services = {}
         self.current_patient_name = ""
+        self.services_tab_waiting = False
+        self.appointment_tab_open = False
+        self.payment_tab_open = False
 
-        # Default services & prices
-        self.services = {
-            "Dental Cleaning": 500,
-            "Tooth Extraction": 1000,
-            "Braces Consultation": 700,
-            "Whitening": 1200,
-            "Dental Check-up": 300,
-            "Root Canal": 3500,
-            "Dental Filling": 1500,
-            "X-Ray": 800,
-            "Gum Treatment": 2000,
-            "Dental Implant": 8000
-        }
+        # Services & prices come from the shared catalog, loaded once in the background
+        self.executor.submit("catalog", get_service_catalog,
+                             on_result=self.catalog_loaded,
+                             on_error=lambda error: print(f"Service catalog error: {error}"))
 
         self.init_ui()
 
+    def catalog_loaded(self, catalog):
+        if self.services_tab_waiting:
+            self.build_services_tab()
+
     def init_ui(self):
         central_widget = QWidget()
         central_widget.setStyleSheet("background-color: #eaf6fb; color: #333333;")
@@ -1218,10 +1667,17 @@ class DentalBookingApp(QMainWindow):
         main_layout.addLayout(content_layout)
         self.build_patient_tab()
 
+    def show_busy(self, busy):
+        if busy:
+            self.statusBar().showMessage("Loading...")
+        else:
+            self.statusBar().clearMessage()
+
     def logout(self):
         reply = QMessageBox.question(self, "Logout", "Are you sure you want to logout?",
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
+            self.executor.cancel_all()
             self.close()
             login_window = LoginWindow()
             if login_window.exec() == QDialog.DialogCode.Accepted:
@@ -1233,6 +1689,9 @@ class DentalBookingApp(QMainWindow):
                     app.show()
 
     def clear_content(self):
+        self.services_tab_waiting = False
+        self.appointment_tab_open = False
+        self.payment_tab_open = False
         while self.content_layout.count():
             child = self.content_layout.takeAt(0)
             if child.widget():
@@ -1298,7 +1757,7 @@ class DentalBookingApp(QMainWindow):
         type_label.setStyleSheet("color: #333333; font-size: 14px; font-weight: bold;")
         layout.addWidget(type_label, 3, 0)
         self.patient_demographic_type = QComboBox()
-        self.patient_demographic_type.addItems(["Regular", "Senior", "Student", "PWD"])
+        self.patient_demographic_type.addItems(list(DEMOGRAPHIC_TYPES))
         self.patient_demographic_type.setStyleSheet("font-size: 14px; padding: 8px; border: 1px solid #ccc;")
         self.patient_demographic_type.setMinimumHeight(35)
         layout.addWidget(self.patient_demographic_type, 3, 1)
@@ -1331,28 +1790,28 @@ class DentalBookingApp(QMainWindow):
         demographic_type = self.patient_demographic_type.currentText()
         contact = self.patient_contact.text().strip()
 
-        if not name or not contact:
-            QMessageBox.warning(self, "Missing Information", "Please fill out all fields.")
-            return
-
-        try:
-            db = get_db_connection()
-            if db is None:
-                QMessageBox.critical(self, "Database Error", "Cannot connect to database.")
-                return
-            cursor = db.cursor()
-            cursor.execute(
-                "INSERT INTO patients (name, birth_date, demographic_type, contact, type) VALUES (%s, %s, %s, %s, %s)",
-                (name, bdate, demographic_type, contact, "Pending")
-            )
-            db.commit()
-            db.close()
+        self.executor.submit("save_patient", save_patient, name, bdate, demographic_type, contact,
+                             on_result=lambda patient_id: self.patient_saved(name, patient_id),
+                             on_error=self.patient_save_failed)
+
+    def patient_saved(self, name, patient_id):
+        # Later tabs book and bill for this patient; the form itself is cleared below
+        self.current_patient_name = name
+        if patient_id is None:
+            QMessageBox.information(self, "Saved Offline",
+                                    f"Patient {name} was saved on this computer and will be added to the "
+                                    "database as soon as it can take it.")
+        else:
             QMessageBox.information(self, "Success", f"Patient {name} saved successfully!")
-            self.patient_name.clear()
-            self.patient_demographic_type.setCurrentIndex(0)
-            self.patient_contact.clear()
-        except Exception as e:
-            QMessageBox.critical(self, "Database Error", f"Error: {str(e)}")
+        self.patient_name.clear()
+        self.patient_demographic_type.setCurrentIndex(0)
+        self.patient_contact.clear()
+
+    def patient_save_failed(self, error):
+        if isinstance(error, ValueError):
+            QMessageBox.warning(self, "Missing Information", str(error))
+        else:
+            QMessageBox.critical(self, "Database Error", f"Error: {str(error)}")
 
     def build_services_tab(self):
         self.clear_content()
@@ -1380,12 +1839,22 @@ class DentalBookingApp(QMainWindow):
         services_layout = QVBoxLayout()
 
         self.service_vars = {}
-        for service, price in self.services.items():
-            chk = QCheckBox(f"{service} - PHP {price:,.2f}")
+        self.services_tab_waiting = not service_catalog.loaded
+        if self.services_tab_waiting:
+            loading_label = QLabel("Loading services...")
+            loading_label.setStyleSheet("font-size: 14px; padding: 10px;")
+            services_layout.addWidget(loading_label)
+            self.executor.submit("catalog", get_service_catalog,
+                                 on_result=self.catalog_loaded,
+                                 on_error=lambda error: loading_label.setText("Services are unavailable right now."))
+
+        for service in service_catalog.active_services():
+            chk = QCheckBox(f"{service['name']} - PHP {service['price']:,.2f}")
             chk.setStyleSheet("font-size: 14px; padding: 10px;")
+            chk.setChecked(service["id"] in self.selected_services)
             chk.stateChanged.connect(self.update_selected_services)
             services_layout.addWidget(chk)
-            self.service_vars[service] = chk
+            self.service_vars[service["id"]] = chk
 
         group.setLayout(services_layout)
 
@@ -1395,8 +1864,8 @@ class DentalBookingApp(QMainWindow):
         self.content_layout.addWidget(scroll)
 
     def update_selected_services(self):
-        self.selected_services = {s: p for s, p in self.services.items()
-                                  if self.service_vars.get(s) and self.service_vars[s].isChecked()}
+        self.selected_services = {service_id: service_catalog.by_id[service_id]["name"]
+                                  for service_id, chk in self.service_vars.items() if chk.isChecked()}
 
     def build_appointment_tab(self):
         self.clear_content()
@@ -1428,13 +1897,16 @@ class DentalBookingApp(QMainWindow):
         self.appointment_date.setDisplayFormat("yyyy-MM-dd")
         self.appointment_date.setStyleSheet("font-size: 14px; padding: 8px; border: 1px solid #ccc;")
         self.appointment_date.setMinimumHeight(35)
+        self.appointment_date.setMinimumDate(QDate.currentDate())
+        self.appointment_date.dateChanged.connect(lambda _: self.refresh_slot_availability())
         layout.addWidget(self.appointment_date, 0, 1)
 
         time_label = QLabel("Time Slot:")
         time_label.setStyleSheet("color: #333333; font-size: 14px; font-weight: bold;")
         layout.addWidget(time_label, 1, 0)
         self.appointment_time = QComboBox()
-        self.appointment_time.addItems(["9:00 AM", "10:00 AM", "1:00 PM", "2:00 PM", "3:00 PM", "4:00 PM", "5:00 PM"])
+        for time_slot in TIME_SLOTS:
+            self.appointment_time.addItem(time_slot, time_slot)
         self.appointment_time.setStyleSheet("font-size: 14px; padding: 8px; border: 1px solid #ccc;")
         self.appointment_time.setMinimumHeight(35)
         layout.addWidget(self.appointment_time, 1, 1)
@@ -1461,35 +1933,78 @@ class DentalBookingApp(QMainWindow):
         self.content_layout.addWidget(group)
         self.content_layout.addStretch()
 
+        self.appointment_tab_open = True
+        self.refresh_slot_availability()
+
+    def refresh_slot_availability(self):
+        date = self.appointment_date.date().toPyDate()
+        self.executor.submit("slot_availability", slot_availability, date,
+                             on_result=self.show_slot_availability,
+                             on_error=lambda error: None)  # booking still checks capacity itself
+
+    def show_slot_availability(self, day):
+        if not self.appointment_tab_open:
+            return
+        # Full and past slots stay listed but greyed out
+        free_by_slot = dict(day)
+        combo = self.appointment_time
+        for index in range(combo.count()):
+            time_slot = combo.itemData(index)
+            free = free_by_slot.get(time_slot, 0)
+            combo.model().item(index).setEnabled(free > 0)
+            combo.setItemText(index, time_slot if free > 0 else f"{time_slot} (Full)")
+        if free_by_slot.get(combo.currentData(), 0) <= 0:
+            open_index = next((index for index in range(combo.count())
+                               if free_by_slot.get(combo.itemData(index), 0) > 0), -1)
+            if open_index >= 0:
+                combo.setCurrentIndex(open_index)
+
     def book_appointment(self):
-        patient = self.patient_name.text().strip()
+        patient = self.current_patient_name
         date = self.appointment_date.date().toString("yyyy-MM-dd")
-        time = self.appointment_time.currentText()
+        time = self.appointment_time.currentData()
 
         if not patient:
             QMessageBox.warning(self, "Missing Information", "Please save patient information first.")
             return
 
-        try:
-            db = get_db_connection()
-            if db is None:
-                QMessageBox.critical(self, "Database Error", "Cannot connect to database.")
-                return
-            cursor = db.cursor()
-            services = ", ".join(self.selected_services.keys()) if self.selected_services else "No services"
-            cursor.execute(
-                "INSERT INTO appointments (patient_name, date, time_slot, services, status) VALUES (%s, %s, %s, %s, %s)",
-                (patient, date, time, services, "Booked"))
-            db.commit()
-            db.close()
+        self.executor.submit("book_appointment", book_appointment, patient, date, time,
+                             list(self.selected_services),
+                             on_result=lambda appointment_id: self.appointment_booked(patient, date, time,
+                                                                                      appointment_id),
+                             on_error=lambda error: self.booking_failed(date, error))
+
+    def appointment_booked(self, patient, date, time, appointment_id):
+        if appointment_id is None:
+            QMessageBox.information(self, "Saved Offline",
+                                    f"The booking for {patient} on {date} at {time} was saved on this "
+                                    "computer; the slot is confirmed once it reaches the database.")
+        else:
+            if self.appointment_tab_open:
+                self.refresh_slot_availability()
             QMessageBox.information(self, "Success",
                                     f"Appointment booked!\nPatient: {patient}\nDate: {date}\nTime: {time}")
 
-            for chk in self.service_vars.values():
-                chk.setChecked(False)
-            self.selected_services = {}
-        except Exception as e:
-            QMessageBox.critical(self, "Database Error", f"Error: {str(e)}")
+        # The services tab rebuilds its checkboxes from selected_services
+        self.selected_services = {}
+
+    def booking_failed(self, date, error):
+        if not isinstance(error, SlotUnavailableError):
+            QMessageBox.critical(self, "Database Error", f"Error: {str(error)}")
+            return
+        schedule_index.invalidate()
+        if self.appointment_tab_open:
+            self.refresh_slot_availability()
+        message = str(error)
+        self.executor.submit("free_slots", find_free_slots, date, 3,
+                             on_result=lambda suggestions: self.show_slot_unavailable(message, suggestions),
+                             on_error=lambda _: self.show_slot_unavailable(message, []))
+
+    def show_slot_unavailable(self, message, suggestions):
+        if suggestions:
+            message += "\n\nNearest free slots:\n" + "\n".join(
+                f"{slot_date:%Y-%m-%d}  {time_slot}" for slot_date, time_slot, _ in suggestions)
+        QMessageBox.warning(self, "Slot Unavailable", message)
 
     def build_payment_tab(self):
         self.clear_content()
@@ -1511,51 +2026,19 @@ class DentalBookingApp(QMainWindow):
         layout = QGridLayout()
         layout.setSpacing(15)
 
-        patient_name = self.patient_name.text().strip()
-        appointments = []
-
-        if patient_name:
-            try:
-                db = get_db_connection()
-                if db is not None:
-                    cursor = db.cursor()
-                    cursor.execute(
-                        "SELECT id, patient_name, date, time_slot, services FROM appointments WHERE patient_name = %s AND status != 'Cancelled' ORDER BY date DESC",
-                        (patient_name,))
-                    appointments = cursor.fetchall()
-                    db.close()
-            except:
-                appointments = []
-
+        patient_name = self.current_patient_name
         self.appointment_map = {}
-        appointment_display_values = []
-        for row in appointments:
-            appt_id, pname, adate, tslot, services = row
-            display = f"{adate} | {tslot} | {services}"
-            appointment_display_values.append(display)
-            self.appointment_map[display] = {
-                "id": appt_id,
-                "patient": pname,
-                "date": adate,
-                "time": tslot,
-                "services": services
-            }
 
-        if not appointment_display_values:
-            no_appt_label = QLabel("No appointments found. Please book an appointment first.")
-            no_appt_label.setStyleSheet("color: #dc3545; font-size: 14px; font-weight: bold; padding: 10px;")
-            layout.addWidget(no_appt_label, 0, 0, 1, 2)
-        else:
-            self.current_appointment_display = appointment_display_values[0]
-            appt_info_label = QLabel(f"Current Appointment: {self.current_appointment_display}")
-            appt_info_label.setStyleSheet("color: #333333; font-size: 14px; font-weight: bold; padding: 10px;")
-            layout.addWidget(appt_info_label, 0, 0, 1, 2)
+        # Filled in by payment_appointments_loaded once the query returns
+        self.appointment_info_label = QLabel("Loading appointments...")
+        self.appointment_info_label.setStyleSheet("color: #666666; font-size: 14px; font-weight: bold; padding: 10px;")
+        layout.addWidget(self.appointment_info_label, 0, 0, 1, 2)
 
         method_label = QLabel("Payment Method:")
         method_label.setStyleSheet("color: #333333; font-size: 14px; font-weight: bold;")
         layout.addWidget(method_label, 1, 0)
         self.payment_method = QComboBox()
-        self.payment_method.addItems(["Cash", "GCash", "Credit/Debit Card"])
+        self.payment_method.addItems(PAYMENT_METHODS)
         self.payment_method.setStyleSheet("font-size: 14px; padding: 8px; border: 1px solid #ccc;")
         self.payment_method.setMinimumHeight(35)
         layout.addWidget(self.payment_method, 1, 1)
@@ -1618,80 +2101,88 @@ class DentalBookingApp(QMainWindow):
         self.content_layout.addWidget(group)
         self.content_layout.addStretch()
 
-        if appointment_display_values:
-            self.calculate_total()
+        self.payment_tab_open = True
+        if not patient_name:
+            self.payment_appointments_loaded(patient_name, [])
+            return
+        self.executor.submit("payment_tab", patient_appointments, patient_name,
+                             on_result=lambda appointments: self.payment_appointments_loaded(patient_name,
+                                                                                             appointments),
+                             on_error=lambda error: self.payment_appointments_loaded(patient_name, []))
+
+    def payment_appointments_loaded(self, patient_name, appointments):
+        if not self.payment_tab_open or patient_name != self.current_patient_name:
+            return
+
+        self.appointment_map = {}
+        appointment_display_values = []
+        for row in appointments:
+            appt_id, pname, adate, tslot, services = row
+            display = f"{adate} | {tslot} | {services}"
+            appointment_display_values.append(display)
+            self.appointment_map[display] = {
+                "id": appt_id,
+                "patient": pname,
+                "date": adate,
+                "time": tslot,
+                "services": services
+            }
+
+        if not appointment_display_values:
+            self.appointment_info_label.setText("No appointments found. Please book an appointment first.")
+            self.appointment_info_label.setStyleSheet(
+                "color: #dc3545; font-size: 14px; font-weight: bold; padding: 10px;")
+            return
+
+        self.current_appointment_display = appointment_display_values[0]
+        self.appointment_info_label.setText(f"Current Appointment: {self.current_appointment_display}")
+        self.appointment_info_label.setStyleSheet("color: #333333; font-size: 14px; font-weight: bold; padding: 10px;")
+        self.calculate_total()
+
+    def show_total(self, patient_name, bill):
+        base_total = bill["base_total"]
+        discount_rate = bill["discount_rate"]
+        discount_amount = bill["discount_amount"]
+        final_total = bill["total"]
+
+        if bill["appointment_id"] != self.current_selected_appt_id:
+            self.payment_key = new_payment_key(bill["appointment_id"])
+        self.current_selected_appt_id = bill["appointment_id"]
+        self.current_patient_name = patient_name
+
+        # Display the total
+        self.total_amount_label.setText(f"PHP {final_total:,.2f}")
+
+        # Show discount info
+        if discount_rate > 0:
+            discount_info = f"Base: PHP {base_total:,.2f} - {discount_rate * 100:.0f}% discount (PHP {discount_amount:,.2f}) = PHP {final_total:,.2f}"
+            self.total_amount_label.setToolTip(discount_info)
+        else:
+            self.total_amount_label.setToolTip(f"Base amount: PHP {base_total:,.2f}")
 
     def calculate_total(self):
-        patient_name = self.patient_name.text().strip()
+        patient_name = self.current_patient_name
         if not patient_name:
             self.total_amount_label.setText("PHP 0.00")
             QMessageBox.warning(self, "No Patient", "Please save patient information first.")
             return
 
-        try:
-            db = get_db_connection()
-            if db is None:
-                QMessageBox.critical(self, "Database Error", "Cannot connect to database.")
-                return
-            cursor = db.cursor()
-            cursor.execute(
-                "SELECT id, patient_name, date, time_slot, services FROM appointments WHERE patient_name = %s AND status != 'Cancelled' ORDER BY date DESC LIMIT 1",
-                (patient_name,))
-            appointment = cursor.fetchone()
-            db.close()
-
-            if not appointment:
-                self.total_amount_label.setText("PHP 0.00")
-                QMessageBox.warning(self, "No Appointment", "No appointments found for this patient.")
-                return
-
-            appt_id, pname, adate, tslot, services_str = appointment
-
-            # Calculate base total from services
-            base_total = 0
-            for service_name, service_price in self.services.items():
-                if service_name in services_str:
-                    base_total += service_price
-
-            # Get patient type for discount
-            db = get_db_connection()
-            cursor = db.cursor()
-            cursor.execute("SELECT demographic_type FROM patients WHERE name = %s", (patient_name,))
-            result = cursor.fetchone()
-            db.close()
-
-            patient_type = result[0] if result else "Regular"
-
-            # Apply discounts
-            discount_rate = 0
-            if patient_type == "Senior":
-                discount_rate = 0.20
-            elif patient_type == "Student":
-                discount_rate = 0.10
-            elif patient_type == "PWD":
-                discount_rate = 0.20
-
-            discount_amount = base_total * discount_rate
-            final_total = base_total - discount_amount
-
-            self.current_selected_appt_id = appt_id
-            self.current_patient_name = patient_name
-
-            # Display the total
-            self.total_amount_label.setText(f"PHP {final_total:,.2f}")
-
-            # Show discount info
-            if discount_rate > 0:
-                discount_info = f"Base: PHP {base_total:,.2f} - {discount_rate * 100:.0f}% discount (PHP {discount_amount:,.2f}) = PHP {final_total:,.2f}"
-                self.total_amount_label.setToolTip(discount_info)
-            else:
-                self.total_amount_label.setToolTip(f"Base amount: PHP {base_total:,.2f}")
+        self.executor.submit("calculate_total", latest_bill, patient_name,
+                             on_result=lambda bill: self.total_calculated(patient_name, bill),
+                             on_error=lambda error: show_database_error(self, "Error calculating total", error))
 
-        except Exception as e:
-            QMessageBox.critical(self, "Database Error", f"Error calculating total: {str(e)}")
+    def total_calculated(self, patient_name, bill):
+        if not self.payment_tab_open:
+            return  # the user moved on; the payment tab recalculates when reopened
+        if not bill:
+            self.total_amount_label.setText("PHP 0.00")
+            QMessageBox.warning(self, "No Appointment", "No appointments found for this patient.")
+            return
+
+        self.show_total(patient_name, bill)
 
     def generate_receipt(self):
-        patient_name = self.patient_name.text().strip()
+        patient_name = self.current_patient_name
         if not patient_name:
             QMessageBox.warning(self, "No Patient", "Please save patient information first.")
             return
@@ -1702,95 +2193,84 @@ class DentalBookingApp(QMainWindow):
 
         payment_method = self.payment_method.currentText()
 
-        try:
-            db = get_db_connection()
-            if db is None:
-                QMessageBox.critical(self, "Database Error", "Cannot connect to database.")
-                return
-            cursor = db.cursor()
-            cursor.execute(
-                "SELECT date, time_slot, services FROM appointments WHERE id = %s",
-                (self.current_selected_appt_id,))
-            appointment = cursor.fetchone()
-            db.close()
-
-            if not appointment:
-                QMessageBox.warning(self, "Error", "Appointment not found.")
-                return
-
-            appt_date, appt_time, appt_services = appointment
-
-            # Calculate total again to ensure accuracy
-            self.calculate_total()
-            total_amount_text = self.total_amount_label.text().replace('PHP', '').replace(',', '').strip()
-            total_amount = float(total_amount_text)
-
-            # Generate receipt text
-            receipt_text = f"""
-=====================================
-  SMILE CARE DENTAL CLINIC
-    OFFICIAL RECEIPT
-=====================================
-Patient: {patient_name}
-Date: {appt_date}
-Time: {appt_time}
-Payment Method: {payment_method}
-=====================================
-             SERVICES
-=====================================
-"""
-
-            services_list = appt_services.split(', ') if appt_services != "No services" else []
-            for service in services_list:
-                if service in self.services:
-                    price = self.services[service]
-                    receipt_text += f"  • {service:<25} PHP {price:>8,.2f}\n"
-
-            receipt_text += f"""=====================================
-Total Amount: PHP {total_amount:,.2f}
-Payment Date: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}
-=====================================
-
-Thank you for choosing Smile Care Dental Clinic!
-"""
+        # A double click is coalesced by the executor; a retry after an error reuses the
+        # idempotency key, so the database never records the attempt twice
+        self.executor.submit("generate_receipt", record_payment,
+                             self.current_selected_appt_id, payment_method, self.payment_key,
+                             on_result=lambda result: self.payment_recorded(patient_name, result),
+                             on_error=self.payment_failed)
 
-            self.receipt_box.setText(receipt_text)
+    def payment_failed(self, error):
+        if isinstance(error, LookupError):
+            QMessageBox.warning(self, "Error", str(error))
+        else:
+            show_database_error(self, "Error saving payment", error)
+
+    def payment_recorded(self, patient_name, result):
+        if result is None:
+            if self.payment_tab_open:
+                self.receipt_box.setText("")
+            QMessageBox.information(self, "Saved Offline",
+                                    "The payment was saved on this computer; its receipt is issued "
+                                    "once it reaches the database.")
+            return
 
-            # Save payment to database
-            db = get_db_connection()
-            cursor = db.cursor()
-            cursor.execute(
-                "INSERT INTO payments (appointment_id, amount, method, date_paid) VALUES (%s, %s, %s, %s)",
-                (self.current_selected_appt_id, total_amount, payment_method, datetime.datetime.now())
-            )
-            db.commit()
-            db.close()
+        bill, receipt_text, replayed = result
+        if self.payment_tab_open:
+            self.show_total(patient_name, bill)
+            self.receipt_box.setText(receipt_text)
 
+        if replayed:
+            QMessageBox.information(self, "Already Paid", "This payment was already recorded; showing its receipt.")
+        else:
             QMessageBox.information(self, "Success", "Payment saved successfully and receipt generated!")
 
-        except Exception as e:
-            QMessageBox.critical(self, "Database Error", f"Error saving payment: {str(e)}")
-
 
 # ----------------------- MAIN APPLICATION -----------------------
 def main():
+    mark_startup("imports")
+
     # Initialize database
     setup_database()
+    mark_startup("database setup")
+
+    if is_command(sys.argv[1:]):
+        # Headless maintenance, e.g. --import-legacy or --export (same as "python -m clinic ...")
+        run_command(sys.argv[1:])
+        close_db_pool()
+        sys.exit(0)
 
     # Start the application
     app = QApplication(sys.argv)
+    mark_startup("qt application")
+
+    # Writes queued while the database was unreachable go in as soon as it answers again
+    journal_executor = QueryExecutor()
+    journal_timer = QTimer()
+    journal_timer.timeout.connect(lambda: write_journal.pending() and journal_executor.submit(
+        "replay_journal", replay_journal, on_error=lambda error: None))
+    journal_timer.start(JOURNAL_REPLAY_INTERVAL * 1000)
 
     # Show login window first
     login_window = LoginWindow()
+    login_window.show()
+    mark_startup("login window")
     if login_window.exec() == QDialog.DialogCode.Accepted:
+        skip_startup_lap()
         if login_window.user_type == "admin":
             dashboard = AdminDashboard()
             dashboard.show()
+            mark_startup("admin dashboard")
         elif login_window.user_type == "patient":
             dental_app = DentalBookingApp(login_window.logged_in_user)
             dental_app.show()
+            mark_startup("patient portal")
+        write_startup_report()
 
-    sys.exit(app.exec())
+    exit_code = app.exec()
+    query_thread_pool().waitForDone(5000)
+    close_db_pool()
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,4 @@
+"""Synthetic-data benchmarks for the clinic package.
+
+Run from PythonProject: python -m benchmarks --patients 2000 --appointments 10000
+"""
@@ -0,0 +1,83 @@
+import argparse
+import datetime
+import json
+import os
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Generate a synthetic clinic and time the app's hot paths against it.")
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--appointments", type=int, default=10000)
+    parser.add_argument("--iterations", type=int, default=50, help="timed calls per benchmark")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--backend", choices=("sqlite", "mysql"), default="sqlite",
+                        help="mysql uses the DENTAL_DB_* settings and needs an empty database")
+    parser.add_argument("--db", default=os.path.join(BENCHMARK_DIR, "bench_clinic.db"),
+                        help="SQLite file, recreated on every run")
+    parser.add_argument("--output", help="results JSON (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to compare medians against")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    # The clinic package reads its backend settings on import
+    os.environ["DENTAL_DB_BACKEND"] = args.backend
+    if args.backend == "sqlite":
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+        os.environ["DENTAL_DB_PATH"] = args.db
+    elif "DENTAL_DB_NAME" not in os.environ:
+        print("Set DENTAL_DB_NAME to a scratch database; benchmarks never write to the default one.")
+        return 2
+    # Nothing the run queues offline may land in the app's own journal
+    journal_dir = tempfile.TemporaryDirectory(prefix="dental_bench_")
+    os.environ["DENTAL_JOURNAL_PATH"] = os.path.join(journal_dir.name, "offline_journal.jsonl")
+
+    from clinic import close_db_pool, db_connection, setup_database
+    from .generate import generate_clinic
+    from .suite import compare_results, report_header, run_suite, write_results
+
+    if not setup_database():
+        return 1
+    started = time.perf_counter()
+    with db_connection() as db:
+        if db is None:
+            return 1
+        sizes = generate_clinic(db, args.patients, args.appointments, args.seed)
+        cursor = db.cursor()
+        cursor.execute("SELECT name FROM patients")
+        patient_names = [name for name, in cursor.fetchall()]
+    generation_seconds = time.perf_counter() - started
+    print(f"Generated {sizes} in {generation_seconds:.1f}s")
+
+    try:
+        report = report_header(sizes, generation_seconds, args.iterations, args.seed)
+        report["results"] = run_suite(patient_names, args.iterations, args.seed)
+    finally:
+        close_db_pool()
+        journal_dir.cleanup()
+
+    output = args.output or os.path.join(
+        BENCHMARK_DIR, "results", datetime.datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    write_results(output, report)
+    for name, result in report["results"].items():
+        print(f"{name:<24} median {result['median_ms']:>8.2f}ms  p95 {result['p95_ms']:>8.2f}ms  "
+              f"({result['runs']} runs)")
+    print(f"Results written to {output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare_results(json.load(f), report)
+    return 0
+
+
+sys.exit(main())
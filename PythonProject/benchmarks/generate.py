@@ -0,0 +1,101 @@
+import datetime
+import random
+
+from clinic import (PATIENT_STATUSES, PAYMENT_METHODS,
+                    SCHEDULE_DEFAULT_CAPACITY, TIME_SLOTS, backfill_receipts, get_service_catalog,
+                    price_lines, rebuild_summary_tables, slot_start)
+
+
+# A synthetic clinic written straight into an empty database with executemany.
+# Ids are assigned here so the join rows need no read-back; summary tables,
+# slot usage and the receipt archive are rebuilt afterwards the way the
+# migrations do, so every hot path sees consistent data.
+FIRST_NAMES = ["Maria", "Jose", "Ana", "Juan", "Rosa", "Mark", "Grace", "Paolo", "Liza", "Carlo",
+               "Joy", "Miguel", "Andrea", "Rafael", "Bea", "Enzo", "Camille", "Diego", "Nina", "Luis"]
+LAST_NAMES = ["Santos", "Reyes", "Cruz", "Bautista", "Garcia", "Mendoza", "Torres", "Flores",
+              "Villanueva", "Ramos", "Aquino", "Castillo", "Rivera", "Navarro", "Dela Cruz"]
+DEMOGRAPHIC_WEIGHTS = {"Regular": 60, "Senior": 20, "Student": 15, "PWD": 5}
+PAST_STATUS_WEIGHTS = {"Complete": 65, "Cancelled": 10, "Booked": 10, "Pending": 15}
+HISTORY_DAYS = 365
+FUTURE_DAYS = 28
+FUTURE_SHARE = 0.05  # of appointments; kept below slot capacity so booking still finds room
+PATIENT_ACCOUNTS = 100
+GENERATE_BATCH_SIZE = 1000
+
+
+def _batches(cursor, db, sql, rows):
+    for start in range(0, len(rows), GENERATE_BATCH_SIZE):
+        cursor.executemany(sql, rows[start:start + GENERATE_BATCH_SIZE])
+        db.commit()
+
+
+def _weighted(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def generate_clinic(db, patients=2000, appointments=10000, seed=1):
+    """Fill an empty, migrated database; returns the row counts written"""
+    rng = random.Random(seed)
+    cursor = db.cursor()
+    cursor.execute("SELECT COUNT(*) FROM patients")
+    if cursor.fetchone()[0]:
+        raise RuntimeError("Benchmarks need an empty database; refusing to add synthetic rows to real data.")
+    catalog = get_service_catalog()
+    services = catalog.active_services()
+    today = datetime.date.today()
+
+    patient_rows = []
+    for patient_id in range(1, patients + 1):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {patient_id}"
+        birth_date = today - datetime.timedelta(days=rng.randint(6 * 365, 90 * 365))
+        contact = "09" + "".join(rng.choice("0123456789") for _ in range(9))
+        patient_rows.append((patient_id, name, birth_date, _weighted(rng, DEMOGRAPHIC_WEIGHTS), contact,
+                             rng.choice(PATIENT_STATUSES)))
+    _batches(cursor, db, "INSERT INTO patients (id, name, birth_date, demographic_type, contact, type) "
+                         "VALUES (%s, %s, %s, %s, %s, %s)", patient_rows)
+    _batches(cursor, db, "INSERT INTO patient_accounts (email, password) VALUES (%s, %s)",
+             [(f"patient{number}@example.com", "123") for number in range(1, min(patients, PATIENT_ACCOUNTS) + 1)])
+
+    appointment_rows, line_rows, payment_rows = [], [], []
+    future_booked = {}
+    now = datetime.datetime.now()
+    for appointment_id in range(1, appointments + 1):
+        _, name, _, demographic_type, _, _ = rng.choice(patient_rows)
+        time_slot = rng.choice(TIME_SLOTS)
+        date = today - datetime.timedelta(days=rng.randint(1, HISTORY_DAYS))
+        if rng.random() < FUTURE_SHARE:
+            future = today + datetime.timedelta(days=rng.randint(1, FUTURE_DAYS))
+            if future_booked.get((future, time_slot), 0) < SCHEDULE_DEFAULT_CAPACITY - 1:
+                future_booked[(future, time_slot)] = future_booked.get((future, time_slot), 0) + 1
+                date = future
+        status = _weighted(rng, PAST_STATUS_WEIGHTS) if slot_start(date, time_slot) < now else "Booked"
+
+        chosen = rng.sample(services, rng.choice((1, 1, 2, 2, 3)))
+        lines = [(service["id"], service["name"], service["price"]) for service in chosen]
+        appointment_rows.append((appointment_id, name, date, time_slot,
+                                 ", ".join(service["name"] for service in chosen), status))
+        line_rows.extend((appointment_id, service_id, price) for service_id, _, price in lines)
+        if status == "Complete":
+            paid_at = datetime.datetime.combine(date, datetime.time(rng.randint(9, 17), rng.randint(0, 59)))
+            payment_rows.append((appointment_id, price_lines(lines, demographic_type)["total"],
+                                 rng.choice(PAYMENT_METHODS), paid_at))
+
+    _batches(cursor, db, "INSERT INTO appointments (id, patient_name, date, time_slot, services, status) "
+                         "VALUES (%s, %s, %s, %s, %s, %s)", appointment_rows)
+    _batches(cursor, db, "INSERT INTO appointment_services (appointment_id, service_id, price_at_booking) "
+                         "VALUES (%s, %s, %s)", line_rows)
+    payment_rows.sort(key=lambda row: row[3])
+    _batches(cursor, db, "INSERT INTO payments (appointment_id, amount, method, date_paid) VALUES (%s, %s, %s, %s)",
+             payment_rows)
+
+    cursor.execute("DELETE FROM slot_usage")
+    cursor.execute("""
+        INSERT INTO slot_usage (date, time_slot, booked)
+        SELECT date, time_slot, COUNT(*) FROM appointments WHERE status != 'Cancelled' GROUP BY date, time_slot
+    """)
+    rebuild_summary_tables(cursor)
+    db.commit()
+    receipts = backfill_receipts(cursor)
+    db.commit()
+    return {"patients": len(patient_rows), "appointments": len(appointment_rows),
+            "appointment_services": len(line_rows), "payments": len(payment_rows), "receipts": receipts}
@@ -0,0 +1,146 @@
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from clinic import (authenticate_admin, authenticate_patient, book_appointment, entity_cache,
+                    fetch_grid_page, find_free_slots, get_backend, get_dashboard_stats,
+                    get_service_catalog, grid_filter_conditions, latest_bill, new_payment_key,
+                    record_payment, render_dashboard_charts)
+
+
+# The hot paths the GUI runs, called through the same clinic functions its
+# buttons and grids use. Each benchmark is timed per call; results are kept
+# as JSON so two versions can be compared with --compare.
+GRID_PAGE_SIZE = 200  # the admin grids' TABLE_PAGE_SIZE
+GRIDS = {
+    "patients": (["name", "birth_date", "demographic_type", "contact", "type"], "name", False),
+    "appointments": (["patient_name", "date", "time_slot", "services", "status"], "date", True),
+    "payments": (["appointment_id", "amount", "method", "date_paid"], "date_paid", True),
+}
+
+
+def timed(fn, iterations, setup=None):
+    """Call fn() `iterations` times, each after an untimed setup(); returns latency statistics in milliseconds"""
+    samples = []
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "runs": len(samples),
+        "min_ms": round(samples[0], 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+def grid_loader(table, conditions=()):
+    columns, sort_column, descending = GRIDS[table]
+
+    def load():
+        fetch_grid_page(table, columns, sort_column, descending, None, list(conditions), GRID_PAGE_SIZE)
+    return load
+
+
+def run_suite(patient_names, iterations=50, seed=1):
+    """{benchmark: latency statistics} for every hot path"""
+    rng = random.Random(seed)
+    results = {}
+    entity_cache.invalidate()
+
+    results["login_admin"] = timed(lambda: authenticate_admin("admin", "admin123"), iterations)
+    results["login_patient"] = timed(lambda: authenticate_patient("patient1@example.com", "123"), iterations)
+    results["dashboard_stats"] = timed(lambda: get_dashboard_stats(max_age=0), iterations)
+
+    chart_dir = tempfile.mkdtemp(prefix="dental_bench_charts_")
+    try:
+        # A fresh directory per call so every render is a cold one, not a cache hit
+        results["dashboard_charts"] = timed(
+            lambda: render_dashboard_charts(tempfile.mkdtemp(dir=chart_dir)), max(1, iterations // 5))
+    except ImportError as e:
+        print(f"Skipping dashboard_charts: {e}")
+    finally:
+        shutil.rmtree(chart_dir, ignore_errors=True)
+
+    for table in GRIDS:
+        results[f"load_{table}_table"] = timed(grid_loader(table), iterations)
+    results["search_patients"] = timed(grid_loader("patients", grid_filter_conditions("patients", "Mar")), iterations)
+    results["filter_appointments"] = timed(
+        grid_loader("appointments", grid_filter_conditions("appointments", equals={"status": "Booked"})), iterations)
+
+    # Cold: what the database costs. Repeat: the same patient again, as the payment tab does
+    results["calculate_total"] = timed(lambda: latest_bill(rng.choice(patient_names)), iterations,
+                                       setup=entity_cache.invalidate)
+    repeat_name = rng.choice(patient_names)
+    latest_bill(repeat_name)
+    results["calculate_total_repeat"] = timed(lambda: latest_bill(repeat_name), iterations)
+
+    # Bookings go into free future slots; the receipts benchmark then pays for exactly those
+    service_ids = [service["id"] for service in get_service_catalog().active_services()]
+    free_slots = [(date, time_slot) for date, time_slot, free in find_free_slots(count=iterations * 2)
+                  for _ in range(free)][:iterations]
+    booked = []
+
+    def book():
+        date, time_slot = free_slots[len(booked)]
+        booked.append(book_appointment(rng.choice(patient_names), date.isoformat(), time_slot,
+                                       rng.sample(service_ids, 2)))
+    results["book_appointment"] = timed(book, len(free_slots))
+
+    unpaid = list(booked)
+
+    def pay():
+        appointment_id = unpaid.pop()
+        record_payment(appointment_id, "Cash", new_payment_key(appointment_id))
+    results["generate_receipt"] = timed(pay, len(booked))
+    return results
+
+
+def environment():
+    backend = get_backend()
+    info = {"backend": backend.name, "python": platform.python_version(), "platform": platform.platform()}
+    if backend.name == "sqlite":
+        import sqlite3
+
+        info["sqlite_version"] = sqlite3.sqlite_version
+    return info
+
+
+def write_results(path, report):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+
+
+def compare_results(baseline, current):
+    """Print median latency per benchmark against an earlier results file"""
+    print(f"{'benchmark':<24} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            print(f"{name:<24} {'-':>10} {result['median_ms']:>8.2f}ms {'new':>8}")
+            continue
+        change = (result["median_ms"] / before["median_ms"] - 1) if before["median_ms"] else 0.0
+        print(f"{name:<24} {before['median_ms']:>8.2f}ms {result['median_ms']:>8.2f}ms {change:>+8.0%}")
+
+
+def report_header(sizes, generation_seconds, iterations, seed):
+    return {
+        "recorded_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "environment": environment(),
+        "dataset": sizes,
+        "generation_s": round(generation_seconds, 2),
+        "iterations": iterations,
+        "seed": seed,
+    }
@@ -0,0 +1,58 @@
+"""Headless core of the dental clinic app: database, booking, billing and reporting.
+
+The PyQt GUI is a thin client of this package; the maintenance commands also
+run without Qt as "python -m clinic".
+"""
+
+from .backends import MySQLBackend, SQLiteBackend, MySQLDialect, SQLiteDialect
+from .db import (DB_BACKEND, DB_SQLITE_PATH, DB_CONFIG, DB_POOL_SIZE, DB_POOL_TIMEOUT,
+                 DB_HEALTH_CHECK_INTERVAL, DB_BREAKER_FAILURES, DB_BREAKER_COOLDOWN, CircuitBreaker,
+                 ConnectionPool, get_backend, get_dialect, get_db_pool, get_db_connection,
+                 db_connection, close_db_pool, fetch_data)
+from .schema import (SCHEMA_MIGRATIONS, SCHEMA_VERSION, get_schema_version, run_migrations,
+                     setup_database)
+from .diagnostics import (SLOW_QUERY_MS, SLOW_QUERY_LOG, LATENCY_BUCKETS_MS, query_action,
+                          current_action, LatencyHistogram, QueryStats, query_stats, slow_query_logger,
+                          InstrumentedCursor)
+from .entities import ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL, EntityCache, entity_cache
+from .journal import (JOURNAL_PATH, JOURNAL_REPLAY_BATCH, JOURNAL_REPLAY_INTERVAL, valid_entry,
+                      WriteJournal, write_journal, journal_replayers, replay_journal, run_or_journal)
+from .summary import (rebuild_summary_tables, summary_patient_added, summary_appointment_added,
+                      summary_appointment_status_changed, summary_payment_recorded)
+from .stats import (DASHBOARD_STATS_TTL, load_dashboard_stats, get_dashboard_stats,
+                    invalidate_dashboard_stats)
+from .charts import (CHART_CACHE_DIR, STATUS_CHART_COLORS, chart_data_hash, draw_status_pie,
+                     update_status_pie, draw_revenue_bars, update_revenue_bars, DashboardChart,
+                     dashboard_charts, render_chart_png, render_dashboard_charts)
+from .catalog import (CATALOG_CHECK_INTERVAL, DISCOUNT_RATES, ServiceCatalog, service_catalog,
+                      get_service_catalog, save_service, discount_rate_for, price_services,
+                      price_lines)
+from .patients import (DEMOGRAPHIC_TYPES, PATIENT_STATUSES, PATIENT_COLUMNS, patient_record,
+                       get_patient, find_patient, insert_patient, save_patient, update_patient_status)
+from .scheduling import (SCHEDULE_DEFAULT_CAPACITY, SCHEDULE_WEEKS, SCHEDULE_REFRESH_INTERVAL,
+                         SlotUnavailableError, as_date, slot_start, ScheduleIndex, schedule_index,
+                         get_schedule_index, slot_availability, find_free_slots, reserve_slot,
+                         release_slot, restore_slot, record_slot_usage, save_dentist)
+from .appointments import (APPOINTMENT_STATUSES, TIME_SLOTS, PAYMENT_METHODS, create_appointment,
+                           book_appointment, patient_appointments, set_appointment_status,
+                           update_appointment_status, appointment_lines, cached_appointment_lines,
+                           service_usage_report)
+from .billing import (RECEIPT_TEMPLATE_VERSION, RECEIPT_BATCH_SIZE, RECEIPT_TEMPLATE, RECEIPT_LINE,
+                      patient_demographic_type, bill_appointment, latest_bill, build_receipt,
+                      render_receipt, archive_receipt, new_payment_key, charge_appointment,
+                      record_payment, backfill_receipts, regenerate_receipts, reprint_receipts,
+                      receipt_for_payment)
+from .legacy_import import (LEGACY_DATA_DIR, IMPORT_BATCH_SIZE, LEGACY_TIME_SLOTS, ImportReport,
+                            read_patients_txt, read_appointments_txt, read_clinic_json,
+                            import_legacy_data)
+from .export import (EXPORT_CHUNK_SIZE, EXPORT_TABLES, EXPORT_FORMATS, export_format_for,
+                     export_table)
+from .analytics import (ANALYTICS_TTL, ANALYTICS_RETENTION_MONTHS, load_analytics_frames,
+                        compute_analytics, get_analytics, print_analytics)
+from .search import (GRID_SEARCH_DELAY_MS, GRID_SEARCH_CACHE_SIZE, GRID_SEARCH_CACHE_TTL,
+                     GRID_FILTER_COLUMNS, GRID_DATE_COLUMNS, like_prefix, search_condition,
+                     grid_filter_conditions, GridQueryCache, grid_query_cache, grid_page_query,
+                     fetch_grid_page)
+from .changes import (CHANGE_POLL_INTERVAL, CHANGE_FEED_LIMIT, read_change_marks,
+                      fetch_changed_rows, poll_changes)
+from .accounts import (authenticate_patient, register_patient_account, authenticate_admin)
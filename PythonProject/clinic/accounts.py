@@ -0,0 +1,37 @@
+from .db import db_connection
+
+
+def authenticate_patient(email, password):
+    with db_connection() as db:
+        if db is None:
+            raise ConnectionError("Cannot connect to database.")
+        cursor = db.cursor(dictionary=True)
+        cursor.execute("SELECT * FROM patient_accounts WHERE email=%s AND password=%s", (email, password))
+        return cursor.fetchone() is not None
+
+
+def register_patient_account(email, password="123"):
+    """Create a patient account; returns False if the email is already registered"""
+    with db_connection() as db:
+        if db is None:
+            raise ConnectionError("Cannot connect to database.")
+        cursor = db.cursor()
+
+        # Check if email already exists
+        cursor.execute("SELECT * FROM patient_accounts WHERE email=%s", (email,))
+        if cursor.fetchone():
+            return False
+
+        # Create account with default password
+        cursor.execute("INSERT INTO patient_accounts (email, password) VALUES (%s, %s)", (email, password))
+        db.commit()
+        return True
+
+
+def authenticate_admin(username, password):
+    with db_connection() as db:
+        if db is None:
+            raise ConnectionError("Cannot connect to database.")
+        cursor = db.cursor(dictionary=True)
+        cursor.execute("SELECT * FROM admin_accounts WHERE username=%s AND password=%s", (username, password))
+        return cursor.fetchone() is not None
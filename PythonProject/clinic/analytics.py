@@ -0,0 +1,149 @@
+import datetime
+import os
+import threading
+import time
+
+from .db import db_connection, fetch_data
+
+
+# Clinic metrics computed with pandas over four DataFrames pulled in one pass.
+# get_analytics() is the headless entry point; the admin Analytics tab and
+# --analytics both read it.
+ANALYTICS_TTL = float(os.environ.get("DENTAL_ANALYTICS_TTL", "300"))  # seconds
+ANALYTICS_RETENTION_MONTHS = 6
+
+ANALYTICS_QUERIES = {
+    "appointments": ("SELECT id, patient_name, date, time_slot, status FROM appointments",
+                     ["id", "patient_name", "date", "time_slot", "status"]),
+    "lines": ("SELECT aps.appointment_id, s.name AS service, aps.price_at_booking "
+              "FROM appointment_services aps JOIN services s ON s.id = aps.service_id",
+              ["appointment_id", "service", "price_at_booking"]),
+    "payments": ("SELECT appointment_id, amount, date_paid FROM payments",
+                 ["appointment_id", "amount", "date_paid"]),
+    "patients": ("SELECT name, demographic_type FROM patients ORDER BY id",
+                 ["name", "demographic_type"])
+}
+
+_analytics_cache = {"analytics": None, "loaded_at": 0.0}
+_analytics_lock = threading.Lock()
+
+
+def load_analytics_frames(conn):
+    import pandas as pd
+
+    frames = {name: fetch_data(query, conn).reindex(columns=columns)
+              for name, (query, columns) in ANALYTICS_QUERIES.items()}
+    # DECIMAL columns arrive as Decimal objects and DATE columns as datetime.date
+    frames["appointments"]["date"] = pd.to_datetime(frames["appointments"]["date"])
+    frames["lines"]["price_at_booking"] = frames["lines"]["price_at_booking"].astype(float)
+    frames["payments"]["amount"] = frames["payments"]["amount"].astype(float)
+    return frames
+
+
+def compute_analytics(frames, today=None):
+    """Every metric from the frames returned by load_analytics_frames()"""
+    import pandas as pd
+
+    appointments = frames["appointments"]
+    lines = frames["lines"]
+    payments = frames["payments"]
+    today = pd.Timestamp(today or datetime.date.today())
+
+    paid = payments.groupby("appointment_id", as_index=False).agg(paid=("amount", "sum"))
+    paid_appointments = appointments.merge(paid, left_on="id", right_on="appointment_id")
+
+    # Revenue by service: each payment is split across its appointment's services
+    # in proportion to their booked prices, so discounts are shared fairly
+    paid_lines = lines.merge(paid, on="appointment_id")
+    paid_lines["revenue"] = (paid_lines["paid"] * paid_lines["price_at_booking"]
+                             / paid_lines.groupby("appointment_id")["price_at_booking"].transform("sum"))
+    by_service = lines.groupby("service").agg(bookings=("appointment_id", "size"),
+                                              booked_value=("price_at_booking", "sum"))
+    by_service["revenue"] = paid_lines.groupby("service")["revenue"].sum()
+    by_service = by_service.fillna({"revenue": 0.0}).sort_values("revenue", ascending=False).reset_index()
+
+    # Discount class comes from the patient record (latest row wins for repeated names)
+    classes = frames["patients"].drop_duplicates("name", keep="last").set_index("name")["demographic_type"]
+    paid_appointments["discount_class"] = paid_appointments["patient_name"].map(classes).fillna("Unknown")
+    by_discount_class = (paid_appointments.groupby("discount_class")
+                         .agg(appointments=("id", "size"), revenue=("paid", "sum"))
+                         .sort_values("revenue", ascending=False).reset_index())
+    by_time_slot = (paid_appointments.groupby("time_slot")
+                    .agg(appointments=("id", "size"), revenue=("paid", "sum"))
+                    .sort_values("revenue", ascending=False).reset_index())
+
+    # Rates over appointments whose day has passed; a no-show is a past appointment
+    # that was never completed, cancelled or paid
+    past = appointments[appointments["date"] < today]
+    past_paid = past["id"].isin(paid["appointment_id"])
+    cancelled = past["status"] == "Cancelled"
+    no_show = past["status"].isin(["Booked", "Pending"]) & ~past_paid
+    total_past = len(past)
+    rates = {
+        "past_appointments": total_past,
+        "completion_rate": float(((past["status"] == "Complete") | past_paid).mean()) if total_past else 0.0,
+        "cancellation_rate": float(cancelled.mean()) if total_past else 0.0,
+        "no_show_rate": float(no_show.mean()) if total_past else 0.0
+    }
+
+    # Cohort retention: share of each first-visit month's patients seen again N months later
+    visits = appointments.loc[appointments["status"] != "Cancelled", ["patient_name", "date"]]
+    if visits.empty:
+        retention = pd.DataFrame()
+    else:
+        # Months as a running count (year * 12 + month - 1) so offsets are a subtraction
+        month = visits["date"].dt.year * 12 + visits["date"].dt.month - 1
+        first = month.groupby(visits["patient_name"]).transform("min")
+        visits = visits.assign(first=first, offset=month - first)
+        visits = visits[visits["offset"] <= ANALYTICS_RETENTION_MONTHS]
+        counts = visits.groupby(["first", "offset"])["patient_name"].nunique().unstack(fill_value=0)
+        retention = counts.div(counts[0], axis=0).reindex(
+            columns=range(ANALYTICS_RETENTION_MONTHS + 1), fill_value=0.0)
+        # Offsets a cohort has not reached yet are unknown (NaN), not 0% retention
+        elapsed = (today.year * 12 + today.month - 1) - retention.index.to_series()
+        retention = retention.where(pd.DataFrame({offset: (elapsed >= offset) | (offset == 0)
+                                                  for offset in retention.columns}))
+        retention.insert(0, "patients", counts[0])
+        retention.index = [f"{first_month // 12}-{first_month % 12 + 1:02d}" for first_month in retention.index]
+        retention.index.name = "cohort"
+        retention = retention.reset_index()
+        retention.columns.name = None
+
+    return {
+        "revenue_by_service": by_service,
+        "revenue_by_discount_class": by_discount_class,
+        "revenue_by_time_slot": by_time_slot,
+        "rates": rates,
+        "cohort_retention": retention,
+        "generated_at": datetime.datetime.now()
+    }
+
+
+def get_analytics(max_age=ANALYTICS_TTL):
+    """Clinic analytics, served from a cache that is rebuilt after max_age seconds"""
+    with _analytics_lock:
+        cached = _analytics_cache["analytics"]
+        if cached is not None and time.monotonic() - _analytics_cache["loaded_at"] < max_age:
+            return cached
+
+    with db_connection() as db:
+        if db is None:
+            raise ConnectionError("Cannot connect to database.")
+        frames = load_analytics_frames(db)
+    analytics = compute_analytics(frames)
+
+    with _analytics_lock:
+        _analytics_cache["analytics"] = analytics
+        _analytics_cache["loaded_at"] = time.monotonic()
+    return analytics
+
+
+def print_analytics(analytics):
+    rates = analytics["rates"]
+    print(f"Analytics generated {analytics['generated_at']:%Y-%m-%d %H:%M}")
+    print(f"Past appointments: {rates['past_appointments']}, completed {rates['completion_rate']:.1%}, "
+          f"cancelled {rates['cancellation_rate']:.1%}, no-show {rates['no_show_rate']:.1%}")
+    for key in ("revenue_by_service", "revenue_by_discount_class", "revenue_by_time_slot", "cohort_retention"):
+        print(f"\n{key.replace('_', ' ').capitalize()}:")
+        frame = analytics[key]
+        print(frame.to_string(index=False, na_rep="") if not frame.empty else "  No data available")
@@ -0,0 +1,145 @@
+from .catalog import get_service_catalog, service_catalog
+from .db import db_connection
+from .entities import entity_cache
+from .journal import run_or_journal
+from .scheduling import release_slot, reserve_slot, restore_slot, schedule_index
+from .stats import invalidate_dashboard_stats
+from .summary import summary_appointment_added, summary_appointment_status_changed
+
+
+APPOINTMENT_STATUSES = ["Booked", "Pending", "Complete", "Cancelled"]
+TIME_SLOTS = ["9:00 AM", "10:00 AM", "1:00 PM", "2:00 PM", "3:00 PM", "4:00 PM", "5:00 PM"]
+PAYMENT_METHODS = ["Cash", "GCash", "Credit/Debit Card"]
+
+
+def create_appointment(cursor, patient_name, date, time_slot, service_ids, catalog=None):
+    """Insert an appointment, its slot reservation and its service rows at current prices; caller commits"""
+    by_id = (catalog or service_catalog).by_id
+    services = [by_id[service_id] for service_id in service_ids if service_id in by_id]
+
+    # appointments.services keeps a display label for the grids and older terminals;
+    # pricing and reports read appointment_services
+    label = ", ".join(service["name"] for service in services) if services else "No services"
+    cursor.execute(
+        "INSERT INTO appointments (patient_name, date, time_slot, services, status) VALUES (%s, %s, %s, %s, %s)",
+        (patient_name, date, time_slot, label, "Booked"))
+    appointment_id = cursor.lastrowid
+    reserve_slot(cursor, appointment_id, date, time_slot)
+    if services:
+        cursor.executemany(
+            "INSERT INTO appointment_services (appointment_id, service_id, price_at_booking) VALUES (%s, %s, %s)",
+            [(appointment_id, service["id"], service["price"]) for service in services])
+    summary_appointment_added(cursor, "Booked")
+    return appointment_id
+
+
+def book_appointment(patient_name, date, time_slot, service_ids):
+    """Book a slot with the given catalog services; returns the appointment id.
+
+    Raises SlotUnavailableError when the slot is full; nothing is written then.
+    Returns None when the database is unreachable and the booking was queued in
+    the offline journal; the slot is only checked when it is replayed.
+    """
+    def write():
+        with db_connection() as db:
+            if db is None:
+                raise ConnectionError("Cannot connect to database.")
+            cursor = db.cursor()
+            appointment_id = create_appointment(cursor, patient_name, date, time_slot, service_ids,
+                                                get_service_catalog(cursor))
+            db.commit()
+        invalidate_dashboard_stats()
+        schedule_index.record(date, time_slot, 1)
+        entity_cache.invalidate_appointments(patient_name)
+        return appointment_id
+
+    return run_or_journal("book_appointment", {"patient_name": patient_name, "date": date,
+                                               "time_slot": time_slot, "service_ids": list(service_ids)}, write)
+
+
+def patient_appointments(patient_name):
+    """(id, patient_name, date, time_slot, services) of a patient's appointments that are not cancelled, newest first.
+
+    Reads through entity_cache, so the payment tab and the bill share one query.
+    """
+    def load(cursor):
+        cursor.execute(
+            "SELECT id, patient_name, date, time_slot, services FROM appointments "
+            "WHERE patient_name = %s AND status != 'Cancelled' ORDER BY date DESC",
+            (patient_name,))
+        return cursor.fetchall()
+    return list(entity_cache.fetch(("appointments", patient_name), load))
+
+
+def set_appointment_status(cursor, appointment_id, new_status):
+    """Change one appointment's status by id and keep the summaries in step; returns the old status"""
+    cursor.execute("SELECT status, date, time_slot, dentist_id FROM appointments WHERE id = %s FOR UPDATE",
+                   (appointment_id,))
+    row = cursor.fetchone()
+    if row is None:
+        raise LookupError("Appointment not found.")
+    old_status, date, time_slot, dentist_id = row
+    cursor.execute("UPDATE appointments SET status = %s WHERE id = %s", (new_status, appointment_id))
+    summary_appointment_status_changed(cursor, old_status, new_status)
+    # Cancelling frees the place; reinstating takes it back even if the slot has filled since
+    if new_status == "Cancelled" and old_status != "Cancelled":
+        release_slot(cursor, appointment_id, date, time_slot)
+    elif old_status == "Cancelled" and new_status != "Cancelled":
+        restore_slot(cursor, appointment_id, date, time_slot, dentist_id)
+    return old_status
+
+
+def update_appointment_status(appointment_id, new_status):
+    with db_connection() as db:
+        if db is None:
+            raise ConnectionError("Cannot connect to database.")
+        cursor = db.cursor()
+        set_appointment_status(cursor, appointment_id, new_status)
+        cursor.execute("SELECT patient_name FROM appointments WHERE id = %s", (appointment_id,))
+        patient_name = cursor.fetchone()[0]
+        db.commit()
+    invalidate_dashboard_stats()
+    schedule_index.invalidate()
+    entity_cache.invalidate_appointment(appointment_id, patient_name)
+    return new_status
+
+
+def appointment_lines(cursor, appointment_id):
+    """(service_id, name, price_at_booking) line items for one appointment; see cached_appointment_lines"""
+    cursor.execute("""
+        SELECT aps.service_id, s.name, aps.price_at_booking
+        FROM appointment_services aps
+        JOIN services s ON s.id = aps.service_id
+        WHERE aps.appointment_id = %s
+        ORDER BY s.sort_order, s.name
+    """, (appointment_id,))
+    return [(service_id, name, float(price)) for service_id, name, price in cursor.fetchall()]
+
+
+def cached_appointment_lines(appointment_id):
+    """appointment_lines() read through entity_cache; prices at booking never change afterwards"""
+    return list(entity_cache.fetch(("lines", appointment_id),
+                                   lambda cursor: appointment_lines(cursor, appointment_id)))
+
+
+def service_usage_report(start_date, end_date):
+    """Per-service bookings, booked value and paid value for appointments in [start_date, end_date]"""
+    with db_connection() as db:
+        if db is None:
+            raise ConnectionError("Cannot connect to database.")
+        cursor = db.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT s.id AS service_id, s.name,
+                   COUNT(*) AS bookings,
+                   SUM(aps.price_at_booking) AS booked_value,
+                   SUM(paid.appointment_id IS NOT NULL) AS paid_bookings,
+                   SUM(CASE WHEN paid.appointment_id IS NOT NULL THEN aps.price_at_booking ELSE 0 END) AS paid_value
+            FROM appointments a
+            JOIN appointment_services aps ON aps.appointment_id = a.id
+            JOIN services s ON s.id = aps.service_id
+            LEFT JOIN (SELECT DISTINCT appointment_id FROM payments) AS paid ON paid.appointment_id = a.id
+            WHERE a.date BETWEEN %s AND %s AND a.status != 'Cancelled'
+            GROUP BY s.id, s.name
+            ORDER BY booked_value DESC
+        """, (start_date, end_date))
+        return cursor.fetchall()
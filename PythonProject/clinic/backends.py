@@ -0,0 +1,262 @@
+import datetime
+import re
+import sqlite3
+from decimal import Decimal
+from functools import lru_cache
+
+
+# Storage backends. The SQL in this package is written for MySQL; the
+# embedded SQLite backend runs the same statements through its dialect,
+# which rewrites the handful of MySQL-only constructs, and both dialects
+# implement the few operations that are not a single statement (schema
+# introspection, named locks, auto-updated timestamps).
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",      # readers never block the writer
+    "PRAGMA synchronous = NORMAL",    # durable at checkpoints; safe with WAL
+    "PRAGMA busy_timeout = 10000",    # ms to wait for the write lock
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA cache_size = -16000",     # KiB of page cache per connection
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 134217728",
+)
+
+
+class MySQLDialect:
+    name = "mysql"
+
+    def table_exists(self, cursor, table):
+        cursor.execute(
+            "SELECT 1 FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s LIMIT 1",
+            (table,))
+        return cursor.fetchone() is not None
+
+    def index_exists(self, cursor, table, name):
+        cursor.execute(
+            "SELECT 1 FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s LIMIT 1",
+            (table, name))
+        return cursor.fetchone() is not None
+
+    def column_exists(self, cursor, table, name):
+        cursor.execute(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s LIMIT 1",
+            (table, name))
+        return cursor.fetchone() is not None
+
+    def add_updated_at(self, cursor, table, name):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} "
+                       "TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP")
+
+    def acquire_lock(self, cursor, name, timeout):
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (name, timeout))
+        cursor.fetchone()
+
+    def release_lock(self, cursor, name):
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (name,))
+        cursor.fetchone()
+
+
+class SQLiteDialect:
+    name = "sqlite"
+    now = "datetime('now', 'localtime')"
+
+    # (pattern, replacement) applied in order to every statement
+    REWRITES = [
+        (re.compile(r"\bINT AUTO_INCREMENT PRIMARY KEY\b"), "INTEGER PRIMARY KEY AUTOINCREMENT"),
+        (re.compile(r"\bINSERT IGNORE\b"), "INSERT OR IGNORE"),
+        (re.compile(r"\bON DUPLICATE KEY UPDATE\b"), "ON CONFLICT DO UPDATE SET"),
+        (re.compile(r"\bDATE_FORMAT\((\w+), ('[^']*')\)"), r"strftime(\2, \1)"),
+        (re.compile(r"\bNOW\(\)"), now),
+        (re.compile(r"%s"), "?"),
+    ]
+    FOR_UPDATE = re.compile(r"\s+FOR UPDATE\s*$")
+
+    @lru_cache(maxsize=512)
+    def translate(self, sql):
+        """SQLite text of a MySQL statement and whether it asked for row locks"""
+        locking = self.FOR_UPDATE.search(sql) is not None
+        if locking:
+            sql = self.FOR_UPDATE.sub("", sql)
+        for pattern, replacement in self.REWRITES:
+            sql = pattern.sub(replacement, sql)
+        return sql, locking
+
+    def table_exists(self, cursor, table):
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", (table,))
+        return cursor.fetchone() is not None
+
+    def index_exists(self, cursor, table, name):
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND name = %s",
+                       (table, name))
+        return cursor.fetchone() is not None
+
+    def column_exists(self, cursor, table, name):
+        cursor.execute("SELECT 1 FROM pragma_table_info(%s) WHERE name = %s", (table, name))
+        return cursor.fetchone() is not None
+
+    def add_updated_at(self, cursor, table, name):
+        # SQLite has no ON UPDATE CURRENT_TIMESTAMP (nor non-constant defaults on ADD COLUMN): use triggers
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} TIMESTAMP")
+        cursor.execute(f"UPDATE {table} SET {name} = {self.now}")
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_{name}_insert AFTER INSERT ON {table}
+            WHEN NEW.{name} IS NULL
+            BEGIN UPDATE {table} SET {name} = {self.now} WHERE id = NEW.id; END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_{name}_update AFTER UPDATE ON {table}
+            WHEN NEW.{name} IS OLD.{name}
+            BEGIN UPDATE {table} SET {name} = {self.now} WHERE id = NEW.id; END
+        """)
+
+    def acquire_lock(self, cursor, name, timeout):
+        # One embedded database serves one terminal, so there is nobody to wait for
+        pass
+
+    def release_lock(self, cursor, name):
+        pass
+
+
+class SQLiteCursor:
+    """mysql.connector-style cursor over sqlite3: %s parameters, dictionary rows, FOR UPDATE"""
+
+    def __init__(self, connection, dictionary=False):
+        self._connection = connection
+        self._cursor = connection.raw.cursor()
+        self._dictionary = dictionary
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def _prepare(self, sql):
+        sql, locking = self._connection.dialect.translate(sql)
+        if locking and not self._connection.raw.in_transaction:
+            # Row locks become the database write lock, taken up front like FOR UPDATE does
+            self._cursor.execute("BEGIN IMMEDIATE")
+        return sql
+
+    def execute(self, sql, params=()):
+        statement = sql.strip().upper()
+        if statement == "COMMIT":
+            self._connection.commit()
+        elif statement == "ROLLBACK":
+            self._connection.rollback()
+        else:
+            self._cursor.execute(self._prepare(sql), tuple(params or ()))
+
+    def executemany(self, sql, seq_params):
+        self._cursor.executemany(self._prepare(sql), [tuple(params) for params in seq_params])
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {column[0]: value for column, value in zip(self._cursor.description, row)}
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=None):
+        rows = self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany()
+        return [self._row(row) for row in rows]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+
+class SQLiteConnection:
+    """The subset of the mysql.connector connection API the package uses"""
+
+    def __init__(self, raw, dialect):
+        self.raw = raw
+        self.dialect = dialect
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def cursor(self, dictionary=False, buffered=None):
+        # sqlite3 steps rows on demand, so buffered/unbuffered makes no difference here
+        return SQLiteCursor(self, dictionary=dictionary)
+
+    @property
+    def in_transaction(self):
+        return self.raw.in_transaction
+
+    def ping(self, reconnect=False):
+        self.raw.execute("SELECT 1")
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def close(self):
+        self.raw.close()
+
+
+class MySQLBackend:
+    name = "mysql"
+    # Client errors for a server that went away: can't connect, gone away, lost connection (twice)
+    DISCONNECT_ERRNOS = {2003, 2006, 2013, 2055}
+
+    def __init__(self, config):
+        import mysql.connector
+
+        self.config = dict(config)
+        self.driver = mysql.connector
+        self.Error = mysql.connector.Error
+        self.OperationalError = mysql.connector.errors.OperationalError
+        self.PoolError = mysql.connector.errors.PoolError
+        self.dialect = MySQLDialect()
+
+    def connect(self):
+        return self.driver.connect(**self.config)
+
+    def is_disconnect(self, error):
+        """True if the error means the connection to the server is gone, not that the statement failed"""
+        return getattr(error, "errno", None) in self.DISCONNECT_ERRNOS
+
+
+def _parse_datetime(value):
+    return datetime.datetime.fromisoformat(value.decode())
+
+
+def _parse_date(value):
+    return datetime.date.fromisoformat(value.decode()[:10])
+
+
+class SQLiteBackend:
+    """Embedded database in one file: WAL journal, tuned pragmas, no server and no network hop"""
+    name = "sqlite"
+    Error = sqlite3.Error
+    OperationalError = sqlite3.OperationalError
+    PoolError = sqlite3.OperationalError
+
+    def __init__(self, path):
+        self.path = path
+        self.dialect = SQLiteDialect()
+        # Same Python types as mysql.connector returns: DATE -> date, DATETIME -> datetime, DECIMAL -> Decimal
+        sqlite3.register_adapter(Decimal, str)
+        sqlite3.register_adapter(datetime.date, lambda value: value.isoformat())
+        sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(" ", timespec="seconds"))
+        sqlite3.register_converter("DATE", _parse_date)
+        sqlite3.register_converter("DATETIME", _parse_datetime)
+        sqlite3.register_converter("TIMESTAMP", _parse_datetime)
+        sqlite3.register_converter("DECIMAL", lambda value: Decimal(value.decode()))
+
+    def connect(self):
+        # Pooled connections move between worker threads, one borrower at a time
+        raw = sqlite3.connect(self.path, timeout=10, detect_types=sqlite3.PARSE_DECLTYPES,
+                              isolation_level="IMMEDIATE", check_same_thread=False)
+        for pragma in SQLITE_PRAGMAS:
+            raw.execute(pragma)
+        return SQLiteConnection(raw, self.dialect)
+
+    def is_disconnect(self, error):
+        """True if the database file itself became unreachable (unmounted share, missing directory)"""
+        return isinstance(error, sqlite3.OperationalError) and str(error).startswith(
+            ("unable to open database", "disk I/O error"))
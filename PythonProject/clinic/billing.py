@@ -0,0 +1,311 @@
+import datetime
+import json
+import string
+import time
+import uuid
+
+from .appointments import (appointment_lines, cached_appointment_lines, patient_appointments,
+                           set_appointment_status)
+from .catalog import price_lines
+from .db import db_connection
+from .entities import entity_cache
+from .journal import run_or_journal
+from .patients import find_patient
+from .scheduling import as_date
+from .stats import invalidate_dashboard_stats
+from .summary import summary_payment_recorded
+
+
+# A receipt is rendered from the priced line items with one module-level
+# template and archived next to its payment: the JSON data it was rendered
+# from plus the text as issued. Audits reprint straight from the archive;
+# after a template change regenerate_receipts() re-renders the stored data.
+RECEIPT_TEMPLATE_VERSION = 1
+RECEIPT_BATCH_SIZE = 500
+
+RECEIPT_TEMPLATE = string.Template("""
+=====================================
+  SMILE CARE DENTAL CLINIC
+    OFFICIAL RECEIPT
+=====================================
+Receipt No: $receipt_no
+Patient: $patient_name
+Date: $date
+Time: $time
+Payment Method: $method
+=====================================
+             SERVICES
+=====================================
+$lines
+=====================================
+Subtotal: PHP $base_total
+Discount: $discount
+Total Amount: PHP $total
+Payment Date: $date_paid
+=====================================
+
+Thank you for choosing Smile Care Dental Clinic!
+""")
+RECEIPT_LINE = "  \u2022 {:<25} PHP {:>8,.2f}".format
+
+
+def patient_demographic_type(cursor, patient_name):
+    cursor.execute("SELECT demographic_type FROM patients WHERE name = %s ORDER BY id DESC LIMIT 1",
+                   (patient_name,))
+    row = cursor.fetchone()
+    return row[0] if row and row[0] else "Regular"
+
+
+def bill_appointment(cursor, appointment_id, patient_name):
+    """Price one appointment at the prices agreed when it was booked, after the patient's discount"""
+    bill = price_lines(appointment_lines(cursor, appointment_id), patient_demographic_type(cursor, patient_name))
+    bill["appointment_id"] = appointment_id
+    return bill
+
+
+def latest_bill(patient_name):
+    """Bill for the patient's most recent appointment that is not cancelled, or None if there is none.
+
+    Everything it reads goes through entity_cache: asking again for the same patient runs no queries.
+    The amount actually charged is recomputed by charge_appointment inside the payment transaction.
+    """
+    appointments = patient_appointments(patient_name)
+    if not appointments:
+        return None
+    appointment_id = appointments[0][0]
+    patient = find_patient(patient_name)
+    demographic_type = patient["demographic_type"] if patient and patient["demographic_type"] else "Regular"
+    bill = price_lines(cached_appointment_lines(appointment_id), demographic_type)
+    bill["appointment_id"] = appointment_id
+    return bill
+
+
+def build_receipt(payment_id, patient_name, appointment_date, time_slot, method, bill, date_paid, total=None):
+    """Receipt data (JSON-safe) for one payment; `total` overrides the bill when the amount paid differs"""
+    return {
+        "receipt_no": f"OR-{payment_id:08d}",
+        "payment_id": payment_id,
+        "appointment_id": bill["appointment_id"],
+        "patient_name": patient_name,
+        "date": str(appointment_date),
+        "time": time_slot,
+        "method": method,
+        "lines": [[service_id, name, float(price)] for service_id, name, price in bill["lines"]],
+        "base_total": float(bill["base_total"]),
+        "discount_rate": float(bill["discount_rate"]),
+        "discount_amount": float(bill["discount_amount"]),
+        "total": float(bill["total"] if total is None else total),
+        "date_paid": date_paid.strftime("%Y-%m-%d %H:%M")
+    }
+
+
+def render_receipt(receipt):
+    lines = "\n".join(RECEIPT_LINE(name, price) for _, name, price in receipt["lines"]) or "  (no services)"
+    discount = "None"
+    if receipt["discount_rate"] > 0:
+        discount = f"{receipt['discount_rate'] * 100:.0f}% (PHP {receipt['discount_amount']:,.2f})"
+    return RECEIPT_TEMPLATE.substitute(
+        receipt_no=receipt["receipt_no"],
+        patient_name=receipt["patient_name"],
+        date=receipt["date"],
+        time=receipt["time"],
+        method=receipt["method"],
+        lines=lines,
+        base_total=f"{receipt['base_total']:,.2f}",
+        discount=discount,
+        total=f"{receipt['total']:,.2f}",
+        date_paid=receipt["date_paid"])
+
+
+def archive_receipt(cursor, receipt, issued_at):
+    """Store a receipt with its payment; caller commits. Returns the rendered text."""
+    body = render_receipt(receipt)
+    cursor.execute(
+        "INSERT INTO receipts (payment_id, appointment_id, patient_name, issued_at, total, template_version, "
+        "data, body) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+        (receipt["payment_id"], receipt["appointment_id"], receipt["patient_name"], issued_at, receipt["total"],
+         RECEIPT_TEMPLATE_VERSION, json.dumps(receipt), body))
+    return body
+
+
+def new_payment_key(appointment_id):
+    """Idempotency key for one payment attempt: reuse it for every retry of that attempt"""
+    return f"{appointment_id}:{uuid.uuid4().hex}"
+
+
+def charge_appointment(cursor, appointment_id, method, idempotency_key):
+    """Payment, receipt, summaries and status change for one appointment; caller commits.
+
+    Returns (bill, receipt_text, replayed); replayed means this key already paid
+    it and nothing was written. Raises LookupError when the appointment is
+    missing, cancelled or already paid under another key.
+    """
+    # Locking the appointment row serializes terminals paying the same appointment
+    cursor.execute("SELECT patient_name, date, time_slot, status FROM appointments WHERE id = %s FOR UPDATE",
+                   (appointment_id,))
+    appointment = cursor.fetchone()
+    if not appointment:
+        raise LookupError("Appointment not found.")
+    patient_name, date, time_slot, status = appointment
+
+    cursor.execute("""
+        SELECT p.idempotency_key, r.body
+        FROM payments p
+        LEFT JOIN receipts r ON r.payment_id = p.id
+        WHERE p.appointment_id = %s
+        ORDER BY p.id
+        LIMIT 1
+    """, (appointment_id,))
+    paid = cursor.fetchone()
+    bill = bill_appointment(cursor, appointment_id, patient_name)
+    if paid is not None:
+        if paid[0] == idempotency_key:
+            return bill, paid[1], True
+        raise LookupError("This appointment has already been paid.")
+    if status == "Cancelled":
+        raise LookupError("This appointment was cancelled.")
+
+    total_amount = bill["total"]
+    date_paid = datetime.datetime.now()
+    cursor.execute(
+        "INSERT INTO payments (appointment_id, amount, method, date_paid, idempotency_key) "
+        "VALUES (%s, %s, %s, %s, %s)",
+        (appointment_id, total_amount, method, date_paid, idempotency_key))
+    receipt = build_receipt(cursor.lastrowid, patient_name, date, time_slot, method, bill, date_paid)
+    receipt_text = archive_receipt(cursor, receipt, date_paid)
+    summary_payment_recorded(cursor, total_amount, date_paid)
+    set_appointment_status(cursor, appointment_id, "Complete")
+    return bill, receipt_text, False
+
+
+def record_payment(appointment_id, method, idempotency_key):
+    """Charge an appointment in one transaction: payment, receipt, summaries and status commit together.
+
+    Retrying with the same key returns the first attempt's result instead of charging again.
+    Returns (bill, receipt_text, replayed), or None when the database is unreachable and the
+    payment was queued in the offline journal (its receipt is archived when it is replayed).
+    Raises LookupError when the appointment is missing, cancelled or already paid under another key.
+    """
+    def write():
+        with db_connection() as db:
+            if db is None:
+                raise ConnectionError("Cannot connect to database.")
+            bill, receipt_text, replayed = charge_appointment(db.cursor(), appointment_id, method,
+                                                              idempotency_key)
+            if replayed:
+                db.rollback()
+                return bill, receipt_text, True
+            db.commit()
+        invalidate_dashboard_stats()
+        entity_cache.invalidate_appointment(appointment_id)
+        return bill, receipt_text, False
+
+    return run_or_journal("record_payment", {"appointment_id": appointment_id, "method": method,
+                                             "idempotency_key": idempotency_key}, write)
+
+
+def backfill_receipts(cursor, batch_size=RECEIPT_BATCH_SIZE):
+    """Archive receipts for payments that predate the archive; returns how many were added"""
+    added = 0
+    while True:
+        cursor.execute("""
+            SELECT p.id, p.appointment_id, p.amount, p.method, p.date_paid, a.patient_name, a.date, a.time_slot
+            FROM payments p
+            JOIN appointments a ON a.id = p.appointment_id
+            LEFT JOIN receipts r ON r.payment_id = p.id
+            WHERE r.payment_id IS NULL
+            ORDER BY p.id
+            LIMIT %s
+        """, (batch_size,))
+        payments = cursor.fetchall()
+        if not payments:
+            return added
+        for payment_id, appointment_id, amount, method, date_paid, patient_name, date, time_slot in payments:
+            bill = bill_appointment(cursor, appointment_id, patient_name)
+            receipt = build_receipt(payment_id, patient_name, date, time_slot, method, bill, date_paid,
+                                    total=amount)
+            archive_receipt(cursor, receipt, date_paid)
+        cursor.execute("COMMIT")
+        added += len(payments)
+
+
+def regenerate_receipts(force=False, batch_size=RECEIPT_BATCH_SIZE):
+    """Archive any missing receipts, then re-render stored ones from an older template (or all, with force)"""
+    started = time.perf_counter()
+    with db_connection() as db:
+        if db is None:
+            raise ConnectionError("Cannot connect to database.")
+        cursor = db.cursor()
+        added = backfill_receipts(cursor, batch_size)
+
+        rerendered = 0
+        last_id = 0
+        max_version = RECEIPT_TEMPLATE_VERSION + 1 if force else RECEIPT_TEMPLATE_VERSION
+        while True:
+            cursor.execute(
+                "SELECT payment_id, data FROM receipts WHERE payment_id > %s AND template_version < %s "
+                "ORDER BY payment_id LIMIT %s",
+                (last_id, max_version, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            cursor.executemany(
+                "UPDATE receipts SET body = %s, template_version = %s WHERE payment_id = %s",
+                [(render_receipt(json.loads(data)), RECEIPT_TEMPLATE_VERSION, payment_id)
+                 for payment_id, data in rows])
+            db.commit()
+            rerendered += len(rows)
+            last_id = rows[-1][0]
+    print(f"Receipts: {added} archived, {rerendered} re-rendered in {time.perf_counter() - started:.2f}s")
+    return added, rerendered
+
+
+def reprint_receipts(path, start_date=None, end_date=None, patient_name=None):
+    """Write archived receipts issued in [start_date, end_date] to one text file, page-separated; returns the count"""
+    conditions, params = [], []
+    if patient_name:
+        conditions.append("patient_name = %s")
+        params.append(patient_name)
+    if start_date:
+        conditions.append("issued_at >= %s")
+        params.append(as_date(start_date))
+    if end_date:
+        conditions.append("issued_at < %s")
+        params.append(as_date(end_date) + datetime.timedelta(days=1))
+    sql = "SELECT body FROM receipts"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY issued_at, payment_id"
+
+    count = 0
+    with db_connection() as db:
+        if db is None:
+            raise ConnectionError("Cannot connect to database.")
+        stream = db.cursor(buffered=False)
+        with open(path, "w", encoding="utf-8") as handle:
+            try:
+                stream.execute(sql, params)
+                while True:
+                    rows = stream.fetchmany(RECEIPT_BATCH_SIZE)
+                    if not rows:
+                        break
+                    for body, in rows:
+                        if count:
+                            handle.write("\f")  # page break between receipts
+                        handle.write(body)
+                        count += 1
+            finally:
+                stream.close()
+    return count
+
+
+def receipt_for_payment(payment_id):
+    with db_connection() as db:
+        if db is None:
+            raise ConnectionError("Cannot connect to database.")
+        cursor = db.cursor()
+        cursor.execute("SELECT body FROM receipts WHERE payment_id = %s", (payment_id,))
+        row = cursor.fetchone()
+    if row is None:
+        raise LookupError("Receipt not found.")
+    return row[0]
@@ -0,0 +1,137 @@
+import threading
+import time
+
+from .db import db_connection
+
+
+CATALOG_CHECK_INTERVAL = 30  # seconds between version checks of a loaded catalog
+
+DISCOUNT_RATES = {
+    "Senior": 0.20,
+    "Student": 0.10,
+    "PWD": 0.20
+}
+
+
+class ServiceCatalog:
+    """In-memory copy of the services table, keyed by id and stamped with the catalog version.
+
+    Catalog edits bump app_settings.service_catalog_version; a loaded catalog
+    re-checks that single value at most every CATALOG_CHECK_INTERVAL seconds
+    and reloads only when it changed.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.by_id = {}
+        self.by_name = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self.version is not None
+
+    def _read_version(self, cursor):
+        cursor.execute("SELECT value FROM app_settings WHERE name = 'service_catalog_version'")
+        row = cursor.fetchone()
+        return row[0] if row else "0"
+
+    def load(self, cursor):
+        version = self._read_version(cursor)
+        cursor.execute("SELECT id, name, price, active, sort_order FROM services ORDER BY sort_order, name")
+        by_id = {}
+        for service_id, name, price, active, sort_order in cursor.fetchall():
+            by_id[service_id] = {
+                "id": service_id,
+                "name": name,
+                "price": float(price),
+                "active": bool(active),
+                "sort_order": sort_order
+            }
+        with self._lock:
+            # Swap whole dicts so readers on other threads never see a half-built catalog
+            self.by_id = by_id
+            self.by_name = {service["name"]: service for service in by_id.values()}
+            self.version = version
+            self._checked_at = time.monotonic()
+
+    def ensure_current(self, cursor, max_age=CATALOG_CHECK_INTERVAL):
+        if self.loaded and time.monotonic() - self._checked_at < max_age:
+            return
+        if self.loaded and self._read_version(cursor) == self.version:
+            self._checked_at = time.monotonic()
+            return
+        self.load(cursor)
+
+    def invalidate(self):
+        self._checked_at = 0.0
+
+    def active_services(self):
+        return [service for service in self.by_id.values() if service["active"]]
+
+    def ids_for_names(self, names):
+        """Map service names to ids by exact match; unknown names are skipped"""
+        by_name = self.by_name
+        return [by_name[name]["id"] for name in names if name in by_name]
+
+
+service_catalog = ServiceCatalog()
+
+
+def get_service_catalog(cursor=None):
+    """The shared catalog, loaded or refreshed if needed (pass a cursor to reuse a borrowed connection)"""
+    if cursor is not None:
+        service_catalog.ensure_current(cursor)
+        return service_catalog
+    with db_connection() as db:
+        if db is None:
+            if service_catalog.loaded:
+                return service_catalog
+            raise ConnectionError("Cannot connect to database.")
+        service_catalog.ensure_current(db.cursor())
+    return service_catalog
+
+
+def save_service(name, price, active=True):
+    """Add or reprice a catalog entry and bump the catalog version"""
+    with db_connection() as db:
+        if db is None:
+            raise ConnectionError("Cannot connect to database.")
+        cursor = db.cursor()
+        cursor.execute(
+            "INSERT INTO services (name, price, active) VALUES (%s, %s, %s) "
+            "ON DUPLICATE KEY UPDATE price = %s, active = %s",
+            (name, price, int(active), price, int(active)))
+        cursor.execute("UPDATE app_settings SET value = value + 1 WHERE name = 'service_catalog_version'")
+        db.commit()
+    service_catalog.invalidate()
+
+
+def discount_rate_for(demographic_type):
+    return DISCOUNT_RATES.get(demographic_type, 0)
+
+
+def price_services(service_ids, demographic_type, catalog=None):
+    """Price a list of service ids in one pass at current catalog prices"""
+    by_id = (catalog or service_catalog).by_id
+    lines = [(service_id, by_id[service_id]["name"], by_id[service_id]["price"])
+             for service_id in service_ids if service_id in by_id]
+    return price_lines(lines, demographic_type)
+
+
+def price_lines(lines, demographic_type):
+    """Totals for (service_id, name, price) line items after the demographic discount"""
+    base_total = 0.0
+    for _, _, price in lines:
+        base_total += price
+
+    discount_rate = discount_rate_for(demographic_type)
+    discount_amount = base_total * discount_rate
+    return {
+        "lines": lines,
+        "base_total": base_total,
+        "discount_rate": discount_rate,
+        "discount_amount": discount_amount,
+        "total": base_total - discount_amount
+    }
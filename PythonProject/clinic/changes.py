@@ -0,0 +1,63 @@
+import os
+
+from .db import db_connection
+from .stats import get_dashboard_stats, invalidate_dashboard_stats
+
+
+# The admin dashboard polls one cheap watermark query (index-backed MAX()
+# lookups) and only when a watermark moves fetches the rows behind it.
+# Payments are insert-only, so their id is enough; patients and appointments
+# also carry updated_at for edits.
+CHANGE_POLL_INTERVAL = float(os.environ.get("DENTAL_POLL_INTERVAL", "5"))  # seconds, 0 turns polling off
+CHANGE_FEED_LIMIT = 500  # more changed rows than this and the grid reloads instead
+
+CHANGE_WATERMARK_QUERY = """
+    SELECT (SELECT MAX(id) FROM patients), (SELECT MAX(updated_at) FROM patients),
+           (SELECT MAX(id) FROM appointments), (SELECT MAX(updated_at) FROM appointments),
+           (SELECT MAX(id) FROM payments)
+"""
+
+
+def read_change_marks(cursor):
+    cursor.execute(CHANGE_WATERMARK_QUERY)
+    patient_id, patient_updated, appointment_id, appointment_updated, payment_id = cursor.fetchone()
+    return {
+        "patients": (patient_id or 0, patient_updated),
+        "appointments": (appointment_id or 0, appointment_updated),
+        "payments": (payment_id or 0, None)
+    }
+
+
+def fetch_changed_rows(cursor, table, columns, mark):
+    """Rows of `table` inserted or edited since `mark`, or None if there are too many to merge"""
+    last_id, last_updated = mark
+    sql = f"SELECT id, {', '.join(columns)} FROM {table}"
+    if last_updated is None:
+        sql += " WHERE id > %s ORDER BY id LIMIT %s"
+        params = (last_id, CHANGE_FEED_LIMIT + 1)
+    else:
+        # >= because updated_at has one-second resolution; re-sent rows are simply merged again
+        sql += " WHERE updated_at >= %s ORDER BY updated_at LIMIT %s"
+        params = (last_updated, CHANGE_FEED_LIMIT + 1)
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    return None if len(rows) > CHANGE_FEED_LIMIT else rows
+
+
+def poll_changes(marks, columns_by_table):
+    """New watermarks plus changed rows for the watched tables; the first poll (empty marks) only sets a baseline"""
+    with db_connection() as db:
+        if db is None:
+            raise ConnectionError("Cannot connect to database.")
+        cursor = db.cursor()
+        current = read_change_marks(cursor)
+        changed = [table for table in current if marks and current[table] != marks[table]]
+        rows = {table: fetch_changed_rows(cursor, table, columns_by_table[table], marks[table])
+                for table in changed if table in columns_by_table}
+
+    stats = None
+    if changed:
+        # Something was written, possibly from another terminal: the summary cards are stale too
+        invalidate_dashboard_stats()
+        stats = get_dashboard_stats()
+    return {"marks": current, "changed": changed, "rows": rows, "stats": stats}
@@ -0,0 +1,151 @@
+import hashlib
+import math
+import os
+
+from .stats import get_dashboard_stats
+
+
+# The two dashboard charts live in module-level figures that outlive the
+# window. New numbers move the existing wedges and bars; a full redraw (and
+# tight_layout) only happens when the labels change, and nothing is redrawn
+# when the data hash matches what is already on screen. The same drawing code
+# renders PNGs off-screen for the headless report, cached by data hash.
+CHART_CACHE_DIR = os.environ.get("DENTAL_CHART_CACHE",
+                                 os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "chart_cache"))
+STATUS_CHART_COLORS = ['#007acc', '#28a745', '#ffc107', '#dc3545']
+
+
+def chart_data_hash(data):
+    # Stable across runs (unlike hash()) so it can name cached PNGs
+    return hashlib.sha1(repr(data).encode("utf-8")).hexdigest()[:16]
+
+
+def draw_no_data(ax):
+    ax.text(0.5, 0.5, 'No data available', ha='center', va='center')
+    return None
+
+
+def draw_status_pie(ax, status_data):
+    if not status_data:
+        return draw_no_data(ax)
+    statuses = [row[0] for row in status_data]
+    counts = [row[1] for row in status_data]
+    wedges, texts, autotexts = ax.pie(counts, labels=statuses, autopct='%1.1f%%',
+                                      colors=STATUS_CHART_COLORS[:len(statuses)])
+    ax.set_title('Appointment Status Distribution')
+    return wedges, texts, autotexts
+
+
+def update_status_pie(artists, status_data):
+    """Re-angle the existing wedges and move their labels (same geometry as Axes.pie's defaults)"""
+    wedges, texts, autotexts = artists
+    total = sum(row[1] for row in status_data)
+    if total <= 0:
+        return False
+    theta = 0.0
+    for wedge, text, autotext, (_, count) in zip(wedges, texts, autotexts, status_data):
+        span = 360.0 * count / total
+        wedge.set_theta1(theta)
+        wedge.set_theta2(theta + span)
+        middle = math.radians(theta + span / 2)
+        x, y = math.cos(middle), math.sin(middle)
+        text.set_position((1.1 * x, 1.1 * y))
+        text.set_horizontalalignment('left' if x > 0 else 'right')
+        autotext.set_position((0.6 * x, 0.6 * y))
+        autotext.set_text(f"{100.0 * count / total:.1f}%")
+        theta += span
+    return True
+
+
+def draw_revenue_bars(ax, revenue_data):
+    if not revenue_data:
+        return draw_no_data(ax)
+    months = [row[0] for row in revenue_data]
+    amounts = [row[1] for row in revenue_data]
+    bars = ax.bar(months, amounts, color='#007acc')
+    ax.set_title('Monthly Revenue')
+    ax.set_xlabel('Month')
+    ax.set_ylabel('Revenue (PHP)')
+    ax.tick_params(axis='x', rotation=45)
+    return ax, bars
+
+
+def update_revenue_bars(artists, revenue_data):
+    ax, bars = artists
+    for bar, (_, amount) in zip(bars, revenue_data):
+        bar.set_height(amount)
+    ax.relim()
+    ax.autoscale_view()
+    return True
+
+
+class DashboardChart:
+    def __init__(self, name, draw, update, figsize=(6, 4)):
+        self.name = name
+        self.draw = draw
+        self.update = update
+        self.figsize = figsize
+        self.figure = None
+        self.canvas = None
+        self.artists = None
+        self.labels = None
+        self.data_hash = None
+
+    def attach(self, canvas_class):
+        """A canvas (e.g. the Qt one) for this chart's figure; the figure itself is built once per process"""
+        if self.figure is None:
+            from matplotlib.figure import Figure
+
+            self.figure = Figure(figsize=self.figsize)
+        self.canvas = canvas_class(self.figure)
+        return self.canvas
+
+    def show(self, data):
+        """Bring the figure up to date with data; returns False when nothing changed"""
+        data = tuple(tuple(row) for row in data)
+        data_hash = chart_data_hash(data)
+        if data_hash == self.data_hash:
+            return False
+        labels = tuple(row[0] for row in data)
+        if not (self.artists is not None and labels == self.labels and self.update(self.artists, data)):
+            self.figure.clear()
+            self.artists = self.draw(self.figure.add_subplot(111), data)
+            self.figure.tight_layout()
+            self.labels = labels
+        self.data_hash = data_hash
+        if self.canvas is not None:
+            self.canvas.draw_idle()
+        return True
+
+
+dashboard_charts = {
+    "status_counts": DashboardChart("status_counts", draw_status_pie, update_status_pie),
+    "monthly_revenue": DashboardChart("monthly_revenue", draw_revenue_bars, update_revenue_bars)
+}
+
+
+def render_chart_png(chart, data, directory=CHART_CACHE_DIR):
+    """Render one dashboard chart off-screen to PNG, reusing an earlier render of the same data"""
+    data = tuple(tuple(row) for row in data)
+    path = os.path.join(directory, f"{chart.name}_{chart_data_hash(data)}.png")
+    if os.path.exists(path):
+        return path
+
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    figure = Figure(figsize=chart.figsize)
+    FigureCanvasAgg(figure)
+    chart.draw(figure.add_subplot(111), data)
+    figure.tight_layout()
+    os.makedirs(directory, exist_ok=True)
+    figure.savefig(path, dpi=100)
+    return path
+
+
+def render_dashboard_charts(directory=CHART_CACHE_DIR):
+    """PNG paths for the current dashboard charts, keyed by chart name"""
+    stats = get_dashboard_stats()
+    if stats is None:
+        raise ConnectionError("Cannot connect to database.")
+    return {name: render_chart_png(chart, stats[name], directory) for name, chart in dashboard_charts.items()}
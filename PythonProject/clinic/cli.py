@@ -0,0 +1,91 @@
+import sys
+import time
+
+from .analytics import get_analytics, print_analytics
+from .billing import regenerate_receipts, reprint_receipts
+from .charts import render_dashboard_charts
+from .db import close_db_pool
+from .diagnostics import query_action
+from .export import export_table
+from .journal import replay_journal
+from .legacy_import import import_legacy_data
+from .schema import setup_database
+
+
+# Headless maintenance commands, shared by "python -m clinic" and the GUI script:
+#   --import-legacy [DIR]
+#   --dashboard-charts [DIR]
+#   --regenerate-receipts [--force]
+#   --reprint-receipts FILE [FROM [TO]]   (dates as YYYY-MM-DD)
+#   --analytics
+#   --export TABLE FILE.csv|FILE.parquet [--incremental]
+#   --replay-journal
+def command_import_legacy(args):
+    import_legacy_data(*args[:1])
+
+
+def command_dashboard_charts(args):
+    for name, path in render_dashboard_charts(*args[:1]).items():
+        print(f"{name}: {path}")
+
+
+def command_regenerate_receipts(args):
+    regenerate_receipts(force="--force" in args)
+
+
+def command_reprint_receipts(args):
+    started = time.perf_counter()
+    count = reprint_receipts(args[0], *args[1:3])
+    print(f"Reprinted {count} receipts to {args[0]} in {time.perf_counter() - started:.2f}s")
+
+
+def command_analytics(args):
+    print_analytics(get_analytics())
+
+
+def command_export(args):
+    started = time.perf_counter()
+    count = export_table(args[0], args[1], incremental="--incremental" in args[2:])
+    print(f"Exported {count} {args[0]} rows to {args[1]} in {time.perf_counter() - started:.2f}s")
+
+
+def command_replay_journal(args):
+    if replay_journal() == (0, 0):
+        print("No queued writes to replay")
+
+
+COMMANDS = {
+    # flag: (handler, required arguments)
+    "--import-legacy": (command_import_legacy, 0),
+    "--dashboard-charts": (command_dashboard_charts, 0),
+    "--regenerate-receipts": (command_regenerate_receipts, 0),
+    "--reprint-receipts": (command_reprint_receipts, 1),
+    "--analytics": (command_analytics, 0),
+    "--export": (command_export, 2),
+    "--replay-journal": (command_replay_journal, 0),
+}
+
+
+def is_command(argv):
+    """True if argv (without the program name) asks for a headless command"""
+    return bool(argv) and argv[0] in COMMANDS and len(argv) - 1 >= COMMANDS[argv[0]][1]
+
+
+def run_command(argv):
+    """Run a headless command against an already set up database"""
+    handler, _ = COMMANDS[argv[0]]
+    with query_action(argv[0].lstrip("-")):
+        handler(argv[1:])
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not is_command(argv):
+        print("usage: python -m clinic " + " | ".join(COMMANDS), file=sys.stderr)
+        return 2
+    setup_database()
+    try:
+        run_command(argv)
+    finally:
+        close_db_pool()
+    return 0
@@ -0,0 +1,356 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from .backends import MySQLBackend, SQLiteBackend
+from .diagnostics import SLOW_QUERY_LOG, SLOW_QUERY_MS, InstrumentedCursor, query_stats
+
+
+# "mysql" (a server shared by every terminal) or "sqlite" (one embedded file, single terminal)
+DB_BACKEND = os.environ.get("DENTAL_DB_BACKEND", "mysql")
+DB_SQLITE_PATH = os.environ.get("DENTAL_DB_PATH",
+                                os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                             "dental_clinic.db"))
+DB_CONFIG = {
+    "host": os.environ.get("DENTAL_DB_HOST", "localhost"),
+    "user": os.environ.get("DENTAL_DB_USER", "root"),
+    "password": os.environ.get("DENTAL_DB_PASSWORD", ""),
+    "database": os.environ.get("DENTAL_DB_NAME", "dental_clinic"),
+    "charset": "utf8mb4",
+    "connection_timeout": int(os.environ.get("DENTAL_DB_CONNECT_TIMEOUT", "5")),
+}
+DB_POOL_SIZE = int(os.environ.get("DENTAL_DB_POOL_SIZE", "5"))
+DB_POOL_TIMEOUT = 10  # seconds to wait for a free connection
+DB_HEALTH_CHECK_INTERVAL = 30  # ping connections that sat idle longer than this
+
+# After DB_BREAKER_FAILURES connect attempts fail in a row the pool stops
+# trying for DB_BREAKER_COOLDOWN seconds: checkouts fail at once instead of
+# each click blocking on a dead server. The first checkout after the cooldown
+# is let through as a probe; it closes the breaker again or reopens it.
+DB_BREAKER_FAILURES = int(os.environ.get("DENTAL_DB_BREAKER_FAILURES", "3"))
+DB_BREAKER_COOLDOWN = float(os.environ.get("DENTAL_DB_BREAKER_COOLDOWN", "30"))
+
+
+class CircuitBreaker:
+    """Counts consecutive connect failures and opens after too many; thread-safe"""
+
+    def __init__(self, failures=DB_BREAKER_FAILURES, cooldown=DB_BREAKER_COOLDOWN):
+        self.failures = max(1, int(failures))
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failed = 0
+        self._opened_at = None
+        self.trips = 0
+
+    @property
+    def state(self):
+        """"closed", "open" (failing fast) or "half-open" (the next caller probes the server)"""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "open" if time.monotonic() - self._opened_at < self.cooldown else "half-open"
+
+    def retry_in(self):
+        """Seconds until the next probe is let through (0 when closed)"""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.cooldown:
+                return False
+            # Let this caller probe; everyone else keeps failing fast until it reports back
+            self._opened_at = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failed = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failed += 1
+            if self._failed >= self.failures:
+                if self._opened_at is None:
+                    self.trips += 1
+                self._opened_at = time.monotonic()
+
+
+class PooledConnection:
+    """Borrowed connection; close() hands it back to the pool instead of disconnecting"""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise self._pool.backend.OperationalError("Connection already returned to the pool")
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        if self._conn is None:
+            raise self._pool.backend.OperationalError("Connection already returned to the pool")
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs))
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn)
+
+
+class ConnectionPool:
+    """Fixed-size pool of database connections shared by every handler"""
+
+    def __init__(self, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT,
+                 health_check_interval=DB_HEALTH_CHECK_INTERVAL, backend=None):
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.backend = backend or get_backend()
+        self.breaker = CircuitBreaker()
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._open = 0
+        self._stats = {
+            "connects": 0,       # brand-new TCP/auth handshakes
+            "checkouts": 0,      # total borrows
+            "reused": 0,         # borrows served by an idle connection
+            "waits": 0,          # borrows that had to wait for a free connection
+            "wait_time": 0.0,    # seconds spent waiting
+            "timeouts": 0,       # waits that gave up after self.timeout
+            "health_checks": 0,
+            "reconnects": 0,     # stale connections replaced on checkout
+            "discarded": 0,      # broken connections dropped on return
+            "rejected": 0,       # checkouts refused while the breaker was open
+            "in_use": 0,
+        }
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _connect(self):
+        try:
+            conn = self.backend.connect()
+        except self.backend.Error:
+            self.breaker.record_failure()
+            raise
+        self._count("connects")
+        return conn
+
+    def _reserve_slot(self):
+        with self._lock:
+            if self._open < self.size:
+                self._open += 1
+                return True
+            return False
+
+    def _free_slot(self):
+        with self._lock:
+            self._open -= 1
+
+    def _check_health(self, conn, last_used):
+        if time.monotonic() - last_used < self.health_check_interval:
+            return conn
+        self._count("health_checks")
+        try:
+            conn.ping(reconnect=False)
+            return conn
+        except self.backend.Error:
+            pass
+
+        # Server dropped the idle connection (wait_timeout, restart); replace it
+        try:
+            conn.close()
+        except self.backend.Error:
+            pass
+        try:
+            conn = self._connect()
+        except self.backend.Error:
+            self._free_slot()
+            raise
+        self._count("reconnects")
+        return conn
+
+    def acquire(self):
+        requested = time.perf_counter()
+        probing = self.breaker.state != "closed"
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise self.backend.OperationalError(
+                f"Database unreachable; next connection attempt in {self.breaker.retry_in():.0f}s")
+        try:
+            conn, last_used = self._idle.get_nowait()
+            self._count("reused")
+            if probing:
+                # The probe must reach the server, not trust a connection from before the outage
+                last_used = float("-inf")
+        except queue.Empty:
+            if self._reserve_slot():
+                try:
+                    conn = self._connect()
+                except self.backend.Error:
+                    self._free_slot()
+                    raise
+                last_used = time.monotonic()
+            else:
+                self._count("waits")
+                started = time.perf_counter()
+                try:
+                    conn, last_used = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    self._count("timeouts")
+                    raise self.backend.PoolError(
+                        f"No free database connection after {self.timeout}s (pool size {self.size})")
+                finally:
+                    self._count("wait_time", time.perf_counter() - started)
+                self._count("reused")
+
+        conn = self._check_health(conn, last_used)
+        self.breaker.record_success()
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+        query_stats.record_acquire((time.perf_counter() - requested) * 1000)
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        self._count("in_use", -1)
+        try:
+            # Never hand out an open transaction (or its stale snapshot) to the next borrower
+            if getattr(conn, "in_transaction", True):
+                conn.rollback()
+        except self.backend.Error:
+            self._count("discarded")
+            self._free_slot()
+            try:
+                conn.close()
+            except self.backend.Error:
+                pass
+            return
+        self._idle.put((conn, time.monotonic()))
+
+    @contextmanager
+    def connection(self):
+        db = self.acquire()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["open"] = self._open
+        snapshot["size"] = self.size
+        snapshot["breaker"] = self.breaker.state
+        snapshot["breaker_trips"] = self.breaker.trips
+        snapshot["idle"] = self._idle.qsize()
+        snapshot["reuse_ratio"] = snapshot["reused"] / snapshot["checkouts"] if snapshot["checkouts"] else 0.0
+        return snapshot
+
+    def close_all(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._free_slot()
+            try:
+                conn.close()
+            except self.backend.Error:
+                pass
+
+
+_db_backend = None
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
+
+def get_backend():
+    """The storage backend picked by DENTAL_DB_BACKEND, created on first use"""
+    global _db_backend
+    if _db_backend is None:
+        if DB_BACKEND == "sqlite":
+            _db_backend = SQLiteBackend(DB_SQLITE_PATH)
+        elif DB_BACKEND == "mysql":
+            _db_backend = MySQLBackend(DB_CONFIG)
+        else:
+            raise ValueError(f"Unknown database backend: {DB_BACKEND}")
+    return _db_backend
+
+
+def get_dialect():
+    return get_backend().dialect
+
+
+def get_db_pool():
+    global _db_pool
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                _db_pool = ConnectionPool()
+    return _db_pool
+
+
+def get_db_connection():
+    try:
+        return get_db_pool().acquire()
+    except get_backend().Error as err:
+        print(f"Database Connection Error: {err}")
+        return None
+
+
+@contextmanager
+def db_connection():
+    """Borrow a pooled connection for the with-block; yields None if the database is unreachable.
+
+    A connection lost inside the block surfaces as ConnectionError, like one that never connected.
+    """
+    db = get_db_connection()
+    try:
+        yield db
+    except get_backend().Error as err:
+        if db is None or not get_backend().is_disconnect(err):
+            raise
+        # The idle connections most likely went down with it; reconnect on the next checkout
+        db.close()
+        get_db_pool().close_all()
+        raise ConnectionError("Lost connection to database.") from err
+    finally:
+        if db is not None:
+            db.close()
+
+
+def close_db_pool():
+    if _db_pool is not None:
+        stats = _db_pool.stats()
+        print(f"Connection pool: {stats['checkouts']} checkouts, {stats['connects']} connects, "
+              f"{stats['reuse_ratio']:.0%} reused, {stats['waits']} waits ({stats['wait_time']:.2f}s)")
+        queries = query_stats.snapshot()
+        if queries["slow"]:
+            print(f"Queries: {queries['slow']} slower than {SLOW_QUERY_MS:.0f} ms, see {SLOW_QUERY_LOG}")
+        _db_pool.close_all()
+
+
+def fetch_data(query, conn, params=None):
+    """Query results as a DataFrame; database errors propagate to the caller"""
+    import pandas as pd
+
+    if conn is None:
+        raise ConnectionError("Cannot connect to database.")
+    # Read through the DB-API cursor: pd.read_sql only supports SQLAlchemy connectables
+    # and warns on every call with a raw MySQL/SQLite connection
+    cursor = conn.cursor()
+    cursor.execute(query, params or ())
+    columns = [column[0] for column in cursor.description]
+    return pd.DataFrame(cursor.fetchall(), columns=columns)
@@ -0,0 +1,224 @@
+import contextvars
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+
+# Every statement run on a pooled connection goes through InstrumentedCursor:
+# its latency lands in a per-statement histogram (keyed by the SQL text, whose
+# parameters are separate), together with the rows it returned or changed and
+# the UI action that issued it. Statements slower than SLOW_QUERY_MS, and
+# failures, are also written to a rotating log. Parameters are never logged
+# (login queries carry passwords), only their count.
+SLOW_QUERY_MS = float(os.environ.get("DENTAL_SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG = os.environ.get("DENTAL_SLOW_QUERY_LOG",
+                                os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                             "slow_queries.log"))
+SLOW_QUERY_LOG_BYTES = 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 3
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)  # upper bounds; slower goes in one more
+
+_current_action = contextvars.ContextVar("query_action", default=None)
+
+
+@contextmanager
+def query_action(name):
+    """Attribute the statements run inside the block to a UI action, e.g. "calculate_total" """
+    token = _current_action.set(name)
+    try:
+        yield
+    finally:
+        _current_action.reset(token)
+
+
+def current_action():
+    return _current_action.get() or "-"
+
+
+def statement_key(sql):
+    return " ".join(sql.split())
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        index = 0
+        while index < len(LATENCY_BUCKETS_MS) and ms > LATENCY_BUCKETS_MS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.calls += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding that fraction of calls (max_ms for the open-ended one)"""
+        wanted = fraction * self.calls
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= wanted:
+                return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return 0.0
+
+    def snapshot(self):
+        return {
+            "calls": self.calls,
+            "total_ms": self.total_ms,
+            "mean_ms": self.total_ms / self.calls if self.calls else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": self.max_ms,
+            "buckets": dict(zip([f"<={bound}" for bound in LATENCY_BUCKETS_MS] + ["slower"], self.buckets)),
+        }
+
+
+class QueryStats:
+    """Per-statement latency, rows, errors and issuing actions, plus pool acquire latency; thread-safe"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._statements = {}
+            self._acquire = LatencyHistogram()
+            self._slow = 0
+
+    def _entry(self, key):
+        entry = self._statements.get(key)
+        if entry is None:
+            entry = self._statements[key] = {"latency": LatencyHistogram(), "rows": 0, "errors": 0,
+                                             "actions": Counter()}
+        return entry
+
+    def record(self, sql, ms, rows, action, failed=False):
+        with self._lock:
+            entry = self._entry(statement_key(sql))
+            entry["latency"].add(ms)
+            entry["rows"] += max(rows, 0)
+            entry["errors"] += int(failed)
+            entry["actions"][action] += 1
+            if ms >= SLOW_QUERY_MS:
+                self._slow += 1
+
+    def add_rows(self, sql, rows):
+        with self._lock:
+            self._entry(statement_key(sql))["rows"] += rows
+
+    def record_acquire(self, ms):
+        with self._lock:
+            self._acquire.add(ms)
+
+    def snapshot(self):
+        """{"statements": [...] slowest total first, "acquire": histogram, "slow": count}"""
+        with self._lock:
+            statements = []
+            for key, entry in self._statements.items():
+                row = entry["latency"].snapshot()
+                row.update(statement=key, rows=entry["rows"], errors=entry["errors"],
+                           actions=dict(entry["actions"].most_common()))
+                statements.append(row)
+            acquire = self._acquire.snapshot()
+            slow = self._slow
+        statements.sort(key=lambda row: row["total_ms"], reverse=True)
+        return {"statements": statements, "acquire": acquire, "slow": slow}
+
+
+query_stats = QueryStats()
+
+_slow_query_logger = None
+_slow_query_logger_lock = threading.Lock()
+
+
+def slow_query_logger():
+    """Rotating log of slow and failed statements, opened on first use"""
+    global _slow_query_logger
+    if _slow_query_logger is None:
+        with _slow_query_logger_lock:
+            if _slow_query_logger is None:
+                logger = logging.getLogger("clinic.slow_queries")
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                try:
+                    handler = logging.handlers.RotatingFileHandler(
+                        SLOW_QUERY_LOG, maxBytes=SLOW_QUERY_LOG_BYTES, backupCount=SLOW_QUERY_LOG_BACKUPS,
+                        encoding="utf-8")
+                except OSError as e:
+                    print(f"Could not open slow query log: {e}")
+                    handler = logging.NullHandler()
+                handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+                logger.addHandler(handler)
+                _slow_query_logger = logger
+    return _slow_query_logger
+
+
+class InstrumentedCursor:
+    """Times execute()/executemany() on the driver's cursor and counts the rows fetched back"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._sql = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def _run(self, method, sql, args, kwargs, params_count):
+        action = current_action()
+        started = time.perf_counter()
+        try:
+            result = method(sql, *args, **kwargs)
+        except Exception as e:
+            ms = (time.perf_counter() - started) * 1000
+            query_stats.record(sql, ms, 0, action, failed=True)
+            slow_query_logger().error("%.1f ms action=%s params=%d failed: %s | %s",
+                                      ms, action, params_count, e, statement_key(sql))
+            raise
+        ms = (time.perf_counter() - started) * 1000
+        self._sql = sql
+        # Writes report affected rows here; SELECT rows are added as they are fetched
+        rows = 0 if sql.lstrip()[:6].upper() == "SELECT" else self._cursor.rowcount
+        query_stats.record(sql, ms, rows or 0, action)
+        if ms >= SLOW_QUERY_MS:
+            slow_query_logger().warning("%.1f ms action=%s params=%d rows=%s | %s",
+                                        ms, action, params_count, rows, statement_key(sql))
+        return result
+
+    def execute(self, sql, *args, **kwargs):
+        params = args[0] if args else kwargs.get("params")
+        return self._run(self._cursor.execute, sql, args, kwargs, len(params or ()))
+
+    def executemany(self, sql, seq_params, *args, **kwargs):
+        seq_params = list(seq_params)
+        return self._run(self._cursor.executemany, sql, (seq_params,) + args, kwargs, len(seq_params))
+
+    def _fetched(self, rows):
+        if self._sql is not None and rows:
+            query_stats.add_rows(self._sql, rows)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        self._fetched(0 if row is None else 1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._fetched(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._fetched(len(rows))
+        return rows
@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from .db import db_connection
+
+
+# Read-through cache for the lookups one patient session repeats: the
+# patient record (by id and by latest record for a name), the patient's open
+# appointments, and each appointment's priced line items. Entries expire
+# after ENTITY_CACHE_TTL so edits from other terminals show up; this
+# terminal's own writes invalidate what they change right after commit.
+# Transactions that charge or change data still read the database.
+ENTITY_CACHE_SIZE = int(os.environ.get("DENTAL_ENTITY_CACHE_SIZE", "512"))
+ENTITY_CACHE_TTL = float(os.environ.get("DENTAL_ENTITY_CACHE_TTL", "120"))  # seconds
+
+
+class EntityCache:
+    """LRU of (kind, key) -> value with a TTL and hit/miss counts per kind; safe to use from worker threads"""
+
+    def __init__(self, size=ENTITY_CACHE_SIZE, ttl=ENTITY_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation: a load that started before one must not store its result
+        self._generation = 0
+        self._hits = Counter()
+        self._misses = Counter()
+        self._evictions = 0
+
+    def get(self, key):
+        """(True, value) if key is cached and fresh, else (False, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if time.monotonic() - stored_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self._hits[key[0]] += 1
+                    return True, value
+                del self._entries[key]
+            self._misses[key[0]] += 1
+            return False, None
+
+    def put(self, key, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def fetch(self, key, load):
+        """Cached value for key, or load(cursor) on a pooled connection when it is missing or expired"""
+        found, value = self.get(key)
+        if found:
+            return value
+        with self._lock:
+            generation = self._generation
+        with db_connection() as db:
+            if db is None:
+                raise ConnectionError("Cannot connect to database.")
+            value = load(db.cursor())
+        self.put(key, value, generation)
+        return value
+
+    def _drop(self, matches):
+        with self._lock:
+            self._generation += 1
+            for key in [key for key, (value, _) in self._entries.items() if matches(key, value)]:
+                del self._entries[key]
+
+    def invalidate(self, kind=None):
+        """Forget everything, or every entry of one kind ("patient", "patient_name", "appointments", "lines")"""
+        self._drop(lambda key, value: kind is None or key[0] == kind)
+
+    def invalidate_patient(self, name=None, patient_id=None):
+        def matches(key, value):
+            if key[0] not in ("patient", "patient_name"):
+                return False
+            return key[1] == name or (value is not None and (value["id"] == patient_id or value["name"] == name))
+        self._drop(matches)
+
+    def invalidate_appointments(self, patient_name):
+        self._drop(lambda key, value: key == ("appointments", patient_name))
+
+    def invalidate_appointment(self, appointment_id, patient_name=None):
+        """Drop the appointment's line items, every appointment list that includes it and the patient's list.
+
+        Pass patient_name when the appointment may be missing from its patient's cached list
+        (lists leave out cancelled appointments, so reinstating one must name the patient).
+        """
+        def matches(key, value):
+            if key[0] == "lines":
+                return key[1] == appointment_id
+            if key[0] != "appointments":
+                return False
+            return key[1] == patient_name or any(row[0] == appointment_id for row in value)
+        self._drop(matches)
+
+    def stats(self):
+        with self._lock:
+            hits = sum(self._hits.values())
+            misses = sum(self._misses.values())
+            return {
+                "entries": len(self._entries),
+                "size": self.size,
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+                "evictions": self._evictions,
+                "by_kind": {kind: {"hits": self._hits[kind], "misses": self._misses[kind]}
+                            for kind in sorted(set(self._hits) | set(self._misses))},
+            }
+
+
+entity_cache = EntityCache()
@@ -0,0 +1,137 @@
+import os
+
+from .db import db_connection
+
+
+# Tables are streamed from an unbuffered (server-side) cursor and written a
+# chunk at a time, so memory stays flat however many years a table holds.
+# Each export records a watermark in app_settings; an incremental export
+# only writes rows past the previous one.
+EXPORT_CHUNK_SIZE = int(os.environ.get("DENTAL_EXPORT_CHUNK_SIZE", "5000"))
+
+# table -> (columns with their types, watermark column). Payments are never
+# edited after insert, so their id is enough; the other tables track updated_at.
+EXPORT_TABLES = {
+    "patients": ([("id", "int"), ("name", "text"), ("birth_date", "date"), ("demographic_type", "text"),
+                  ("contact", "text"), ("type", "text"), ("updated_at", "datetime")], "updated_at"),
+    "appointments": ([("id", "int"), ("patient_name", "text"), ("date", "date"), ("time_slot", "text"),
+                      ("services", "text"), ("status", "text"), ("updated_at", "datetime")], "updated_at"),
+    "payments": ([("id", "int"), ("appointment_id", "int"), ("amount", "decimal"), ("method", "text"),
+                  ("date_paid", "datetime")], "id")
+}
+EXPORT_FORMATS = {".csv": "csv", ".parquet": "parquet"}
+
+
+class CsvChunkWriter:
+    def __init__(self, path, columns):
+        import csv
+
+        self.handle = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.handle)
+        self.writer.writerow([name for name, _ in columns])
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.handle.close()
+
+
+class ParquetChunkWriter:
+    def __init__(self, path, columns):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs the pyarrow package (pip install pyarrow).")
+
+        types = {
+            "int": pa.int64(),
+            "text": pa.string(),
+            "date": pa.date32(),
+            "datetime": pa.timestamp("s"),
+            "decimal": pa.decimal128(14, 2)
+        }
+        self.pa = pa
+        self.schema = pa.schema([(name, types[kind]) for name, kind in columns])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        # One row group per chunk
+        columns = list(zip(*rows))
+        self.writer.write_table(self.pa.Table.from_arrays(
+            [self.pa.array(values, type=field.type) for values, field in zip(columns, self.schema)],
+            schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def export_format_for(path):
+    export_format = EXPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+    if export_format is None:
+        raise ValueError(f"Unsupported export file type: {path} (use .csv or .parquet)")
+    return export_format
+
+
+def get_export_watermark(cursor, table):
+    cursor.execute("SELECT value FROM app_settings WHERE name = %s", (f"export_watermark:{table}",))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def set_export_watermark(cursor, table, value):
+    cursor.execute(
+        "INSERT INTO app_settings (name, value) VALUES (%s, %s) ON DUPLICATE KEY UPDATE value = %s",
+        (f"export_watermark:{table}", str(value), str(value)))
+
+
+def export_table(table, path, incremental=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """Stream one table to a .csv or .parquet file; returns the number of rows written"""
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Unknown export table: {table}")
+    columns, watermark_column = EXPORT_TABLES[table]
+    writer_class = CsvChunkWriter if export_format_for(path) == "csv" else ParquetChunkWriter
+
+    with db_connection() as db:
+        if db is None:
+            raise ConnectionError("Cannot connect to database.")
+        cursor = db.cursor(buffered=True)
+        previous = get_export_watermark(cursor, table) if incremental else None
+
+        # Fix the upper bound first so rows written during the export go to the next one.
+        # Timestamps are bounded below the current second, which may still be gaining rows.
+        if watermark_column == "id":
+            cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+            upper = cursor.fetchone()[0]
+            where, params = "id <= %s", [upper]
+            if previous is not None:
+                where, params = "id > %s AND id <= %s", [int(previous), upper]
+        else:
+            cursor.execute("SELECT NOW()")
+            upper = cursor.fetchone()[0]
+            where, params = f"{watermark_column} < %s", [upper]
+            if previous is not None:
+                where, params = f"{watermark_column} >= %s AND {watermark_column} < %s", [previous, upper]
+        order = watermark_column if incremental else "id"
+
+        written = 0
+        writer = writer_class(path, columns)
+        stream = db.cursor(buffered=False)
+        try:
+            stream.execute(
+                f"SELECT {', '.join(name for name, _ in columns)} FROM {table} WHERE {where} ORDER BY {order}",
+                params)
+            while True:
+                rows = stream.fetchmany(chunk_size)
+                if not rows:
+                    break
+                writer.write(rows)
+                written += len(rows)
+        finally:
+            stream.close()
+            writer.close()
+
+        set_export_watermark(cursor, table, upper)
+        db.commit()
+    return written
@@ -0,0 +1,211 @@
+import datetime
+import json
+import os
+import threading
+import uuid
+
+from .db import db_connection, get_backend
+from .entities import entity_cache
+from .scheduling import SlotUnavailableError, schedule_index
+from .stats import invalidate_dashboard_stats
+
+
+# Patient registrations, bookings and payments made while the database is
+# unreachable are appended to a local journal (one JSON object per line,
+# fsync'd before the caller is told the write was queued) and replayed in
+# order once a connection succeeds again. Each entry is applied in the same
+# transaction that records its id in journal_replays, so a replay that is
+# interrupted and run again never applies an entry twice. Entries the
+# database turns down on replay (slot full, appointment already paid) are
+# recorded there as rejected with the reason and dropped from the journal.
+JOURNAL_PATH = os.environ.get("DENTAL_JOURNAL_PATH",
+                              os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                           "offline_journal.jsonl"))
+JOURNAL_REPLAY_BATCH = 50  # entries applied per borrowed connection
+JOURNAL_REPLAY_INTERVAL = 30  # seconds between background replay attempts in the GUI
+
+
+def valid_entry(entry):
+    """True if entry has the shape append() writes"""
+    if not (isinstance(entry, dict) and isinstance(entry.get("id"), str) and entry["id"]
+            and isinstance(entry.get("operation"), str) and isinstance(entry.get("args"), dict)):
+        return False
+    try:
+        datetime.datetime.fromisoformat(entry.get("queued_at"))
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+class WriteJournal:
+    """Append-only file of queued writes; appends are durable once append() returns"""
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._count = None  # entries in the file, known after the first read
+
+    def append(self, operation, args):
+        """Queue one write; returns its entry id"""
+        entry = {"id": uuid.uuid4().hex, "operation": operation, "args": args,
+                 "queued_at": datetime.datetime.now().isoformat(timespec="seconds")}
+        line = json.dumps(entry, default=str) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as handle:
+                handle.write(line)
+                handle.flush()
+                os.fsync(handle.fileno())
+            if self._count is not None:
+                self._count += 1
+        return entry["id"]
+
+    def _read(self):
+        entries = []
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                for number, line in enumerate(handle, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Only a crash mid-append leaves a torn line, and that write was never confirmed
+                        print(f"Skipping unreadable journal line {number} in {self.path}")
+                        continue
+                    if not valid_entry(entry):
+                        # Replay could neither apply nor record it; the next trim drops it from the file
+                        print(f"Skipping malformed journal entry on line {number} in {self.path}: {line.strip()}")
+                        continue
+                    entries.append(entry)
+        except FileNotFoundError:
+            pass
+        self._count = len(entries)
+        return entries
+
+    def entries(self):
+        """Queued writes, oldest first"""
+        with self._lock:
+            return self._read()
+
+    def count(self):
+        """Number of queued writes; the file is only read the first time"""
+        with self._lock:
+            if self._count is None:
+                self._read()
+            return self._count
+
+    def pending(self):
+        try:
+            return os.path.getsize(self.path) > 0
+        except OSError:
+            return False
+
+    def remove(self, entry_ids):
+        """Drop replayed entries, keeping anything appended meanwhile; the file is swapped atomically"""
+        entry_ids = set(entry_ids)
+        with self._lock:
+            remaining = [entry for entry in self._read() if entry["id"] not in entry_ids]
+            self._count = len(remaining)
+            if not remaining:
+                os.remove(self.path)
+                return
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as handle:
+                for entry in remaining:
+                    handle.write(json.dumps(entry, default=str) + "\n")
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(temp_path, self.path)
+
+
+write_journal = WriteJournal()
+_replay_lock = threading.Lock()
+
+
+def journal_replayers():
+    """operation -> function(cursor, **args) that applies it without committing"""
+    # Imported here: these modules send their own writes through run_or_journal()
+    from .appointments import create_appointment
+    from .billing import charge_appointment
+    from .catalog import get_service_catalog
+    from .patients import insert_patient
+
+    def replay_booking(cursor, patient_name, date, time_slot, service_ids):
+        create_appointment(cursor, patient_name, date, time_slot, service_ids, get_service_catalog(cursor))
+
+    return {
+        "save_patient": insert_patient,
+        "book_appointment": replay_booking,
+        "record_payment": charge_appointment,
+    }
+
+
+def replay_journal(batch_size=JOURNAL_REPLAY_BATCH):
+    """Apply queued writes in order; returns (applied, rejected).
+
+    Raises ConnectionError if the database is unreachable or the connection
+    drops; whatever was not replayed stays queued. Any other error applying an
+    entry rejects that entry alone.
+    """
+    with _replay_lock:
+        entries = write_journal.entries()
+        if not entries:
+            if write_journal.pending():
+                write_journal.remove(())  # only unreadable lines left; they would keep new writes queued
+            return 0, 0
+        replayers = journal_replayers()
+        backend = get_backend()
+        applied = rejected = 0
+        for start in range(0, len(entries), batch_size):
+            batch = entries[start:start + batch_size]
+            with db_connection() as db:
+                if db is None:
+                    raise ConnectionError("Cannot connect to database.")
+                cursor = db.cursor()
+                for entry in batch:
+                    cursor.execute("SELECT 1 FROM journal_replays WHERE entry_id = %s", (entry["id"],))
+                    if cursor.fetchone() is not None:
+                        continue  # applied before the journal could be trimmed
+                    error = None
+                    try:
+                        replayers[entry["operation"]](cursor, **entry["args"])
+                    except (LookupError, ValueError, TypeError, SlotUnavailableError, backend.Error) as e:
+                        if isinstance(e, backend.Error) and backend.is_disconnect(e):
+                            raise  # db_connection() turns this into ConnectionError
+                        db.rollback()
+                        error = str(e)
+                        print(f"Journal entry {entry['id']} ({entry['operation']}) rejected: {error}")
+                    cursor.execute(
+                        "INSERT INTO journal_replays (entry_id, operation, status, error, queued_at, replayed_at) "
+                        "VALUES (%s, %s, %s, %s, %s, %s)",
+                        (entry["id"], entry["operation"], "rejected" if error else "applied", error,
+                         datetime.datetime.fromisoformat(entry["queued_at"]), datetime.datetime.now()))
+                    db.commit()
+                    if error:
+                        rejected += 1
+                    else:
+                        applied += 1
+            write_journal.remove(entry["id"] for entry in batch)
+
+    invalidate_dashboard_stats()
+    schedule_index.invalidate()
+    entity_cache.invalidate()
+    print(f"Replayed offline journal: {applied} applied, {rejected} rejected")
+    return applied, rejected
+
+
+def run_or_journal(operation, args, write):
+    """Run write() now, or queue it when the database is unreachable; returns its result or None if queued.
+
+    While older writes are still queued the new one is queued behind them, so it
+    never overtakes them; replay_journal() (run at startup, by the GUI's timer
+    or "--replay-journal") applies them all in order.
+    """
+    if write_journal.pending():
+        write_journal.append(operation, args)
+        return None
+    try:
+        return write()
+    except ConnectionError:
+        write_journal.append(operation, args)
+        return None
@@ -0,0 +1,285 @@
+import datetime
+import json
+import os
+import time
+
+from .appointments import TIME_SLOTS
+from .catalog import get_service_catalog
+from .db import db_connection
+from .entities import entity_cache
+from .patients import DEMOGRAPHIC_TYPES
+from .scheduling import record_slot_usage
+from .stats import invalidate_dashboard_stats
+from .summary import summary_appointment_added, summary_patient_added
+
+
+# Bulk loader for the flat files the clinic kept before the database:
+# patients.txt, appointments.txt and clinic_data.json. Records are parsed
+# lazily, validated and deduplicated, then written with executemany in
+# chunks that each commit on their own.
+LEGACY_DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # the folder holding clinic/
+IMPORT_BATCH_SIZE = int(os.environ.get("DENTAL_IMPORT_BATCH_SIZE", "1000"))
+# The old booking form offered periods instead of times; each becomes the first slot of its period
+LEGACY_TIME_SLOTS = {"morning": "9:00 AM", "afternoon": "1:00 PM", "evening": "5:00 PM"}
+
+
+class ImportReport:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.read = {"patients": 0, "appointments": 0}
+        self.imported = {"patients": 0, "appointments": 0}
+        self.duplicates = {"patients": 0, "appointments": 0}
+        self.rejects = []  # (location, reason)
+
+    def reject(self, location, reason):
+        self.rejects.append((location, reason))
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def print_summary(self, max_rejects=20):
+        elapsed = self.elapsed()
+        total = sum(self.imported.values())
+        print(f"Legacy import finished in {elapsed:.2f}s ({total / elapsed if elapsed else 0:,.0f} rows/s)")
+        for kind in ("patients", "appointments"):
+            print(f"  {kind}: {self.read[kind]} read, {self.imported[kind]} imported, "
+                  f"{self.duplicates[kind]} duplicates")
+        if self.rejects:
+            print(f"  {len(self.rejects)} rejected:")
+            for location, reason in self.rejects[:max_rejects]:
+                print(f"    {location}: {reason}")
+            if len(self.rejects) > max_rejects:
+                print(f"    ... and {len(self.rejects) - max_rejects} more")
+
+
+def parse_legacy_line(line, separator):
+    """'Name<sep> Key: value<sep> ...' -> {'name': ..., 'key': value}; parts without a key are dropped"""
+    parts = line.split(separator)
+    fields = {"name": parts[0].strip()}
+    for part in parts[1:]:
+        key, colon, value = part.partition(":")
+        if colon:
+            fields[key.strip().lower()] = value.strip()
+    return fields
+
+
+def read_legacy_lines(path):
+    with open(path, encoding="utf-8") as handle:
+        for line_no, line in enumerate(handle, 1):
+            line = line.strip()
+            if line:
+                yield f"{os.path.basename(path)}:{line_no}", line
+
+
+def read_patients_txt(path):
+    """Yield (location, fields) from 'Name, Age: N, Contact: ..., Type: ...' lines"""
+    for location, line in read_legacy_lines(path):
+        yield location, parse_legacy_line(line, ",")
+
+
+def read_appointments_txt(path):
+    """Yield (location, fields) from 'Name | Date: ... | Time: ... | Services: a, b' lines"""
+    for location, line in read_legacy_lines(path):
+        yield location, parse_legacy_line(line, "|")
+
+
+def read_clinic_json(path, kind):
+    """Yield (location, fields) for the records under clinic_data.json's 'patients' or 'appointments' key"""
+    with open(path, encoding="utf-8") as handle:
+        data = json.load(handle)
+    for position, record in enumerate(data.get(kind) or []):
+        fields = {str(key).lower(): value for key, value in record.items()}
+        fields.setdefault("name", fields.get("patient_name", ""))
+        yield f"{os.path.basename(path)}:{kind}[{position}]", fields
+
+
+def clean_name(value):
+    return " ".join(str(value or "").split())
+
+
+def birth_date_for_age(age, today):
+    # The flat files only kept an age; use the birthday that gives that age today
+    try:
+        return today.replace(year=today.year - age)
+    except ValueError:  # 29 February
+        return today.replace(year=today.year - age, day=28)
+
+
+def validate_legacy_patient(fields, today):
+    """Row tuple for the patients table, or ValueError with the reason"""
+    name = clean_name(fields.get("name"))
+    if not name:
+        raise ValueError("missing name")
+    try:
+        age = int(str(fields.get("age", "")).strip())
+    except ValueError:
+        raise ValueError(f"invalid age {fields.get('age')!r}")
+    if not 0 <= age <= 130:
+        raise ValueError(f"age out of range: {age}")
+    contact = str(fields.get("contact", "")).strip()
+    if not contact.isdigit() or not 7 <= len(contact) <= 15:
+        raise ValueError(f"invalid contact {contact!r}")
+    demographic_type = str(fields.get("type", "")).strip().title()
+    if demographic_type.upper() == "PWD":
+        demographic_type = "PWD"
+    if demographic_type not in DEMOGRAPHIC_TYPES:
+        raise ValueError(f"unknown type {fields.get('type')!r}")
+    return name, birth_date_for_age(age, today), demographic_type, contact, "Pending"
+
+
+def legacy_time_slot(value):
+    """The TIME_SLOTS entry for a legacy time ("Morning", "9:00 am"), or ValueError"""
+    text = " ".join(str(value or "").split())
+    if not text:
+        raise ValueError("missing time")
+    for time_slot in TIME_SLOTS:
+        if text.upper() == time_slot:
+            return time_slot
+    if text.lower() in LEGACY_TIME_SLOTS:
+        return LEGACY_TIME_SLOTS[text.lower()]
+    raise ValueError(f"unknown time {value!r}")
+
+
+def validate_legacy_appointment(fields, catalog):
+    """(row tuple, service ids) for the appointments table, or ValueError with the reason"""
+    name = clean_name(fields.get("name"))
+    if not name:
+        raise ValueError("missing name")
+    try:
+        date = datetime.datetime.strptime(str(fields.get("date", "")).strip(), "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"invalid date {fields.get('date')!r}")
+    time_slot = legacy_time_slot(fields.get("time") or fields.get("time_slot"))
+    names = fields.get("services") or []
+    if isinstance(names, str):
+        names = names.split(",")
+    names = [clean_name(service_name) for service_name in names if clean_name(service_name)]
+    service_ids = catalog.ids_for_names(names)
+    if len(service_ids) != len(names):
+        unknown = sorted(set(names) - set(catalog.by_name))
+        raise ValueError(f"unknown services {', '.join(unknown)}")
+    label = ", ".join(names) if names else "No services"
+    status = clean_name(fields.get("status")) or "Booked"
+    return (name, date, time_slot, label, status), service_ids
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def valid_new_records(records, validate, key, seen, report, kind):
+    """Validated rows from (location, fields) pairs, skipping rejects and keys already in `seen`"""
+    for location, fields in records:
+        report.read[kind] += 1
+        try:
+            row = validate(fields)
+        except ValueError as e:
+            report.reject(location, str(e))
+            continue
+        row_key = key(row)
+        if row_key in seen:
+            report.duplicates[kind] += 1
+            continue
+        seen.add(row_key)
+        yield row
+
+
+def patient_key(row):
+    return row[0].casefold(), row[3]
+
+
+def appointment_key(row):
+    name, date, time_slot = row[0][:3]
+    return name.casefold(), date, time_slot
+
+
+def import_patients(db, records, report, batch_size=IMPORT_BATCH_SIZE):
+    cursor = db.cursor()
+    cursor.execute("SELECT name, contact FROM patients")
+    seen = {(name.casefold(), contact) for name, contact in cursor.fetchall()}
+    today = datetime.date.today()
+    rows = valid_new_records(records, lambda fields: validate_legacy_patient(fields, today),
+                             patient_key, seen, report, "patients")
+    for chunk in chunked(rows, batch_size):
+        cursor.executemany(
+            "INSERT INTO patients (name, birth_date, demographic_type, contact, type) VALUES (%s, %s, %s, %s, %s)",
+            chunk)
+        summary_patient_added(cursor, len(chunk))
+        db.commit()
+        report.imported["patients"] += len(chunk)
+
+
+def import_appointments(db, records, report, batch_size=IMPORT_BATCH_SIZE):
+    cursor = db.cursor()
+    catalog = get_service_catalog(cursor)
+    cursor.execute("SELECT patient_name, date, time_slot FROM appointments")
+    seen = {(name.casefold(), date, time_slot) for name, date, time_slot in cursor.fetchall()}
+    rows = valid_new_records(records, lambda fields: validate_legacy_appointment(fields, catalog),
+                             appointment_key, seen, report, "appointments")
+    for chunk in chunked(rows, batch_size):
+        cursor.executemany(
+            "INSERT INTO appointments (patient_name, date, time_slot, services, status) VALUES (%s, %s, %s, %s, %s)",
+            [row for row, _ in chunk])
+
+        # Read the new ids back by natural key (covered by the patient/status/date index)
+        # so the service rows can be written in one executemany too
+        names = sorted({row[0] for row, _ in chunk})
+        placeholders = ", ".join(["%s"] * len(names))
+        cursor.execute(
+            f"SELECT id, patient_name, date, time_slot FROM appointments "
+            f"WHERE patient_name IN ({placeholders}) AND date BETWEEN %s AND %s ORDER BY id",
+            (*names, min(row[1] for row, _ in chunk), max(row[1] for row, _ in chunk)))
+        ids = {(name.casefold(), date, time_slot): appointment_id
+               for appointment_id, name, date, time_slot in cursor.fetchall()}
+        by_id = catalog.by_id
+        cursor.executemany(
+            "INSERT INTO appointment_services (appointment_id, service_id, price_at_booking) VALUES (%s, %s, %s)",
+            [(ids[appointment_key((row,))], service_id, by_id[service_id]["price"])
+             for row, service_ids in chunk for service_id in service_ids])
+
+        statuses = {}
+        for row, _ in chunk:
+            statuses[row[4]] = statuses.get(row[4], 0) + 1
+        for status, count in statuses.items():
+            summary_appointment_added(cursor, status, count)
+        record_slot_usage(cursor, [(row[1], row[2]) for row, _ in chunk if row[4] != "Cancelled"])
+        db.commit()
+        report.imported["appointments"] += len(chunk)
+
+
+def import_legacy_data(directory=LEGACY_DATA_DIR, batch_size=IMPORT_BATCH_SIZE):
+    """Load the legacy flat files in `directory` into the database and print a report"""
+    report = ImportReport()
+    patients_txt = os.path.join(directory, "patients.txt")
+    appointments_txt = os.path.join(directory, "appointments.txt")
+    clinic_json = os.path.join(directory, "clinic_data.json")
+
+    def sources(kind, text_path, read_text):
+        if os.path.exists(text_path):
+            yield from read_text(text_path)
+        if os.path.exists(clinic_json):
+            yield from read_clinic_json(clinic_json, kind)
+
+    with db_connection() as db:
+        if db is None:
+            raise ConnectionError("Cannot connect to database.")
+        try:
+            # Patients first so a rerun after a failure only picks up what is still missing
+            import_patients(db, sources("patients", patients_txt, read_patients_txt), report, batch_size)
+            import_appointments(db, sources("appointments", appointments_txt, read_appointments_txt),
+                                report, batch_size)
+        except Exception:
+            db.rollback()
+            report.print_summary()
+            raise
+    invalidate_dashboard_stats()
+    entity_cache.invalidate()
+    report.print_summary()
+    return report
@@ -0,0 +1,75 @@
+from .db import db_connection
+from .entities import entity_cache
+from .journal import run_or_journal
+from .stats import invalidate_dashboard_stats
+from .summary import summary_patient_added
+
+
+DEMOGRAPHIC_TYPES = ("Regular", "Senior", "Student", "PWD")
+PATIENT_STATUSES = ["Pending", "Complete", "Cancelled"]
+PATIENT_COLUMNS = ("id", "name", "birth_date", "demographic_type", "contact", "type")
+PATIENT_SELECT = f"SELECT {', '.join(PATIENT_COLUMNS)} FROM patients"
+
+
+def patient_record(row):
+    return dict(zip(PATIENT_COLUMNS, row)) if row else None
+
+
+def get_patient(patient_id):
+    """Patient record by id as a dict, or None; read through entity_cache"""
+    def load(cursor):
+        cursor.execute(f"{PATIENT_SELECT} WHERE id = %s", (patient_id,))
+        return patient_record(cursor.fetchone())
+    return entity_cache.fetch(("patient", patient_id), load)
+
+
+def find_patient(name):
+    """Latest patient record saved under this name as a dict, or None; read through entity_cache"""
+    def load(cursor):
+        cursor.execute(f"{PATIENT_SELECT} WHERE name = %s ORDER BY id DESC LIMIT 1", (name,))
+        return patient_record(cursor.fetchone())
+    return entity_cache.fetch(("patient_name", name), load)
+
+
+def insert_patient(cursor, name, birth_date, demographic_type, contact):
+    """Insert a patient record and count it in the summaries; caller commits. Returns its id"""
+    cursor.execute(
+        "INSERT INTO patients (name, birth_date, demographic_type, contact, type) VALUES (%s, %s, %s, %s, %s)",
+        (name, birth_date, demographic_type, contact, "Pending"))
+    patient_id = cursor.lastrowid
+    summary_patient_added(cursor)
+    return patient_id
+
+
+def save_patient(name, birth_date, demographic_type, contact):
+    """Register a patient record; returns its id, or None if it was queued in the offline journal"""
+    if not name or not contact:
+        raise ValueError("Please fill out all fields.")
+
+    def write():
+        with db_connection() as db:
+            if db is None:
+                raise ConnectionError("Cannot connect to database.")
+            patient_id = insert_patient(db.cursor(), name, birth_date, demographic_type, contact)
+            db.commit()
+        invalidate_dashboard_stats()
+        entity_cache.invalidate_patient(name=name)
+        return patient_id
+
+    return run_or_journal("save_patient", {"name": name, "birth_date": birth_date,
+                                           "demographic_type": demographic_type, "contact": contact}, write)
+
+
+def update_patient_status(patient_id, new_status):
+    with db_connection() as db:
+        if db is None:
+            raise ConnectionError("Cannot connect to database.")
+        cursor = db.cursor()
+        # Not UPDATE's rowcount: MySQL counts changed rows, so re-saving the same status would look "not found"
+        cursor.execute("SELECT 1 FROM patients WHERE id = %s", (patient_id,))
+        if cursor.fetchone() is None:
+            raise LookupError("Patient not found.")
+        cursor.execute("UPDATE patients SET type = %s WHERE id = %s", (new_status, patient_id))
+        db.commit()
+    entity_cache.invalidate_patient(patient_id=patient_id)
+    return new_status
@@ -0,0 +1,214 @@
+import datetime
+import os
+import threading
+import time
+
+from .db import db_connection
+
+
+# Each time slot has a clinic-wide capacity (chairs); when dentists are set up,
+# a slot also never holds more patients than there are active dentists, and
+# slot_reservations' unique key keeps a dentist to one patient per slot.
+# ScheduleIndex mirrors slot_usage for the next few weeks in memory so the
+# booking form can ask for free slots without a query per date.
+SCHEDULE_DEFAULT_CAPACITY = int(os.environ.get("DENTAL_SLOT_CAPACITY", "2"))
+SCHEDULE_WEEKS = int(os.environ.get("DENTAL_SCHEDULE_WEEKS", "8"))
+SCHEDULE_REFRESH_INTERVAL = 30  # seconds before the index re-reads slot_usage
+
+
+class SlotUnavailableError(Exception):
+    """The requested slot is full, unknown or already past"""
+
+
+def as_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.datetime.strptime(str(value), "%Y-%m-%d").date()
+
+
+def slot_start(date, time_slot):
+    return datetime.datetime.combine(date, datetime.datetime.strptime(time_slot, "%I:%M %p").time())
+
+
+class ScheduleIndex:
+    def __init__(self, weeks=SCHEDULE_WEEKS):
+        self.weeks = weeks
+        self.slots = []  # time slots in display order
+        self.capacities = {}  # time_slot -> effective capacity
+        self.booked = {}  # (date, time_slot) -> booked count
+        self.first_day = None
+        self.last_day = None
+        self.loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def load(self, cursor):
+        cursor.execute("SELECT time_slot, capacity FROM schedule_slots ORDER BY sort_order, time_slot")
+        slot_rows = cursor.fetchall()
+        cursor.execute("SELECT COUNT(*) FROM dentists WHERE active = 1")
+        dentists = cursor.fetchone()[0]
+        first_day = datetime.date.today()
+        last_day = first_day + datetime.timedelta(weeks=self.weeks)
+        cursor.execute("SELECT date, time_slot, booked FROM slot_usage WHERE date BETWEEN %s AND %s",
+                       (first_day, last_day))
+        booked = {(as_date(date), time_slot): count for date, time_slot, count in cursor.fetchall()}
+        with self._lock:
+            self.slots = [time_slot for time_slot, _ in slot_rows]
+            self.capacities = {time_slot: min(capacity, dentists) if dentists else capacity
+                               for time_slot, capacity in slot_rows}
+            self.booked = booked
+            self.first_day, self.last_day = first_day, last_day
+            self.loaded_at = time.monotonic()
+
+    def ensure_current(self, cursor):
+        if (time.monotonic() - self.loaded_at > SCHEDULE_REFRESH_INTERVAL
+                or self.first_day != datetime.date.today()):
+            self.load(cursor)
+
+    def invalidate(self):
+        self.loaded_at = 0.0
+
+    def record(self, date, time_slot, delta):
+        """Apply a committed booking (+1) or release (-1) without waiting for the next load"""
+        with self._lock:
+            key = (as_date(date), time_slot)
+            self.booked[key] = max(self.booked.get(key, 0) + delta, 0)
+
+    def day(self, date, now=None):
+        """[(time_slot, free places)] for one date; past slots show 0 free"""
+        date = as_date(date)
+        now = now or datetime.datetime.now()
+        with self._lock:
+            return [(time_slot, 0 if slot_start(date, time_slot) <= now
+                     else max(self.capacities[time_slot] - self.booked.get((date, time_slot), 0), 0))
+                    for time_slot in self.slots]
+
+    def nearest_free(self, start=None, count=5, time_slot=None, now=None):
+        """Up to `count` (date, time_slot, free) with room, earliest first, within the indexed weeks"""
+        now = now or datetime.datetime.now()
+        date = max(as_date(start or now), now.date())
+        found = []
+        while date <= (self.last_day or date) and len(found) < count:
+            for slot, free in self.day(date, now):
+                if free > 0 and (time_slot is None or slot == time_slot):
+                    found.append((date, slot, free))
+                    if len(found) == count:
+                        break
+            date += datetime.timedelta(days=1)
+        return found
+
+
+schedule_index = ScheduleIndex()
+
+
+def get_schedule_index(cursor=None):
+    """The shared availability index, (re)loaded if stale"""
+    if cursor is not None:
+        schedule_index.ensure_current(cursor)
+        return schedule_index
+    with db_connection() as db:
+        if db is None:
+            raise ConnectionError("Cannot connect to database.")
+        schedule_index.ensure_current(db.cursor())
+    return schedule_index
+
+
+def slot_availability(date):
+    return get_schedule_index().day(date)
+
+
+def find_free_slots(start=None, count=5, time_slot=None):
+    return get_schedule_index().nearest_free(start, count, time_slot)
+
+
+def reserve_slot(cursor, appointment_id, date, time_slot):
+    """Claim a place (and a dentist, if any are set up) for an appointment; caller commits.
+
+    Raises SlotUnavailableError when the slot is full; the caller's rollback undoes the booking.
+    """
+    date = as_date(date)
+    cursor.execute("SELECT capacity FROM schedule_slots WHERE time_slot = %s", (time_slot,))
+    row = cursor.fetchone()
+    if row is None:
+        raise SlotUnavailableError(f"{time_slot} is not a bookable time slot.")
+    if slot_start(date, time_slot) <= datetime.datetime.now():
+        raise SlotUnavailableError(f"{time_slot} on {date} has already passed.")
+    cursor.execute("SELECT id FROM dentists WHERE active = 1 ORDER BY id")
+    dentists = [dentist_id for dentist_id, in cursor.fetchall()]
+    capacity = min(row[0], len(dentists)) if dentists else row[0]
+
+    # Atomic check-and-increment: zero rows updated means the slot is full
+    cursor.execute("INSERT IGNORE INTO slot_usage (date, time_slot, booked) VALUES (%s, %s, 0)", (date, time_slot))
+    cursor.execute(
+        "UPDATE slot_usage SET booked = booked + 1 WHERE date = %s AND time_slot = %s AND booked < %s",
+        (date, time_slot, capacity))
+    if cursor.rowcount == 0:
+        raise SlotUnavailableError(f"{time_slot} on {date} is fully booked.")
+
+    dentist_id = None
+    if dentists:
+        # The slot_usage row lock is held, so this read cannot race another booking of the slot
+        cursor.execute("SELECT dentist_id FROM slot_reservations WHERE date = %s AND time_slot = %s",
+                       (date, time_slot))
+        taken = {taken_id for taken_id, in cursor.fetchall()}
+        dentist_id = next((candidate for candidate in dentists if candidate not in taken), None)
+        if dentist_id is None:
+            raise SlotUnavailableError(f"No dentist is free at {time_slot} on {date}.")
+        cursor.execute("UPDATE appointments SET dentist_id = %s WHERE id = %s", (dentist_id, appointment_id))
+    cursor.execute(
+        "INSERT INTO slot_reservations (appointment_id, date, time_slot, dentist_id) VALUES (%s, %s, %s, %s)",
+        (appointment_id, date, time_slot, dentist_id))
+    return dentist_id
+
+
+def release_slot(cursor, appointment_id, date, time_slot):
+    # appointments.dentist_id is kept, so restore_slot() can give the place back to the same dentist
+    cursor.execute("UPDATE slot_usage SET booked = booked - 1 WHERE date = %s AND time_slot = %s AND booked > 0",
+                   (date, time_slot))
+    cursor.execute("DELETE FROM slot_reservations WHERE appointment_id = %s", (appointment_id,))
+
+
+def restore_slot(cursor, appointment_id, date, time_slot, dentist_id):
+    """Take a reinstated appointment's place back, skipping the capacity check; caller commits.
+
+    The reservation goes to the dentist it had if they are still free, else to another free
+    active dentist; with nobody free it is kept without a dentist and the slot is overbooked.
+    """
+    date = as_date(date)
+    record_slot_usage(cursor, [(date, time_slot)])
+    cursor.execute("SELECT id FROM dentists WHERE active = 1 ORDER BY id")
+    dentists = [candidate for candidate, in cursor.fetchall()]
+    if dentists:
+        # The slot_usage row lock is held, so this read cannot race another booking of the slot
+        cursor.execute("SELECT dentist_id FROM slot_reservations WHERE date = %s AND time_slot = %s",
+                       (date, time_slot))
+        taken = {taken_id for taken_id, in cursor.fetchall()}
+        preferred = [dentist_id] if dentist_id in dentists else []
+        dentist_id = next((candidate for candidate in preferred + dentists if candidate not in taken), None)
+    else:
+        dentist_id = None
+    cursor.execute("UPDATE appointments SET dentist_id = %s WHERE id = %s", (dentist_id, appointment_id))
+    cursor.execute(
+        "INSERT INTO slot_reservations (appointment_id, date, time_slot, dentist_id) VALUES (%s, %s, %s, %s)",
+        (appointment_id, date, time_slot, dentist_id))
+    return dentist_id
+
+
+def record_slot_usage(cursor, bookings):
+    """Count (date, time_slot) bookings that skip the capacity check, e.g. imported history"""
+    cursor.executemany(
+        "INSERT INTO slot_usage (date, time_slot, booked) VALUES (%s, %s, 1) "
+        "ON DUPLICATE KEY UPDATE booked = booked + 1",
+        bookings)
+
+
+def save_dentist(name, active=True):
+    with db_connection() as db:
+        if db is None:
+            raise ConnectionError("Cannot connect to database.")
+        cursor = db.cursor()
+        cursor.execute("INSERT INTO dentists (name, active) VALUES (%s, %s) ON DUPLICATE KEY UPDATE active = %s",
+                       (name, int(active), int(active)))
+        db.commit()
+    schedule_index.invalidate()
@@ -0,0 +1,359 @@
+import datetime
+
+from .appointments import TIME_SLOTS
+from .db import db_connection, get_dialect
+from .journal import replay_journal, write_journal
+from .scheduling import SCHEDULE_DEFAULT_CAPACITY
+from .summary import rebuild_summary_tables
+
+
+def create_index(cursor, table, name, columns, unique=False):
+    """CREATE INDEX unless an index with that name already exists (MySQL has no IF NOT EXISTS here)"""
+    if not get_dialect().index_exists(cursor, table, name):
+        cursor.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {table} ({columns})")
+
+
+def add_column(cursor, table, name, definition):
+    """ALTER TABLE ... ADD COLUMN unless the column already exists"""
+    if not get_dialect().column_exists(cursor, table, name):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+
+def migration_base_tables(cursor):
+    # Create admin accounts table first
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS admin_accounts (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(255) UNIQUE NOT NULL,
+            password VARCHAR(255) NOT NULL
+        )
+    """)
+
+    # Create patient accounts table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS patient_accounts (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            email VARCHAR(255) UNIQUE NOT NULL,
+            password VARCHAR(255) NOT NULL
+        )
+    """)
+
+    # Create patients table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS patients (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            birth_date DATE,
+            demographic_type VARCHAR(50),
+            contact VARCHAR(100),
+            type VARCHAR(50) DEFAULT 'Pending'
+        )
+    """)
+
+    # Create appointments table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS appointments (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            patient_name VARCHAR(255) NOT NULL,
+            date DATE NOT NULL,
+            time_slot VARCHAR(50) NOT NULL,
+            services TEXT,
+            status VARCHAR(50) DEFAULT 'Booked'
+        )
+    """)
+
+    # Create payments table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS payments (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            appointment_id INT,
+            amount DECIMAL(10,2),
+            method VARCHAR(50),
+            date_paid DATETIME
+        )
+    """)
+
+    # Insert default admin if not exists
+    cursor.execute("INSERT IGNORE INTO admin_accounts (username, password) VALUES ('admin', 'admin123')")
+
+
+def migration_summary_tables(cursor):
+    # Summary tables kept current by the write paths (see SUMMARY TABLES)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS summary_counters (
+            name VARCHAR(50) PRIMARY KEY,
+            value DECIMAL(14,2) NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS summary_appointment_status (
+            status VARCHAR(50) PRIMARY KEY,
+            total INT NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS summary_monthly_revenue (
+            month CHAR(7) PRIMARY KEY,
+            revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+            payments INT NOT NULL DEFAULT 0
+        )
+    """)
+    rebuild_summary_tables(cursor)
+
+
+def migration_secondary_indexes(cursor):
+    # Patient lookups: payment tab, calculate_total, status edits
+    create_index(cursor, "appointments", "idx_appointments_patient_status_date", "patient_name, status, date")
+    # Date-ordered admin grid and per-day slot checks
+    create_index(cursor, "appointments", "idx_appointments_date_slot", "date, time_slot")
+    create_index(cursor, "appointments", "idx_appointments_status_date", "status, date")
+    create_index(cursor, "patients", "idx_patients_name", "name")
+    create_index(cursor, "payments", "idx_payments_date_paid", "date_paid")
+    create_index(cursor, "payments", "idx_payments_appointment", "appointment_id")
+
+
+def migration_service_catalog(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS services (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(100) NOT NULL UNIQUE,
+            price DECIMAL(10,2) NOT NULL,
+            active TINYINT(1) NOT NULL DEFAULT 1,
+            sort_order INT NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS app_settings (
+            name VARCHAR(50) PRIMARY KEY,
+            value VARCHAR(255) NOT NULL
+        )
+    """)
+
+    # The prices that used to be hardcoded in DentalBookingApp
+    default_services = [
+        ("Dental Cleaning", 500, 1),
+        ("Tooth Extraction", 1000, 2),
+        ("Braces Consultation", 700, 3),
+        ("Whitening", 1200, 4),
+        ("Dental Check-up", 300, 5),
+        ("Root Canal", 3500, 6),
+        ("Dental Filling", 1500, 7),
+        ("X-Ray", 800, 8),
+        ("Gum Treatment", 2000, 9),
+        ("Dental Implant", 8000, 10)
+    ]
+    cursor.executemany("INSERT IGNORE INTO services (name, price, sort_order) VALUES (%s, %s, %s)",
+                       default_services)
+    cursor.execute("INSERT IGNORE INTO app_settings (name, value) VALUES ('service_catalog_version', '1')")
+
+
+def migration_appointment_services(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS appointment_services (
+            appointment_id INT NOT NULL,
+            service_id INT NOT NULL,
+            price_at_booking DECIMAL(10,2) NOT NULL,
+            PRIMARY KEY (appointment_id, service_id)
+        )
+    """)
+    create_index(cursor, "appointment_services", "idx_appointment_services_service", "service_id, appointment_id")
+    backfill_appointment_services(cursor)
+
+
+def backfill_appointment_services(cursor, batch_size=1000):
+    """Parse the legacy comma-joined appointments.services text into join rows, one committed batch at a time"""
+    cursor.execute("SELECT id, name, price FROM services")
+    services = {name: (service_id, price) for service_id, name, price in cursor.fetchall()}
+
+    last_id = 0
+    while True:
+        cursor.execute("SELECT id, services FROM appointments WHERE id > %s ORDER BY id LIMIT %s",
+                       (last_id, batch_size))
+        batch = cursor.fetchall()
+        if not batch:
+            break
+        rows = []
+        for appointment_id, services_text in batch:
+            if not services_text or services_text == "No services":
+                continue
+            for name in services_text.split(", "):
+                service = services.get(name.strip())
+                if service is not None:
+                    rows.append((appointment_id, service[0], service[1]))
+        if rows:
+            cursor.executemany(
+                "INSERT IGNORE INTO appointment_services (appointment_id, service_id, price_at_booking) "
+                "VALUES (%s, %s, %s)", rows)
+        cursor.execute("COMMIT")
+        last_id = batch[-1][0]
+
+
+def migration_change_timestamps(cursor):
+    # Watermark for incremental exports of rows that are edited after insert
+    for table in ("patients", "appointments"):
+        if not get_dialect().column_exists(cursor, table, "updated_at"):
+            get_dialect().add_updated_at(cursor, table, "updated_at")
+        create_index(cursor, table, f"idx_{table}_updated_at", "updated_at")
+
+
+def migration_search_indexes(cursor):
+    # Admin grid search and filters (see grid_filter_conditions)
+    create_index(cursor, "patients", "idx_patients_contact", "contact")
+    create_index(cursor, "patients", "idx_patients_type_name", "type, name")
+    create_index(cursor, "payments", "idx_payments_method_date_paid", "method, date_paid")
+
+
+def migration_scheduling(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schedule_slots (
+            time_slot VARCHAR(50) PRIMARY KEY,
+            capacity INT NOT NULL,
+            sort_order INT NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS dentists (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL UNIQUE,
+            active TINYINT(1) NOT NULL DEFAULT 1
+        )
+    """)
+    # One counter row per (date, slot) that has bookings: the row lock taken by the
+    # conditional UPDATE in reserve_slot() is what serializes bookings of one slot
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS slot_usage (
+            date DATE NOT NULL,
+            time_slot VARCHAR(50) NOT NULL,
+            booked INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (date, time_slot)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS slot_reservations (
+            appointment_id INT PRIMARY KEY,
+            date DATE NOT NULL,
+            time_slot VARCHAR(50) NOT NULL,
+            dentist_id INT NULL,
+            CONSTRAINT uq_slot_reservations_dentist UNIQUE (dentist_id, date, time_slot)
+        )
+    """)
+    add_column(cursor, "appointments", "dentist_id", "INT NULL")
+    cursor.executemany("INSERT IGNORE INTO schedule_slots (time_slot, capacity, sort_order) VALUES (%s, %s, %s)",
+                       [(slot, SCHEDULE_DEFAULT_CAPACITY, order) for order, slot in enumerate(TIME_SLOTS, 1)])
+    cursor.execute("""
+        INSERT IGNORE INTO slot_usage (date, time_slot, booked)
+        SELECT date, time_slot, COUNT(*) FROM appointments WHERE status != 'Cancelled' GROUP BY date, time_slot
+    """)
+
+
+def migration_receipts(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS receipts (
+            payment_id INT PRIMARY KEY,
+            appointment_id INT NOT NULL,
+            patient_name VARCHAR(255) NOT NULL,
+            issued_at DATETIME NOT NULL,
+            total DECIMAL(10,2) NOT NULL,
+            template_version INT NOT NULL,
+            data TEXT NOT NULL,
+            body TEXT NOT NULL
+        )
+    """)
+    create_index(cursor, "receipts", "idx_receipts_issued_at", "issued_at")
+    create_index(cursor, "receipts", "idx_receipts_patient_issued_at", "patient_name, issued_at")
+
+
+def migration_payment_idempotency(cursor):
+    add_column(cursor, "payments", "idempotency_key", "VARCHAR(64) NULL")
+    create_index(cursor, "payments", "uq_payments_idempotency_key", "idempotency_key", unique=True)
+
+
+def migration_offline_journal(cursor):
+    # One row per replayed journal entry, written in the entry's own transaction
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS journal_replays (
+            entry_id VARCHAR(32) PRIMARY KEY,
+            operation VARCHAR(50) NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            error TEXT,
+            queued_at DATETIME NOT NULL,
+            replayed_at DATETIME NOT NULL
+        )
+    """)
+
+
+# Append new migrations at the end; never renumber or edit one that has shipped
+SCHEMA_MIGRATIONS = [
+    (1, "base tables", migration_base_tables),
+    (2, "summary tables", migration_summary_tables),
+    (3, "secondary indexes", migration_secondary_indexes),
+    (4, "service catalog", migration_service_catalog),
+    (5, "appointment services", migration_appointment_services),
+    (6, "change timestamps", migration_change_timestamps),
+    (7, "search indexes", migration_search_indexes),
+    (8, "scheduling", migration_scheduling),
+    (9, "receipts", migration_receipts),
+    (10, "payment idempotency", migration_payment_idempotency),
+    (11, "offline journal", migration_offline_journal),
+]
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+
+def get_schema_version(cursor):
+    if not get_dialect().table_exists(cursor, "schema_migrations"):
+        return 0
+    cursor.execute("SELECT MAX(version) FROM schema_migrations")
+    return cursor.fetchone()[0] or 0
+
+
+def run_migrations(db):
+    """Apply pending schema migrations; returns the versions applied"""
+    cursor = db.cursor()
+    if get_schema_version(cursor) >= SCHEMA_VERSION:
+        return []
+
+    # Serialize terminals that start at the same time against an old schema
+    get_dialect().acquire_lock(cursor, "dental_clinic_schema", 60)
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                applied_at DATETIME NOT NULL
+            )
+        """)
+        current = get_schema_version(cursor)
+        applied = []
+        for version, name, migrate in SCHEMA_MIGRATIONS:
+            if version <= current:
+                continue
+            migrate(cursor)
+            cursor.execute("INSERT INTO schema_migrations (version, name, applied_at) VALUES (%s, %s, %s)",
+                           (version, name, datetime.datetime.now()))
+            db.commit()
+            applied.append(version)
+            print(f"Applied schema migration {version}: {name}")
+        return applied
+    finally:
+        get_dialect().release_lock(cursor, "dental_clinic_schema")
+
+
+def setup_database():
+    """Initialize database tables"""
+    try:
+        with db_connection() as db:
+            if db is None:
+                return False
+            run_migrations(db)
+
+        print("Database initialized successfully")
+    except Exception as e:
+        print(f"Database setup error: {e}")
+        return False
+
+    if write_journal.pending():
+        try:
+            replay_journal()
+        except Exception as e:
+            print(f"Offline journal replay error: {e}")
+    return True
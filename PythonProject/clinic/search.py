@@ -0,0 +1,158 @@
+import datetime
+import threading
+import time
+from collections import OrderedDict
+
+from .db import db_connection
+
+
+# Search box and filters of the admin grids, turned into parameterized WHERE
+# conditions that the grid's keyset-paged query ANDs in. Text searches are
+# prefix matches so they stay on an index. First pages of filtered queries
+# are cached briefly so retyping or toggling back to a filter is free.
+GRID_SEARCH_DELAY_MS = 300  # debounce for typing in the search box
+GRID_SEARCH_CACHE_SIZE = 64
+GRID_SEARCH_CACHE_TTL = 30  # seconds
+
+# Columns a grid may filter on by equality, and its date-range column
+GRID_FILTER_COLUMNS = {
+    "patients": ("type",),
+    "appointments": ("status", "time_slot"),
+    "payments": ("method",)
+}
+GRID_DATE_COLUMNS = {
+    "appointments": "date",
+    "payments": "date_paid"
+}
+
+
+# Explicit escape character: SQLite has no default one, and "!" reads the same in MySQL and SQLite
+# string literals, where a backslash does not
+LIKE_ESCAPE = "!"
+
+
+def like_prefix(term):
+    for char in (LIKE_ESCAPE, "%", "_"):
+        term = term.replace(char, LIKE_ESCAPE + char)
+    return term + "%"
+
+
+def search_condition(table, term):
+    """WHERE condition for the search box: digits look up contact numbers / appointment ids, text looks up names"""
+    term = term.strip()
+    if not term:
+        return None
+    if table == "patients":
+        column = "contact" if term.isdigit() else "name"
+        return f"{column} LIKE %s ESCAPE '{LIKE_ESCAPE}'", [like_prefix(term)]
+    if table == "appointments":
+        return f"patient_name LIKE %s ESCAPE '{LIKE_ESCAPE}'", [like_prefix(term)]
+    if table == "payments":
+        if term.isdigit():
+            return "appointment_id = %s", [int(term)]
+        return f"method LIKE %s ESCAPE '{LIKE_ESCAPE}'", [like_prefix(term)]
+    raise ValueError(f"No search defined for {table}")
+
+
+def grid_filter_conditions(table, search="", equals=None, date_range=None):
+    """[(sql, params)] for a grid's search term, {column: value} filters and (start, end) date range"""
+    conditions = []
+    condition = search_condition(table, search or "")
+    if condition is not None:
+        conditions.append(condition)
+    for column, value in (equals or {}).items():
+        if column not in GRID_FILTER_COLUMNS.get(table, ()):
+            raise ValueError(f"Cannot filter {table} on {column}")
+        conditions.append((f"{column} = %s", [value]))
+    if date_range is not None:
+        column = GRID_DATE_COLUMNS[table]
+        start, end = date_range
+        # Half-open range so DATETIME columns include the whole end day
+        conditions.append((f"{column} >= %s AND {column} < %s", [start, end + datetime.timedelta(days=1)]))
+    return conditions
+
+
+class GridQueryCache:
+    """Small LRU of first-page results keyed by (table, sql, params); safe to use from worker threads"""
+
+    def __init__(self, size=GRID_SEARCH_CACHE_SIZE, ttl=GRID_SEARCH_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            rows, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return rows
+
+    def put(self, key, rows):
+        with self._lock:
+            self._entries[key] = (rows, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, table=None):
+        with self._lock:
+            for key in [key for key in self._entries if table is None or key[0] == table]:
+                del self._entries[key]
+
+
+grid_query_cache = GridQueryCache()
+
+
+def grid_page_query(table, columns, sort_column, descending, after, conditions, page_size):
+    """SQL and params for one keyset page; after is the (sort key, id) of the last loaded row, or None"""
+    col = sort_column
+    op = "<" if descending else ">"
+    direction = "DESC" if descending else "ASC"
+    sql = f"SELECT id, {', '.join(columns)} FROM {table}"
+    where = [f"({condition})" for condition, _ in conditions]
+    params = [param for _, condition_params in conditions for param in condition_params]
+    if after is not None:
+        key, last_id = after
+        # MySQL sorts NULL keys first ascending and last descending
+        if key is None:
+            if descending:
+                where.append(f"{col} IS NULL AND id < %s")
+            else:
+                where.append(f"(({col} IS NULL AND id > %s) OR {col} IS NOT NULL)")
+            params.append(last_id)
+        else:
+            keyset = f"{col} {op} %s OR ({col} = %s AND id {op} %s)"
+            if descending:
+                keyset += f" OR {col} IS NULL"
+            where.append(f"({keyset})")
+            params += [key, key, last_id]
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {col} {direction}, id {direction} LIMIT %s"
+    params.append(page_size)
+    return sql, params
+
+
+def fetch_grid_page(table, columns, sort_column, descending, after, conditions, page_size, use_cache=False):
+    """One page of (id, *columns) rows; filtered first pages go through grid_query_cache"""
+    sql, params = grid_page_query(table, columns, sort_column, descending, after, conditions, page_size)
+    cache_key = (table, sql, tuple(params))
+    if use_cache:
+        rows = grid_query_cache.get(cache_key)
+        if rows is not None:
+            return rows
+    with db_connection() as db:
+        if db is None:
+            raise ConnectionError("Cannot connect to database.")
+        cursor = db.cursor()
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    if after is None and conditions:
+        grid_query_cache.put(cache_key, rows)
+    return rows
@@ -0,0 +1,77 @@
+import os
+import threading
+import time
+
+from .db import db_connection
+
+
+DASHBOARD_STATS_TTL = float(os.environ.get("DENTAL_STATS_TTL", "60"))  # seconds
+
+# Every card and chart series in one round trip: (kind, key, value) rows.
+# Reads only the summary tables, so the cost does not grow with history.
+DASHBOARD_STATS_QUERY = """
+    SELECT name AS kind, NULL AS label, value FROM summary_counters
+    UNION ALL
+    SELECT 'status', status, total FROM summary_appointment_status WHERE total <> 0
+    UNION ALL
+    SELECT 'month', month, revenue FROM (
+        SELECT month, revenue
+        FROM summary_monthly_revenue
+        ORDER BY month DESC
+        LIMIT 6
+    ) AS recent_months
+"""
+
+_dashboard_stats_cache = {"stats": None, "loaded_at": 0.0}
+_dashboard_stats_lock = threading.Lock()
+
+
+def load_dashboard_stats(cursor):
+    cursor.execute(DASHBOARD_STATS_QUERY)
+    stats = {
+        "total_patients": 0,
+        "total_appointments": 0,
+        "total_revenue": 0.0,
+        "pending_appointments": 0,
+        "status_counts": [],
+        "monthly_revenue": []
+    }
+    for kind, label, value in cursor.fetchall():
+        if kind == "patients":
+            stats["total_patients"] = int(value)
+        elif kind == "revenue":
+            stats["total_revenue"] = float(value or 0)
+        elif kind == "status":
+            stats["status_counts"].append((label, int(value)))
+            stats["total_appointments"] += int(value)
+            if label == "Booked":
+                stats["pending_appointments"] = int(value)
+        elif kind == "month":
+            stats["monthly_revenue"].append((label, float(value or 0)))
+
+    # Query returns newest month first; charts read oldest to newest
+    stats["monthly_revenue"].reverse()
+    return stats
+
+
+def get_dashboard_stats(max_age=DASHBOARD_STATS_TTL):
+    """Dashboard cards and chart series, served from a short-lived cache"""
+    with _dashboard_stats_lock:
+        cached = _dashboard_stats_cache["stats"]
+        if cached is not None and time.monotonic() - _dashboard_stats_cache["loaded_at"] < max_age:
+            return cached
+
+    with db_connection() as db:
+        if db is None:
+            return None
+        stats = load_dashboard_stats(db.cursor())
+
+    with _dashboard_stats_lock:
+        _dashboard_stats_cache["stats"] = stats
+        _dashboard_stats_cache["loaded_at"] = time.monotonic()
+    return stats
+
+
+def invalidate_dashboard_stats():
+    with _dashboard_stats_lock:
+        _dashboard_stats_cache["stats"] = None
@@ -0,0 +1,54 @@
+# Running totals behind the dashboard. The helpers below take the caller's
+# cursor so the summary update commits (or rolls back) with the write itself.
+def rebuild_summary_tables(cursor):
+    """Recompute every summary table from the base tables"""
+    cursor.execute("DELETE FROM summary_counters")
+    cursor.execute("DELETE FROM summary_appointment_status")
+    cursor.execute("DELETE FROM summary_monthly_revenue")
+    cursor.execute("INSERT INTO summary_counters (name, value) SELECT 'patients', COUNT(*) FROM patients")
+    cursor.execute(
+        "INSERT INTO summary_counters (name, value) SELECT 'revenue', COALESCE(SUM(amount), 0) FROM payments")
+    cursor.execute("""
+        INSERT INTO summary_appointment_status (status, total)
+        SELECT status, COUNT(*) FROM appointments WHERE status IS NOT NULL GROUP BY status
+    """)
+    cursor.execute("""
+        INSERT INTO summary_monthly_revenue (month, revenue, payments)
+        SELECT DATE_FORMAT(date_paid, '%Y-%m') AS month, SUM(amount), COUNT(*)
+        FROM payments
+        WHERE date_paid IS NOT NULL
+        GROUP BY month
+    """)
+
+
+def summary_patient_added(cursor, count=1):
+    cursor.execute(
+        "INSERT INTO summary_counters (name, value) VALUES ('patients', %s) "
+        "ON DUPLICATE KEY UPDATE value = value + %s",
+        (count, count))
+
+
+def summary_appointment_added(cursor, status, count=1):
+    cursor.execute(
+        "INSERT INTO summary_appointment_status (status, total) VALUES (%s, %s) "
+        "ON DUPLICATE KEY UPDATE total = total + %s",
+        (status, count, count))
+
+
+def summary_appointment_status_changed(cursor, old_status, new_status, count=1):
+    if old_status == new_status:
+        return
+    if old_status is not None:
+        summary_appointment_added(cursor, old_status, -count)
+    summary_appointment_added(cursor, new_status, count)
+
+
+def summary_payment_recorded(cursor, amount, date_paid):
+    cursor.execute(
+        "INSERT INTO summary_counters (name, value) VALUES ('revenue', %s) "
+        "ON DUPLICATE KEY UPDATE value = value + %s",
+        (amount, amount))
+    cursor.execute(
+        "INSERT INTO summary_monthly_revenue (month, revenue, payments) VALUES (%s, %s, 1) "
+        "ON DUPLICATE KEY UPDATE revenue = revenue + %s, payments = payments + 1",
+        (date_paid.strftime("%Y-%m"), amount, amount))
@@ -0,0 +1,69 @@
+import datetime
+
+import pytest
+
+from clinic import db
+from clinic.analytics import _analytics_cache
+from clinic.catalog import service_catalog
+from clinic.entities import entity_cache
+from clinic.journal import write_journal
+from clinic.scheduling import schedule_index
+from clinic.schema import setup_database
+from clinic.search import grid_query_cache
+from clinic.stats import invalidate_dashboard_stats
+
+
+# Tests run headless against the embedded SQLite backend: each test that asks
+# for `database` gets a freshly migrated file, its own offline journal and
+# empty in-process caches, so nothing leaks between tests or into the
+# clinic's real database.
+def reset_caches():
+    entity_cache.invalidate()
+    schedule_index.invalidate()
+    grid_query_cache.invalidate()
+    invalidate_dashboard_stats()
+    service_catalog.version = None
+    _analytics_cache["analytics"] = None
+
+
+def use_database(monkeypatch, path):
+    """Point the pool at another SQLite file; the next checkout connects to it"""
+    if db._db_pool is not None:
+        db._db_pool.close_all()
+    monkeypatch.setattr(db, "DB_SQLITE_PATH", str(path))
+    monkeypatch.setattr(db, "_db_backend", None)
+    monkeypatch.setattr(db, "_db_pool", None)
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_BACKEND", "sqlite")
+    use_database(monkeypatch, tmp_path / "clinic.db")
+    monkeypatch.setattr(write_journal, "path", str(tmp_path / "journal.jsonl"))
+    monkeypatch.setattr(write_journal, "_count", None)
+    reset_caches()
+    assert setup_database()
+    yield tmp_path / "clinic.db"
+    if db._db_pool is not None:
+        db._db_pool.close_all()
+    reset_caches()
+
+
+@pytest.fixture
+def offline(database, monkeypatch):
+    """Make the database unreachable: the file sits in a directory that does not exist"""
+    use_database(monkeypatch, database.parent / "missing" / "clinic.db")
+    return lambda: use_database(monkeypatch, database)
+
+
+@pytest.fixture
+def tomorrow():
+    return datetime.date.today() + datetime.timedelta(days=1)
+
+
+def query(sql, params=()):
+    """Rows of one statement on a pooled connection"""
+    with db.db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        return cursor.fetchall()
@@ -0,0 +1,83 @@
+import datetime
+import math
+
+import pandas as pd
+import pytest
+
+from clinic import analytics
+from clinic.analytics import compute_analytics, get_analytics
+from clinic.appointments import book_appointment
+from clinic.billing import new_payment_key, record_payment
+from clinic.catalog import get_service_catalog
+from clinic.db import db_connection, fetch_data
+
+
+def frames(appointments, lines=(), payments=(), patients=()):
+    return {
+        "appointments": pd.DataFrame(
+            [(appointment_id, name, pd.Timestamp(date), "9:00 AM", status)
+             for appointment_id, name, date, status in appointments],
+            columns=["id", "patient_name", "date", "time_slot", "status"]),
+        "lines": pd.DataFrame(list(lines), columns=["appointment_id", "service", "price_at_booking"]),
+        "payments": pd.DataFrame(list(payments), columns=["appointment_id", "amount", "date_paid"]),
+        "patients": pd.DataFrame(list(patients), columns=["name", "demographic_type"]),
+    }
+
+
+def test_retention_leaves_months_not_reached_yet_blank():
+    result = compute_analytics(frames([
+        (1, "Ana", "2026-01-10", "Complete"), (2, "Ana", "2026-03-02", "Complete"),
+        (3, "Ben", "2026-01-20", "Complete"),
+        (4, "Cy", "2026-03-15", "Booked"), (5, "Cy", "2026-04-01", "Cancelled"),
+    ]), today=datetime.date(2026, 4, 15))
+    retention = result["cohort_retention"].set_index("cohort")
+    assert list(retention.index) == ["2026-01", "2026-03"]
+    assert retention.loc["2026-01", "patients"] == 2
+    assert [retention.loc["2026-01", offset] for offset in range(4)] == [1.0, 0.0, 0.5, 0.0]
+    assert all(math.isnan(retention.loc["2026-01", offset]) for offset in range(4, 7))
+    # March's cohort has had one more month; the cancelled April visit does not count
+    assert retention.loc["2026-03", 1] == 0.0
+    assert all(math.isnan(retention.loc["2026-03", offset]) for offset in range(2, 7))
+
+
+def test_payments_are_split_across_services_by_booked_price():
+    result = compute_analytics(frames(
+        [(1, "Ana", "2026-01-10", "Complete"), (2, "Ben", "2026-01-11", "Booked")],
+        lines=[(1, "Cleaning", 500.0), (1, "Whitening", 1500.0), (2, "Cleaning", 500.0)],
+        payments=[(1, 1600.0, pd.Timestamp("2026-01-10"))],
+        patients=[("Ana", "Senior")]), today=datetime.date(2026, 2, 1))
+    by_service = result["revenue_by_service"].set_index("service")
+    assert by_service.loc["Whitening", "revenue"] == pytest.approx(1200.0)
+    assert by_service.loc["Cleaning", "revenue"] == pytest.approx(400.0)
+    assert by_service.loc["Cleaning", "bookings"] == 2
+    assert result["revenue_by_discount_class"].to_dict("records") == [
+        {"discount_class": "Senior", "appointments": 1, "revenue": 1600.0}]
+    assert result["rates"] == {"past_appointments": 2, "completion_rate": 0.5,
+                               "cancellation_rate": 0.0, "no_show_rate": 0.5}
+
+
+def test_analytics_are_loaded_from_the_database_and_cached(database, tomorrow):
+    service = get_service_catalog().active_services()[0]
+    appointment_id = book_appointment("Ana Cruz", tomorrow, "9:00 AM", [service["id"]])
+    record_payment(appointment_id, "Cash", new_payment_key(appointment_id))
+    result = get_analytics()
+    assert result["revenue_by_service"].to_dict("records") == [
+        {"service": service["name"], "bookings": 1, "booked_value": service["price"], "revenue": service["price"]}]
+    assert get_analytics() is result
+
+
+def test_failed_loads_raise_and_are_not_cached(database, monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setitem(analytics.ANALYTICS_QUERIES, "payments",
+                      ("SELECT no_such_column FROM payments", ["appointment_id", "amount", "date_paid"]))
+        with pytest.raises(Exception, match="no_such_column"):
+            get_analytics()
+    assert analytics._analytics_cache["analytics"] is None
+    assert get_analytics()["rates"]["past_appointments"] == 0
+
+
+def test_fetch_data_reads_rows_through_the_cursor(database):
+    with db_connection() as db:
+        frame = fetch_data("SELECT name, price FROM services WHERE price > %s ORDER BY price", db, (3000,))
+    assert list(frame.columns) == ["name", "price"]
+    assert list(frame["name"]) == ["Root Canal", "Dental Implant"]
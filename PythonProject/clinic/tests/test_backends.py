@@ -0,0 +1,38 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+
+from clinic.backends import SQLiteDialect
+from clinic.db import db_connection
+
+from .conftest import query
+
+
+@pytest.mark.parametrize("mysql, sqlite", [
+    ("CREATE TABLE t (id INT AUTO_INCREMENT PRIMARY KEY)", "CREATE TABLE t (id INTEGER PRIMARY KEY AUTOINCREMENT)"),
+    ("INSERT IGNORE INTO t (a) VALUES (%s)", "INSERT OR IGNORE INTO t (a) VALUES (?)"),
+    ("INSERT INTO t (a) VALUES (%s) ON DUPLICATE KEY UPDATE a = a + %s",
+     "INSERT INTO t (a) VALUES (?) ON CONFLICT DO UPDATE SET a = a + ?"),
+    ("SELECT DATE_FORMAT(date_paid, '%Y-%m') FROM payments", "SELECT strftime('%Y-%m', date_paid) FROM payments"),
+    ("UPDATE t SET updated_at = NOW()", "UPDATE t SET updated_at = datetime('now', 'localtime')"),
+])
+def test_mysql_statements_are_rewritten(mysql, sqlite):
+    assert SQLiteDialect().translate(mysql) == (sqlite, False)
+
+
+def test_for_update_is_stripped_and_reported():
+    assert SQLiteDialect().translate("SELECT status FROM appointments WHERE id = %s FOR UPDATE\n") == (
+        "SELECT status FROM appointments WHERE id = ?", True)
+
+
+def test_columns_come_back_as_mysql_types(database):
+    with db_connection() as db:
+        cursor = db.cursor(dictionary=True)
+        cursor.execute("INSERT INTO payments (appointment_id, amount, method, date_paid) VALUES (%s, %s, %s, %s)",
+                       (1, Decimal("1234.50"), "Cash", datetime.datetime(2026, 1, 2, 3, 4, 5)))
+        cursor.execute("SELECT amount, date_paid FROM payments")
+        assert cursor.fetchone() == {"amount": Decimal("1234.50"),
+                                     "date_paid": datetime.datetime(2026, 1, 2, 3, 4, 5)}
+        db.commit()
+    assert query("SELECT COUNT(*) FROM payments") == [(1,)]
@@ -0,0 +1,52 @@
+import datetime
+
+import pytest
+
+from clinic.appointments import book_appointment, update_appointment_status
+from clinic.billing import new_payment_key, record_payment
+from clinic.catalog import get_service_catalog
+from clinic.patients import save_patient
+
+from .conftest import query
+
+
+@pytest.fixture
+def appointment(database, tomorrow):
+    save_patient("Ben Santos", datetime.date(2005, 5, 5), "Student", "09181234567")
+    services = get_service_catalog().active_services()[:2]
+    appointment_id = book_appointment("Ben Santos", tomorrow, "10:00 AM", [service["id"] for service in services])
+    return appointment_id, sum(service["price"] for service in services)
+
+
+def test_payment_is_charged_once_per_key(appointment):
+    appointment_id, base_total = appointment
+    key = new_payment_key(appointment_id)
+    bill, receipt_text, replayed = record_payment(appointment_id, "Cash", key)
+    assert not replayed
+    assert bill["total"] == pytest.approx(base_total * 0.9)  # Student discount
+
+    # A retry of the same attempt (lost response, double click) returns the first result
+    assert record_payment(appointment_id, "Cash", key) == (bill, receipt_text, True)
+    assert query("SELECT COUNT(*) FROM payments") == [(1,)]
+    assert query("SELECT COUNT(*) FROM receipts") == [(1,)]
+    assert query("SELECT value FROM summary_counters WHERE name = 'revenue'")[0][0] == pytest.approx(bill["total"])
+    assert query("SELECT status FROM appointments WHERE id = %s", (appointment_id,)) == [("Complete",)]
+
+
+def test_second_payment_under_another_key_is_refused(appointment):
+    appointment_id, _ = appointment
+    record_payment(appointment_id, "Cash", new_payment_key(appointment_id))
+    with pytest.raises(LookupError, match="already been paid"):
+        record_payment(appointment_id, "GCash", new_payment_key(appointment_id))
+    assert query("SELECT COUNT(*) FROM payments") == [(1,)]
+
+
+def test_cancelled_and_missing_appointments_are_not_charged(appointment):
+    appointment_id, _ = appointment
+    update_appointment_status(appointment_id, "Cancelled")
+    with pytest.raises(LookupError, match="cancelled"):
+        record_payment(appointment_id, "Cash", new_payment_key(appointment_id))
+    with pytest.raises(LookupError, match="not found"):
+        record_payment(appointment_id + 1, "Cash", new_payment_key(appointment_id + 1))
+    assert query("SELECT COUNT(*) FROM payments") == [(0,)]
+    assert query("SELECT COUNT(*) FROM receipts") == [(0,)]
@@ -0,0 +1,67 @@
+import pytest
+
+from clinic import db
+from clinic.db import CircuitBreaker, ConnectionPool, db_connection, get_db_pool
+
+from .conftest import query
+
+
+def test_pool_reuses_connections(database):
+    before = get_db_pool().stats()
+    for _ in range(3):
+        with db_connection() as conn:
+            conn.cursor().execute("SELECT 1")
+    stats = get_db_pool().stats()
+    assert stats["checkouts"] - before["checkouts"] == 3
+    assert stats["connects"] == before["connects"] == 1
+    assert stats["in_use"] == 0
+
+
+def test_returned_connection_is_rolled_back(database):
+    with db_connection() as conn:
+        conn.cursor().execute("INSERT INTO dentists (name, active) VALUES (%s, 1)", ("Uncommitted",))
+    assert query("SELECT COUNT(*) FROM dentists") == [(0,)]
+
+
+def test_returned_connection_cannot_be_used(database):
+    conn = get_db_pool().acquire()
+    conn.close()
+    with pytest.raises(db.get_backend().OperationalError):
+        conn.cursor()
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failures=2, cooldown=60)
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.trips == 1
+    assert 0 < breaker.retry_in() <= 60
+
+
+def test_breaker_lets_one_probe_through_after_cooldown():
+    breaker = CircuitBreaker(failures=1, cooldown=0)
+    breaker.record_failure()
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.retry_in() == 0.0
+
+
+def test_pool_fails_fast_while_breaker_is_open(offline):
+    pool = ConnectionPool(size=2)
+    pool.breaker = CircuitBreaker(failures=2, cooldown=60)
+    for _ in range(2):
+        with pytest.raises(pool.backend.OperationalError, match="unable to open"):
+            pool.acquire()
+    with pytest.raises(pool.backend.OperationalError, match="Database unreachable"):
+        pool.acquire()
+    stats = pool.stats()
+    assert stats["rejected"] == 1 and stats["breaker"] == "open" and stats["open"] == 0
+
+
+def test_db_connection_yields_none_when_unreachable(offline):
+    with db_connection() as conn:
+        assert conn is None
@@ -0,0 +1,49 @@
+import datetime
+
+from clinic.appointments import book_appointment, patient_appointments, update_appointment_status
+from clinic.billing import latest_bill
+from clinic.db import get_db_pool
+from clinic.entities import EntityCache
+from clinic.patients import find_patient, get_patient, save_patient, update_patient_status
+
+
+def checkouts():
+    return get_db_pool().stats()["checkouts"]
+
+
+def test_repeated_lookups_are_served_from_the_cache(database, tomorrow):
+    patient_id = save_patient("Faye Ong", datetime.date(1970, 7, 7), "Senior", "09221234567")
+    book_appointment("Faye Ong", tomorrow, "3:00 PM", [])
+    bill = latest_bill("Faye Ong")
+    before = checkouts()
+    assert latest_bill("Faye Ong") == bill
+    assert find_patient("Faye Ong")["id"] == patient_id
+    assert checkouts() == before
+
+    update_patient_status(patient_id, "Complete")
+    assert get_patient(patient_id)["type"] == "Complete"
+    assert find_patient("Faye Ong")["type"] == "Complete"
+
+
+def test_writes_invalidate_what_they_change(database, tomorrow):
+    first = book_appointment("Gil Tan", tomorrow, "3:00 PM", [])
+    assert [row[0] for row in patient_appointments("Gil Tan")] == [first]
+    second = book_appointment("Gil Tan", tomorrow, "4:00 PM", [])
+    assert sorted(row[0] for row in patient_appointments("Gil Tan")) == [first, second]
+    update_appointment_status(first, "Cancelled")
+    assert [row[0] for row in patient_appointments("Gil Tan")] == [second]
+    update_appointment_status(first, "Booked")
+    assert sorted(row[0] for row in patient_appointments("Gil Tan")) == [first, second]
+
+
+def test_stale_loads_are_not_stored():
+    cache = EntityCache(size=2, ttl=60)
+    cache.put(("patient", 1), "old")
+    cache.invalidate("patient")
+    cache.put(("patient", 1), "loaded before the invalidation", generation=0)
+    assert cache.get(("patient", 1)) == (False, None)
+
+    for patient_id in range(3):
+        cache.put(("patient", patient_id), patient_id)
+    assert cache.get(("patient", 0)) == (False, None)
+    assert cache.stats()["evictions"] == 1
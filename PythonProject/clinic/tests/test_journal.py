@@ -0,0 +1,88 @@
+import datetime
+import json
+import os
+
+from clinic.appointments import book_appointment
+from clinic.journal import replay_journal, write_journal
+from clinic.patients import save_patient
+from clinic.scheduling import SCHEDULE_DEFAULT_CAPACITY
+
+from .conftest import query
+
+
+BIRTH_DATE = datetime.date(1985, 3, 2)
+
+
+def test_offline_writes_are_replayed_in_order(offline, tomorrow):
+    assert save_patient("Carla Lim", BIRTH_DATE, "Regular", "09191234567") is None
+    assert book_appointment("Carla Lim", tomorrow, "1:00 PM", []) is None
+    assert [entry["operation"] for entry in write_journal.entries()] == ["save_patient", "book_appointment"]
+
+    offline()  # back online
+    assert replay_journal() == (2, 0)
+    assert query("SELECT name, birth_date FROM patients") == [("Carla Lim", BIRTH_DATE)]
+    assert query("SELECT patient_name, date, time_slot FROM appointments") == [("Carla Lim", tomorrow, "1:00 PM")]
+    assert query("SELECT booked FROM slot_usage WHERE date = %s", (tomorrow,)) == [(1,)]
+    assert not write_journal.pending()
+
+
+def test_new_writes_queue_behind_pending_ones(offline):
+    save_patient("First Queued", BIRTH_DATE, "Regular", "09191234567")
+    offline()
+    # The database is back, but the journal still holds an older write
+    assert save_patient("Second Queued", BIRTH_DATE, "Regular", "09191234568") is None
+    assert write_journal.count() == 2
+
+    assert replay_journal() == (2, 0)
+    assert query("SELECT name FROM patients ORDER BY id") == [("First Queued",), ("Second Queued",)]
+    assert save_patient("Online Again", BIRTH_DATE, "Regular", "09191234569") is not None
+
+
+def test_entries_the_database_refuses_are_recorded_and_dropped(database, tomorrow):
+    for number in range(SCHEDULE_DEFAULT_CAPACITY):
+        book_appointment(f"Walk-in {number}", tomorrow, "2:00 PM", [])
+    # Queued by a terminal that was offline while the slot filled up
+    write_journal.append("book_appointment", {"patient_name": "Late Booker", "date": str(tomorrow),
+                                              "time_slot": "2:00 PM", "service_ids": []})
+
+    assert replay_journal() == (0, 1)
+    (status, error), = query("SELECT status, error FROM journal_replays")
+    assert status == "rejected" and "fully booked" in error
+    assert query("SELECT COUNT(*) FROM appointments WHERE patient_name = 'Late Booker'") == [(0,)]
+    assert not write_journal.pending()
+
+
+def test_replaying_an_entry_again_does_not_apply_it_twice(offline):
+    save_patient("Dana Yu", BIRTH_DATE, "PWD", "09201234567")
+    entries = write_journal.entries()
+    offline()
+    assert replay_journal() == (1, 0)
+
+    # As if the process died after committing but before the journal was trimmed
+    with open(write_journal.path, "w", encoding="utf-8") as handle:
+        handle.writelines(json.dumps(entry) + "\n" for entry in entries)
+    assert replay_journal() == (0, 0)
+    assert query("SELECT COUNT(*) FROM patients") == [(1,)]
+    assert not write_journal.pending()
+
+
+def test_unreadable_and_malformed_lines_are_skipped(database):
+    valid = {"id": "a1", "operation": "save_patient", "queued_at": "2026-01-05T10:00:00",
+             "args": {"name": "Eli Go", "birth_date": "1999-09-09", "demographic_type": "Student",
+                      "contact": "09211234567"}}
+    with open(write_journal.path, "w", encoding="utf-8") as handle:
+        handle.write('{"id": "torn", "operation": "save_pat\n')
+        handle.write(json.dumps({"id": "b2", "operation": "save_patient", "args": {}}) + "\n")
+        handle.write(json.dumps(dict(valid, id="c3", queued_at="yesterday")) + "\n")
+        handle.write(json.dumps(valid) + "\n")
+
+    assert [entry["id"] for entry in write_journal.entries()] == ["a1"]
+    assert replay_journal() == (1, 0)
+    assert query("SELECT name FROM patients") == [("Eli Go",)]
+    assert not os.path.exists(write_journal.path)
+
+    with open(write_journal.path, "w", encoding="utf-8") as handle:
+        handle.write("not json\n")
+    # Only junk left: it is trimmed so it cannot keep new writes queued
+    assert replay_journal() == (0, 0)
+    assert not write_journal.pending()
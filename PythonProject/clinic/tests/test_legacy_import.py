@@ -0,0 +1,89 @@
+import datetime
+import json
+
+import pytest
+
+from clinic.legacy_import import import_legacy_data, legacy_time_slot
+
+from .conftest import query
+
+
+PATIENTS_TXT = """\
+John kyle Macay, Age: 17, Contact: 09472834728, Type: Student
+mansueto macay, Age: 76, Contact: 0973473843, Type: senior
+Nameless Age, Age: old, Contact: 09000000000, Type: Regular
+Bad Contact, Age: 30, Contact: 12ab, Type: Regular
+
+john  kyle macay, Age: 17, Contact: 09472834728, Type: Student
+"""
+APPOINTMENTS_TXT = """\
+John kyle Macay | Date: 2025-10-06 | Time: Morning | Services: Dental Cleaning
+mansueto macay | Date: 2025-10-07 | Time: Evening | Services: Tooth Extraction, Whitening
+mansueto macay | Date: 2025-10-08 | Time: 2:00 pm | Services: Dental Check-up
+Someone Else | Date: 2025-13-01 | Time: Morning | Services: Dental Cleaning
+Someone Else | Date: 2025-10-09 | Time: Midnight | Services: Dental Cleaning
+Someone Else | Date: 2025-10-09 | Time: Morning | Services: Teeth Polishing
+"""
+CLINIC_JSON = {
+    "patients": [{"name": "Leo Quintana", "age": "78", "contact": "09557961373", "type": "PWD"},
+                 {"name": "Mansueto Macay", "age": 76, "contact": "0973473843", "type": "Senior"}],
+    "appointments": [{"patient_name": "Leo Quintana", "date": "2025-10-07", "time": "Afternoon",
+                      "services": ["Root Canal"], "status": "Cancelled"},
+                     {"name": "John Kyle Macay", "date": "2025-10-06", "time": "9:00 AM", "services": []}]
+}
+
+
+@pytest.fixture
+def legacy_dir(tmp_path):
+    directory = tmp_path / "legacy"
+    directory.mkdir()
+    (directory / "patients.txt").write_text(PATIENTS_TXT, encoding="utf-8")
+    (directory / "appointments.txt").write_text(APPOINTMENTS_TXT, encoding="utf-8")
+    (directory / "clinic_data.json").write_text(json.dumps(CLINIC_JSON), encoding="utf-8")
+    return directory
+
+
+@pytest.mark.parametrize("value, time_slot", [
+    ("Morning", "9:00 AM"), ("afternoon", "1:00 PM"), (" EVENING ", "5:00 PM"), ("2:00 pm", "2:00 PM"),
+])
+def test_legacy_times_map_to_time_slots(value, time_slot):
+    assert legacy_time_slot(value) == time_slot
+
+
+@pytest.mark.parametrize("value", ["", None, "Midnight", "2:30 PM"])
+def test_unknown_legacy_times_are_rejected(value):
+    with pytest.raises(ValueError):
+        legacy_time_slot(value)
+
+
+def test_import_loads_valid_rows_and_reports_the_rest(database, legacy_dir):
+    report = import_legacy_data(str(legacy_dir), batch_size=2)
+    assert report.read == {"patients": 7, "appointments": 8}
+    assert report.imported == {"patients": 3, "appointments": 4}
+    # Same name (ignoring case and spacing) and contact, across both files
+    assert report.duplicates == {"patients": 2, "appointments": 1}
+    reasons = [reason for _, reason in report.rejects]
+    assert reasons == ["invalid age 'old'", "invalid contact '12ab'", "invalid date '2025-13-01'",
+                       "unknown time 'Midnight'", "unknown services Teeth Polishing"]
+    assert report.rejects[0][0] == "patients.txt:3"
+
+    assert query("SELECT name, demographic_type FROM patients ORDER BY id") == [
+        ("John kyle Macay", "Student"), ("mansueto macay", "Senior"), ("Leo Quintana", "PWD")]
+    assert query("SELECT patient_name, date, time_slot, services, status FROM appointments ORDER BY id") == [
+        ("John kyle Macay", datetime.date(2025, 10, 6), "9:00 AM", "Dental Cleaning", "Booked"),
+        ("mansueto macay", datetime.date(2025, 10, 7), "5:00 PM", "Tooth Extraction, Whitening", "Booked"),
+        ("mansueto macay", datetime.date(2025, 10, 8), "2:00 PM", "Dental Check-up", "Booked"),
+        ("Leo Quintana", datetime.date(2025, 10, 7), "1:00 PM", "Root Canal", "Cancelled")]
+    assert query("SELECT COUNT(*) FROM appointment_services") == [(5,)]
+    # History skips the capacity check, and cancelled visits hold no place
+    assert query("SELECT SUM(booked) FROM slot_usage") == [(3,)]
+    assert query("SELECT value FROM summary_counters WHERE name = 'patients'") == [(3,)]
+
+
+def test_rerunning_the_import_adds_nothing(database, legacy_dir):
+    import_legacy_data(str(legacy_dir))
+    report = import_legacy_data(str(legacy_dir))
+    assert report.imported == {"patients": 0, "appointments": 0}
+    assert report.duplicates == {"patients": 5, "appointments": 5}
+    assert query("SELECT COUNT(*) FROM patients") == [(3,)]
+    assert query("SELECT COUNT(*) FROM appointments") == [(4,)]
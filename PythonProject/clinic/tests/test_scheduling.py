@@ -0,0 +1,88 @@
+import datetime
+
+import pytest
+
+from clinic.appointments import book_appointment, update_appointment_status
+from clinic.patients import save_patient
+from clinic.scheduling import (SCHEDULE_DEFAULT_CAPACITY, SlotUnavailableError, find_free_slots,
+                               save_dentist, slot_availability)
+
+from .conftest import query
+
+
+def book(date, time_slot="9:00 AM", name="Ana Cruz"):
+    return book_appointment(name, date, time_slot, [])
+
+
+def booked(date, time_slot="9:00 AM"):
+    rows = query("SELECT booked FROM slot_usage WHERE date = %s AND time_slot = %s", (date, time_slot))
+    return rows[0][0] if rows else 0
+
+
+def test_slot_fills_up_to_capacity(database, tomorrow):
+    save_patient("Ana Cruz", datetime.date(1990, 1, 1), "Regular", "09171234567")
+    for _ in range(SCHEDULE_DEFAULT_CAPACITY):
+        book(tomorrow)
+    with pytest.raises(SlotUnavailableError, match="fully booked"):
+        book(tomorrow)
+    # The rejected booking rolled back with its appointment row
+    assert query("SELECT COUNT(*) FROM appointments") == [(SCHEDULE_DEFAULT_CAPACITY,)]
+    assert booked(tomorrow) == SCHEDULE_DEFAULT_CAPACITY
+    assert dict(slot_availability(tomorrow))["9:00 AM"] == 0
+
+
+def test_past_and_unknown_slots_are_refused(database):
+    yesterday = datetime.date.today() - datetime.timedelta(days=1)
+    with pytest.raises(SlotUnavailableError, match="already passed"):
+        book(yesterday)
+    with pytest.raises(SlotUnavailableError, match="not a bookable"):
+        book(yesterday + datetime.timedelta(days=2), "8:00 PM")
+    assert query("SELECT COUNT(*) FROM appointments") == [(0,)]
+
+
+def test_active_dentists_cap_the_slot(database, tomorrow):
+    save_dentist("Dr. Reyes")
+    appointment_id = book(tomorrow)
+    with pytest.raises(SlotUnavailableError):
+        book(tomorrow)
+    dentist_id, = query("SELECT id FROM dentists")[0]
+    assert query("SELECT dentist_id FROM slot_reservations WHERE appointment_id = %s",
+                 (appointment_id,)) == [(dentist_id,)]
+
+
+def test_cancelling_frees_the_place_and_reinstating_takes_it_back(database, tomorrow):
+    first = book(tomorrow)
+    for _ in range(SCHEDULE_DEFAULT_CAPACITY - 1):
+        book(tomorrow)
+    update_appointment_status(first, "Cancelled")
+    assert booked(tomorrow) == SCHEDULE_DEFAULT_CAPACITY - 1
+    assert query("SELECT COUNT(*) FROM slot_reservations WHERE appointment_id = %s", (first,)) == [(0,)]
+
+    book(tomorrow)  # the freed place is taken by someone else
+    update_appointment_status(first, "Booked")
+    # Reinstating skips the capacity check, so the slot ends up overbooked rather than refusing
+    assert booked(tomorrow) == SCHEDULE_DEFAULT_CAPACITY + 1
+    assert query("SELECT COUNT(*) FROM slot_reservations WHERE appointment_id = %s", (first,)) == [(1,)]
+
+
+def test_reinstated_appointment_gets_its_dentist_back(database, tomorrow):
+    save_dentist("Dr. Reyes")
+    save_dentist("Dr. Santos")
+    first = book(tomorrow)
+    second = book(tomorrow)
+    dentist_id = query("SELECT dentist_id FROM appointments WHERE id = %s", (second,))[0][0]
+    update_appointment_status(second, "Cancelled")
+    update_appointment_status(first, "Cancelled")
+    # Both dentists are free again; the second appointment keeps its own, not the first on the list
+    update_appointment_status(second, "Booked")
+    assert query("SELECT dentist_id FROM slot_reservations WHERE appointment_id = %s",
+                 (second,)) == [(dentist_id,)]
+    assert query("SELECT MIN(id) FROM dentists") != [(dentist_id,)]
+
+
+def test_free_slots_skip_full_ones(database, tomorrow):
+    for _ in range(SCHEDULE_DEFAULT_CAPACITY):
+        book(tomorrow)
+    found = find_free_slots(start=tomorrow, count=3, time_slot="9:00 AM")
+    assert [date for date, _, _ in found] == [tomorrow + datetime.timedelta(days=day) for day in (1, 2, 3)]
+    assert all(free == SCHEDULE_DEFAULT_CAPACITY for _, _, free in found)
@@ -0,0 +1,68 @@
+import pytest
+
+from clinic.db import db_connection
+from clinic.search import fetch_grid_page, grid_filter_conditions, grid_query_cache, like_prefix
+
+from .conftest import query
+
+
+CONTACTS = ["0917", None, "0918", "0917", None, "0916", "0918", "0917", None, "0919"]
+
+
+@pytest.fixture
+def patients(database):
+    with db_connection() as db:
+        db.cursor().executemany(
+            "INSERT INTO patients (name, demographic_type, contact, type) VALUES (%s, %s, %s, %s)",
+            [(f"Patient {number}", "Regular", contact, "Pending") for number, contact in enumerate(CONTACTS)])
+        db.commit()
+
+
+def all_pages(sort_column, descending, page_size, conditions=()):
+    rows, after = [], None
+    while True:
+        page = fetch_grid_page("patients", ["name", sort_column], sort_column, descending, after,
+                               list(conditions), page_size)
+        rows += page
+        if len(page) < page_size:
+            return rows
+        after = (page[-1][2], page[-1][0])
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("page_size", [1, 3, 4])
+def test_keyset_pages_cover_every_row_once_in_order(patients, descending, page_size):
+    direction = "DESC" if descending else "ASC"
+    expected = query(f"SELECT id, name, contact FROM patients ORDER BY contact {direction}, id {direction}")
+    # Ties and NULL sort keys straddle page boundaries at these sizes
+    assert all_pages("contact", descending, page_size) == expected
+
+
+def test_search_terms_match_literally():
+    assert like_prefix("50%_off!") == "50!%!_off!!%"
+
+
+def test_filtered_pages_only_hold_matching_rows(patients):
+    with db_connection() as db:
+        db.cursor().execute("INSERT INTO patients (name, demographic_type, contact, type) VALUES "
+                            "('Patient_%', 'Regular', '0920', 'Complete')")
+        db.commit()
+    by_name = grid_filter_conditions("patients", "patient_%")
+    assert [name for _, name, _ in all_pages("contact", False, 2, by_name)] == ["Patient_%"]
+    by_contact = grid_filter_conditions("patients", "0917")
+    assert [contact for _, _, contact in all_pages("contact", False, 2, by_contact)] == ["0917"] * 3
+    pending = grid_filter_conditions("patients", "Patient 1", equals={"type": "Pending"})
+    assert [name for _, name, _ in all_pages("name", False, 5, pending)] == ["Patient 1"]
+    with pytest.raises(ValueError):
+        grid_filter_conditions("patients", equals={"password": "x"})
+
+
+def test_filtered_first_pages_are_cached(patients):
+    conditions = grid_filter_conditions("patients", "0918")
+    first = fetch_grid_page("patients", ["name"], "name", False, None, conditions, 10, use_cache=True)
+    with db_connection() as db:
+        db.cursor().execute("DELETE FROM patients")
+        db.commit()
+    assert fetch_grid_page("patients", ["name"], "name", False, None, conditions, 10, use_cache=True) == first
+    grid_query_cache.invalidate("patients")
+    assert fetch_grid_page("patients", ["name"], "name", False, None, conditions, 10, use_cache=True) == []
@@ -0,0 +1,49 @@
+import datetime
+
+import pytest
+
+from clinic.appointments import book_appointment, update_appointment_status
+from clinic.billing import new_payment_key, record_payment
+from clinic.catalog import get_service_catalog
+from clinic.db import db_connection
+from clinic.patients import save_patient
+from clinic.stats import get_dashboard_stats
+from clinic.summary import rebuild_summary_tables
+
+from .conftest import query
+
+
+SUMMARY_QUERIES = [
+    "SELECT name, value FROM summary_counters ORDER BY name",
+    "SELECT status, total FROM summary_appointment_status WHERE total != 0 ORDER BY status",
+    "SELECT month, revenue, payments FROM summary_monthly_revenue ORDER BY month",
+]
+
+
+def summaries():
+    return [query(sql) for sql in SUMMARY_QUERIES]
+
+
+def test_incremental_summaries_match_a_full_rebuild(database, tomorrow):
+    service_id = get_service_catalog().active_services()[0]["id"]
+    for number, demographic_type in enumerate(["Regular", "Senior", "Student"]):
+        save_patient(f"Patient {number}", datetime.date(1980, 1, 1), demographic_type, f"0917000000{number}")
+    paid = book_appointment("Patient 0", tomorrow, "9:00 AM", [service_id])
+    cancelled = book_appointment("Patient 1", tomorrow, "10:00 AM", [service_id])
+    book_appointment("Patient 2", tomorrow, "1:00 PM", [])
+    record_payment(paid, "Cash", new_payment_key(paid))
+    update_appointment_status(cancelled, "Cancelled")
+
+    incremental = summaries()
+    with db_connection() as db:
+        rebuild_summary_tables(db.cursor())
+        db.commit()
+    assert summaries() == incremental
+
+    stats = get_dashboard_stats(max_age=0)
+    assert stats["total_patients"] == 3
+    assert stats["total_appointments"] == 3
+    assert stats["pending_appointments"] == 1
+    assert dict(stats["status_counts"]) == {"Booked": 1, "Cancelled": 1, "Complete": 1}
+    assert stats["total_revenue"] == pytest.approx(get_service_catalog().by_id[service_id]["price"])
+    assert [month for month, _ in stats["monthly_revenue"]] == [datetime.date.today().strftime("%Y-%m")]